@@ -0,0 +1,97 @@
+import gzip
+from typing import Optional
+
+import brotli
+
+from app.config import settings
+
+# Nén response theo Accept-Encoding của client: ưu tiên br (nhỏ hơn gzip ~15-20% với JSON), rồi gzip.
+# Chỉ nén response 1 khối (JSON list, ...) từ COMPRESS_MIN_SIZE byte; response stream (NDJSON,
+# export, SSE) và response đã nén sẵn đi thẳng, không bị giữ lại trong buffer.
+ENCODINGS = ("br", "gzip")
+SKIP_MEDIA_TYPES = (b"text/event-stream", b"application/zip", b"image/")
+
+def parse_accept_encoding(header: str) -> dict:
+    """"gzip, br;q=0.8, *;q=0" -> {"gzip": 1.0, "br": 0.8, "*": 0.0}"""
+    weights = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[name.strip().lower()] = q
+    return weights
+
+def choose_encoding(header: str) -> Optional[str]:
+    weights = parse_accept_encoding(header)
+    best, best_q = None, 0.0
+    for name in ENCODINGS:
+        q = weights.get(name, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, mode=brotli.MODE_TEXT, quality=settings.BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=settings.GZIP_LEVEL)
+
+class CompressionMiddleware:
+    """gzip / brotli cho response lớn, thêm Vary: Accept-Encoding"""
+
+    def __init__(self, app, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = dict(scope["headers"])
+        encoding = choose_encoding(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start_message = None
+
+        async def send_wrapper(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                response_headers = dict(message.get("headers", []))
+                content_type = response_headers.get(b"content-type", b"")
+                if b"content-encoding" in response_headers or content_type.startswith(SKIP_MEDIA_TYPES):
+                    start_message = False  # đi thẳng
+                    return await send(message)
+                start_message = message  # chờ body để biết kích thước
+                return
+            if message["type"] != "http.response.body" or start_message is False:
+                return await send(message)
+            if start_message is None:  # đã gửi phần đầu của response stream
+                return await send(message)
+
+            start, start_message = start_message, None
+            body = message.get("body", b"")
+            raw_headers = [(k, v) for k, v in start.get("headers", []) if k != b"vary"]
+            vary = [v for k, v in start.get("headers", []) if k == b"vary"]
+            raw_headers.append((b"vary", b", ".join(vary + [b"Accept-Encoding"])))
+            if message.get("more_body", False) or len(body) < self.minimum_size:
+                await send({**start, "headers": raw_headers})
+                return await send(message)
+
+            body = compress(body, encoding)
+            # Bản nén là representation khác -> ETag mạnh thành ETag yếu (If-None-Match so sánh yếu vẫn khớp)
+            raw_headers = [
+                (k, b"W/" + v if k == b"etag" and not v.startswith(b"W/") else v)
+                for k, v in raw_headers if k != b"content-length"
+            ]
+            raw_headers += [(b"content-encoding", encoding.encode()), (b"content-length", str(len(body)).encode())]
+            await send({**start, "headers": raw_headers})
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_wrapper)
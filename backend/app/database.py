@@ -65,17 +65,27 @@ from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import QueuePool
 from app.config import settings
+from app.metrics import instrument_engine, timed_pool
+from app.query_stats import instrument_query_stats
 import os
 
 # Supabase client - only initialize if URL is provided
-supabase = None
-if settings.SUPABASE_URL and settings.SUPABASE_URL != "https://jdzbcdhrwbxvesejjten.supabase.co":
-    try:
-        from supabase import create_client, Client
-        supabase: Client = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
-    except Exception as e:
-        print(f"Warning: Could not initialize Supabase client: {e}")
-        supabase = None
+# Tạo lười ở lần gọi đầu tiên: import thư viện supabase tốn thời gian khởi động
+_supabase = None
+_supabase_loaded = False
+
+def get_supabase():
+    global _supabase, _supabase_loaded
+    if not _supabase_loaded:
+        _supabase_loaded = True
+        if settings.SUPABASE_URL and settings.SUPABASE_URL != "https://jdzbcdhrwbxvesejjten.supabase.co":
+            try:
+                from supabase import create_client
+                _supabase = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+            except Exception as e:
+                print(f"Warning: Could not initialize Supabase client: {e}")
+                _supabase = None
+    return _supabase
 
 # --- Database URL Configuration ---
 # Đọc toàn bộ chuỗi kết nối database từ một biến môi trường duy nhất.
@@ -101,15 +111,53 @@ else:
     # PostgreSQL configuration
     engine = create_engine(
         DATABASE_URL,
-        poolclass=QueuePool,
+        poolclass=timed_pool(QueuePool, "sync"),  # QueuePool + đo thời gian chờ connection (/metrics)
         pool_size=10,
         max_overflow=20,
         pool_pre_ping=True
     )
 
+instrument_engine(engine, "sync")
+instrument_query_stats(engine)  # Server-Timing + slow-query log theo request
+
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# --- Async engine (chỉ tạo khi DB_ASYNC=True) ---
+def get_async_database_url(url: str) -> str:
+    """Đổi URL sync sang driver async tương ứng (asyncpg / aiosqlite)"""
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    if url.startswith("postgres://"):
+        return url.replace("postgres://", "postgresql+asyncpg://", 1)
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    return url
+
+async_engine = None
+AsyncSessionLocal = None
+if settings.DB_ASYNC:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+    ASYNC_DATABASE_URL = get_async_database_url(DATABASE_URL)
+    if ASYNC_DATABASE_URL.startswith("sqlite"):
+        async_engine = create_async_engine(ASYNC_DATABASE_URL)
+    else:
+        async_engine = create_async_engine(
+            ASYNC_DATABASE_URL,
+            poolclass=timed_pool(AsyncAdaptedQueuePool, "async"),
+            pool_size=10,
+            max_overflow=20,
+            pool_pre_ping=True,
+            # Supabase pooler (pgbouncer, port 6543) không hỗ trợ prepared statement cache
+            connect_args={"statement_cache_size": 0, "prepared_statement_cache_size": 0},
+        )
+    instrument_engine(async_engine.sync_engine, "async")
+    instrument_query_stats(async_engine.sync_engine)
+    # expire_on_commit=False: trả object ORM sau commit mà không phải lazy-load (không được phép trong async)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 # Create Base class
 Base = declarative_base()
 
@@ -121,7 +169,39 @@ def get_db():
     finally:
         db.close()
 
+# Dependency to get async DB session
+async def get_async_db():
+    if AsyncSessionLocal is None:
+        raise RuntimeError("Async database is disabled, set DB_ASYNC=true")
+    async with AsyncSessionLocal() as db:
+        yield db
+
 # Initialize database
-async def init_db():
-    """Create database tables"""
+def create_schema():
+    """Tạo bảng còn thiếu + seed thực đơn nếu bảng dish trống + dựng daily_sales nếu bảng mới tạo"""
+    from app.services.dish_catalog import seed_menu_if_empty
+    from app.services.daily_sales import backfill_daily_sales_if_empty
     Base.metadata.create_all(bind=engine)
+    seeded = seed_menu_if_empty(engine)
+    if seeded:
+        print(f"Seeded {seeded} dishes from app/data/menu.json")
+    rollup_rows = backfill_daily_sales_if_empty(engine)
+    if rollup_rows:
+        print(f"Built daily_sales rollup: {rollup_rows} rows")
+
+async def init_db():
+    """Create database tables (chạy trong threadpool, không chặn event loop)"""
+    from starlette.concurrency import run_in_threadpool
+    await run_in_threadpool(create_schema)
+
+async def close_db():
+    """Dispose connection pools"""
+    if async_engine is not None:
+        await async_engine.dispose()
+    engine.dispose()
+
+if __name__ == "__main__":
+    # Bước migration tường minh: python -m app.database (dùng với DB_INIT_MODE=skip)
+    import app.models.models  # noqa: F401  đăng ký các bảng vào Base.metadata
+    create_schema()
+    print("Database tables created")
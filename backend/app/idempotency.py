@@ -0,0 +1,216 @@
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import redis
+
+from app.config import settings
+from app.redis_client import get_async_redis
+
+logger = logging.getLogger(__name__)
+
+# Idempotency-Key cho các route ghi của /api/orders và /api/reports: client gửi lại (Wi-Fi chập chờn)
+# cùng key -> trả lại response đã lưu, không chạy lại route / không đụng DB.
+HEADER = b"idempotency-key"
+WRITE_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+PATH_PREFIXES = ("/api/orders", "/api/reports")
+MAX_KEY_LENGTH = 255
+MAX_BODY_SIZE = 1024 * 1024  # response lớn hơn -> không lưu
+PENDING_TTL = 60  # giây giữ chỗ cho request đang chạy (request lỗi giữa chừng -> key tự nhả)
+REDIS_PREFIX = "idempotency:"
+
+def store_key(method: str, path: str, key: str) -> str:
+    # Cùng key nhưng khác route -> 2 bản ghi riêng
+    return hashlib.sha256(f"{method} {path} {key}".encode()).hexdigest()
+
+class MemoryStore:
+    """LRU trong process có TTL (khi không có Redis), tối đa max_keys bản ghi"""
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._items: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+
+    def _put(self, key: str, record: dict, ttl: int):
+        self._items[key] = (time.monotonic() + ttl, record)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_keys:
+            self._items.popitem(last=False)
+
+    async def reserve(self, key: str, record: dict) -> Optional[dict]:
+        item = self._items.get(key)
+        if item is not None and item[0] > time.monotonic():
+            self._items.move_to_end(key)
+            return item[1]
+        self._put(key, record, PENDING_TTL)
+        return None
+
+    async def save(self, key: str, record: dict):
+        self._put(key, record, settings.IDEMPOTENCY_TTL)
+
+    async def release(self, key: str):
+        self._items.pop(key, None)
+
+class RedisStore:
+    """1 key Redis / bản ghi (JSON), hết hạn theo TTL"""
+
+    async def reserve(self, key: str, record: dict) -> Optional[dict]:
+        client = get_async_redis()
+        if await client.set(REDIS_PREFIX + key, json.dumps(record), nx=True, ex=PENDING_TTL):
+            return None
+        raw = await client.get(REDIS_PREFIX + key)
+        return json.loads(raw) if raw is not None else record  # vừa hết hạn -> coi như đang chạy
+
+    async def save(self, key: str, record: dict):
+        await get_async_redis().set(REDIS_PREFIX + key, json.dumps(record), ex=settings.IDEMPOTENCY_TTL)
+
+    async def release(self, key: str):
+        await get_async_redis().delete(REDIS_PREFIX + key)
+
+class IdempotencyStore:
+    """
+    Redis (dùng chung giữa các worker); Redis lỗi / không chạy -> LRU trong process,
+    thử lại Redis sau RETRY_AFTER giây.
+    """
+    RETRY_AFTER = 30
+
+    def __init__(self, max_keys: int):
+        self.redis = RedisStore()
+        self.memory = MemoryStore(max_keys)
+        self._down_until = 0.0
+
+    def _mark_down(self, e: Exception):
+        if time.monotonic() >= self._down_until:
+            logger.warning("Idempotency store using memory for %ss, Redis error: %s", self.RETRY_AFTER, e)
+        self._down_until = time.monotonic() + self.RETRY_AFTER
+
+    async def reserve(self, key: str, record: dict):
+        """-> (bản ghi đã có hoặc None nếu vừa giữ chỗ, store đã dùng)"""
+        if time.monotonic() >= self._down_until:
+            try:
+                return await self.redis.reserve(key, record), self.redis
+            except redis.RedisError as e:
+                self._mark_down(e)
+        return await self.memory.reserve(key, record), self.memory
+
+    async def save(self, store, key: str, record: dict):
+        try:
+            await store.save(key, record)
+        except redis.RedisError as e:
+            self._mark_down(e)
+
+    async def release(self, store, key: str):
+        try:
+            await store.release(key)
+        except redis.RedisError as e:
+            self._mark_down(e)
+
+idempotency_store = IdempotencyStore(max_keys=settings.IDEMPOTENCY_MAX_KEYS)
+
+async def _send_json(send, status: int, detail: str):
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+async def _replay(send, record: dict):
+    body = record["body"].encode("latin-1")
+    headers = [(k.encode("latin-1"), v.encode("latin-1")) for k, v in record["headers"]]
+    headers += [(b"content-length", str(len(body)).encode()), (b"idempotent-replayed", b"true")]
+    await send({"type": "http.response.start", "status": record["status"], "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+class IdempotencyMiddleware:
+    """
+    Request ghi có header Idempotency-Key:
+    - key mới -> chạy route, lưu status / header / body (trừ lỗi 5xx để client thử lại được)
+    - key đã xong -> trả lại response cũ (+ Idempotent-Replayed: true)
+    - key đang chạy -> 409, key dùng lại với body khác -> 422
+    Đặt bên trong CORSMiddleware để response trả lại vẫn có header CORS.
+    """
+
+    def __init__(self, app, store: IdempotencyStore = idempotency_store):
+        self.app = app
+        self.store = store
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] not in WRITE_METHODS
+            or not scope["path"].startswith(PATH_PREFIXES)
+        ):
+            return await self.app(scope, receive, send)
+        key = dict(scope["headers"]).get(HEADER)
+        if key is None:
+            return await self.app(scope, receive, send)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return await _send_json(send, 400, f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters")
+
+        # Đọc hết body để lấy fingerprint, sau đó phát lại cho route
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                break
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        body = b"".join(chunks)
+        fingerprint = hashlib.sha256(body).hexdigest()
+        key = store_key(scope["method"], scope["path"], key.decode("latin-1"))
+
+        existing, store = await self.store.reserve(key, {"state": "pending", "fingerprint": fingerprint})
+        if existing is not None:
+            if existing["fingerprint"] != fingerprint:
+                return await _send_json(send, 422, "Idempotency-Key was already used with a different request body")
+            if existing["state"] == "pending":
+                return await _send_json(send, 409, "A request with this Idempotency-Key is still in progress")
+            return await _replay(send, existing)
+
+        body_sent = False
+
+        async def replay_receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        response = {"status": 500, "headers": [], "chunks": [], "size": 0}
+        saved = False
+
+        async def send_wrapper(message):
+            nonlocal saved
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = [
+                    (k.decode("latin-1"), v.decode("latin-1"))
+                    for k, v in message.get("headers", []) if k != b"content-length"
+                ]
+            elif message["type"] == "http.response.body":
+                chunk = message.get("body", b"")
+                response["size"] += len(chunk)
+                if response["size"] <= MAX_BODY_SIZE:
+                    response["chunks"].append(chunk)
+                if not message.get("more_body", False) and response["status"] < 500 and response["size"] <= MAX_BODY_SIZE:
+                    # Lưu trước khi gửi phần cuối -> client gửi lại ngay sau khi nhận vẫn được trả bản đã lưu
+                    await self.store.save(store, key, {
+                        "state": "done",
+                        "fingerprint": fingerprint,
+                        "status": response["status"],
+                        "headers": response["headers"],
+                        "body": b"".join(response["chunks"]).decode("latin-1"),
+                    })
+                    saved = True
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, send_wrapper)
+        finally:
+            if not saved:
+                await self.store.release(store, key)
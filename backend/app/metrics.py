@@ -0,0 +1,141 @@
+import time
+
+from fastapi import Response
+from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, REGISTRY, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event, exc
+
+# Bucket (giây): request / query của app phần lớn < 100ms, Supabase ở xa có thể vài trăm ms
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests currently being served")
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds", "Time spent executing SQL statements",
+    ["engine"], buckets=LATENCY_BUCKETS,
+)
+DB_POOL_WAIT = Histogram(
+    "db_pool_wait_seconds", "Time spent waiting for a pooled connection",
+    ["engine"], buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30),
+)
+DB_POOL_TIMEOUTS = Counter("db_pool_timeouts_total", "Connection checkouts that hit pool_timeout", ["engine"])
+
+# Write-behind PUT số lượng / note (app/services/order_write_buffer.py)
+ORDER_WRITES_BUFFERED = Counter("order_writes_buffered_total", "Order updates that opened a pending write-behind entry")
+ORDER_WRITES_COALESCED = Counter("order_writes_coalesced_total", "Order updates merged into an already pending entry (writes saved)")
+ORDER_WRITE_FLUSHES = Counter("order_write_flushes_total", "Write-behind flush transactions", ["reason"])
+ORDER_ROWS_FLUSHED = Counter("order_rows_flushed_total", "Order rows written by write-behind flushes")
+ORDER_JOURNAL_PENDING = Gauge("order_journal_pending", "Live order store changes not yet written to the DB")
+ORDER_JOURNAL_FLUSHES = Counter("order_journal_flushes_total", "Live order store journal flush transactions", ["reason"])
+
+# --- Middleware ---
+class PrometheusMiddleware:
+    """ASGI middleware: latency theo route template (không theo path thật -> số series có giới hạn)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.labels(
+                method=scope["method"],
+                route=route.path if route is not None else "unmatched",
+                status=str(status["code"]),
+            ).observe(time.perf_counter() - start)
+
+# --- SQLAlchemy ---
+def instrument_engine(engine, name: str):
+    """Đo thời gian mỗi câu SQL (engine sync, hoặc async_engine.sync_engine)"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _end(conn, cursor, statement, parameters, context, executemany):
+        DB_QUERY_DURATION.labels(engine=name).observe(time.perf_counter() - conn.info["query_start"].pop())
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_start"):
+            conn.info["query_start"].pop()
+
+def timed_pool(pool_class, name: str):
+    """Pool con ghi lại thời gian chờ lấy connection (pool đầy -> chờ tới pool_timeout)"""
+
+    class TimedPool(pool_class):
+        def _do_get(self):
+            start = time.perf_counter()
+            try:
+                return super()._do_get()
+            except exc.TimeoutError:
+                DB_POOL_TIMEOUTS.labels(engine=name).inc()
+                raise
+            finally:
+                DB_POOL_WAIT.labels(engine=name).observe(time.perf_counter() - start)
+
+    TimedPool.__name__ = f"Timed{pool_class.__name__}"
+    return TimedPool
+
+class RuntimeCollector:
+    """Số liệu đọc tại thời điểm scrape: trạng thái connection pool + threadpool của route sync"""
+
+    def describe(self):
+        return []  # không gọi collect() lúc register (app.database chưa import xong)
+
+    def collect(self):
+        from app import database
+
+        checked_out = GaugeMetricFamily("db_pool_checked_out", "Connections currently checked out", labels=["engine"])
+        overflow = GaugeMetricFamily("db_pool_overflow", "Connections opened beyond pool_size", labels=["engine"])
+        size = GaugeMetricFamily("db_pool_size", "Configured pool_size", labels=["engine"])
+        engines = [("sync", database.engine)]
+        if database.async_engine is not None:
+            engines.append(("async", database.async_engine.sync_engine))
+        for name, engine in engines:
+            pool = engine.pool
+            if not hasattr(pool, "checkedout"):
+                continue  # pool không đếm connection (NullPool / StaticPool)
+            checked_out.add_metric([name], pool.checkedout())
+            overflow.add_metric([name], max(pool.overflow(), 0))
+            size.add_metric([name], pool.size())
+        yield checked_out
+        yield overflow
+        yield size
+
+        # Route `def` chạy trong threadpool của anyio (mặc định 40 thread)
+        try:
+            from anyio.to_thread import current_default_thread_limiter
+            limiter = current_default_thread_limiter()
+        except Exception:
+            return  # scrape ngoài event loop
+        stats = limiter.statistics()
+        yield GaugeMetricFamily("threadpool_busy_threads", "Worker threads running sync handlers", value=stats.borrowed_tokens)
+        yield GaugeMetricFamily("threadpool_max_threads", "Threadpool size", value=stats.total_tokens)
+        yield GaugeMetricFamily("threadpool_waiting_tasks", "Sync handlers waiting for a free thread", value=stats.tasks_waiting)
+
+REGISTRY.register(RuntimeCollector())
+
+def metrics_response() -> Response:
+    """Prometheus text exposition cho GET /metrics"""
+    return Response(generate_latest(REGISTRY), headers={"Content-Type": CONTENT_TYPE_LATEST})
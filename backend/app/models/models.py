@@ -1,26 +1,64 @@
-from sqlalchemy import Column, Integer, String, DateTime, Float, Text
+from sqlalchemy import Column, Integer, String, Date, DateTime, Time, Float, Text, Index, ForeignKey
 from sqlalchemy.sql import func
 from app.database import Base
 
+def normalize_dish_name(name: str) -> str:
+    """Khóa so khớp món: bỏ khoảng trắng hai đầu, không phân biệt hoa thường"""
+    return name.strip().lower()
+
+def _default_dish_key(context):
+    return normalize_dish_name(context.get_current_parameters()["dish_name"])
+
+def _default_menu_key(context):
+    return normalize_dish_name(context.get_current_parameters()["name"])
+
+def _default_dish_id(context):
+    # Tra trong thực đơn đã cache trong process (không thêm câu SQL cho mỗi dòng); món ngoài thực đơn -> NULL
+    from app.services.dish_catalog import dish_catalog
+    params = context.get_current_parameters()
+    key = params.get("dish_key") or normalize_dish_name(params["dish_name"])
+    dish = dish_catalog.ensure(context.connection).by_key.get(key)
+    return dish.id if dish else None
+
+class Dish(Base):
+    __tablename__ = "dish"
+
+    id = Column(Integer, primary_key=True, index=True)
+    code = Column(String(20), nullable=False)  # mã hàng (= id trong frontend/src/data/dishes.ts, có mã trùng: "TV")
+    name = Column(String(255), nullable=False)
+    dish_key = Column(String(255), nullable=False, unique=True, default=_default_menu_key)  # khớp order_list.dish_key
+    price = Column(Integer, nullable=False)  # VND
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
 class Order(Base):
     __tablename__ = "order_list"
+    __table_args__ = (
+        # 1 dòng cho mỗi (bàn, món) -> phục vụ lookup và INSERT ... ON CONFLICT
+        Index("uq_order_list_table_dish_key", "table_id", "dish_key", unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     table_id = Column(Integer, nullable=False)
-    date = Column(String(50), nullable=False)
-    time = Column(String(50), nullable=False)
+    date = Column(Date, nullable=False)
+    time = Column(Time, nullable=False)
     dish_name = Column(String(255), nullable=False)
+    dish_key = Column(String(255), nullable=False, default=_default_dish_key)  # = normalize_dish_name(dish_name)
+    dish_id = Column(Integer, ForeignKey("dish.id", ondelete="SET NULL"), default=_default_dish_id)
     quantity = Column(Integer, nullable=False)
     note = Column(Text, default='')  # Thêm cột note
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 class Report(Base):
     __tablename__ = "report"
+    __table_args__ = (
+        # Lọc theo khoảng ngày (+ gộp theo mã hàng) -> index range scan thay vì quét cả bảng
+        Index("ix_report_date_product_code", "date", "product_code"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     table_id = Column(Integer, nullable=False)
-    date = Column(String(50), nullable=False)
-    hour = Column(String(50), nullable=False)
+    date = Column(Date, nullable=False)
+    hour = Column(Time, nullable=False)
     product_code = Column(String(50), nullable=False)
     product_name = Column(String(255), nullable=False)
     quantity = Column(Integer, nullable=False)
@@ -28,3 +66,18 @@ class Report(Base):
     ship_fee = Column(Float, nullable=False, default=0)
     discount = Column(Float, nullable=False, default=0)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class DailySales(Base):
+    __tablename__ = "daily_sales"
+    # Tổng của bảng report theo (ngày, mã hàng, bàn), cập nhật cùng transaction với mỗi lần ghi / xóa report
+    # (app/services/daily_sales.py). Gồm cả các tháng đã archive sang Parquet.
+
+    date = Column(Date, primary_key=True)
+    product_code = Column(String(50), primary_key=True)
+    table_id = Column(Integer, primary_key=True)
+    product_name = Column(String(255), nullable=False)
+    rows = Column(Integer, nullable=False, default=0)  # số dòng report
+    quantity = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0)  # SUM(report.total)
+    discount = Column(Float, nullable=False, default=0)
+    ship_fee = Column(Float, nullable=False, default=0)
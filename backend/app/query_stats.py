@@ -0,0 +1,120 @@
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+from app.config import settings
+
+logger = logging.getLogger("app.sql")
+
+# --- Chuẩn hóa SQL: gộp các câu chỉ khác tham số để nhận ra N+1 ---
+_PLACEHOLDER = r"(?:\?|%\([^)]*\)s|\$\d+(?:::[\w ]+)?|:\w+|'(?:[^']|'')*'|-?\d+(?:\.\d+)?|NULL)"
+_PLACEHOLDER_LIST = re.compile(r"\(\s*" + _PLACEHOLDER + r"(?:\s*,\s*" + _PLACEHOLDER + r")*\s*\)")
+_REPEATED_ROWS = re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w$])-?\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_sql(statement: str) -> str:
+    """IN (?, ?, ?) / VALUES (...), (...) -> (...); chuỗi / số -> ?; gộp khoảng trắng"""
+    sql = _WHITESPACE.sub(" ", statement).strip()
+    sql = _PLACEHOLDER_LIST.sub("(...)", sql)
+    sql = _REPEATED_ROWS.sub("(...)", sql)
+    sql = _STRING.sub("?", sql)
+    return _NUMBER.sub("?", sql)
+
+class RequestQueryStats:
+    """Số câu SQL + tổng thời gian DB của 1 request"""
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.count = 0
+        self.db_ms = 0.0
+        self.statements: Counter = Counter()
+
+    def record(self, statement: str, elapsed_ms: float):
+        self.count += 1
+        self.db_ms += elapsed_ms
+        sql = normalize_sql(statement)
+        self.statements[sql] += 1
+        if elapsed_ms >= settings.SLOW_QUERY_MS:
+            log_event("slow_query", method=self.method, path=self.path, ms=round(elapsed_ms, 2), sql=sql)
+
+    def server_timing(self, total_ms: float) -> str:
+        return f'db;dur={self.db_ms:.2f};desc="{self.count} queries", app;dur={total_ms:.2f}'
+
+_current: ContextVar[Optional[RequestQueryStats]] = ContextVar("request_query_stats", default=None)
+
+def log_event(name: str, **fields):
+    """1 dòng JSON / sự kiện -> dễ grep / đưa vào log pipeline"""
+    logger.warning(json.dumps({"event": name, **fields}, ensure_ascii=False))
+
+# --- SQLAlchemy hooks (đăng ký trong app/database.py) ---
+def instrument_query_stats(engine):
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("stats_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _end(conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - conn.info["stats_start"].pop()) * 1000
+        stats = _current.get()
+        if stats is not None:
+            stats.record(statement, elapsed_ms)
+        elif elapsed_ms >= settings.SLOW_QUERY_MS:
+            # ngoài request (startup, benchmark, ...)
+            log_event("slow_query", ms=round(elapsed_ms, 2), sql=normalize_sql(statement))
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("stats_start"):
+            conn.info["stats_start"].pop()
+
+# --- Middleware ---
+class QueryStatsMiddleware:
+    """
+    Gắn header Server-Timing (db = tổng thời gian SQL + số câu, app = tổng thời gian xử lý)
+    và log request có quá nhiều câu SQL (nghi N+1) kèm các câu lặp lại nhiều nhất.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestQueryStats(scope["method"], scope["path"])
+        token = _current.set(stats)
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                total_ms = (time.perf_counter() - start) * 1000
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", stats.server_timing(total_ms).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            if stats.count >= settings.SLOW_REQUEST_QUERIES:
+                route = scope.get("route")
+                log_event(
+                    "many_queries",
+                    method=stats.method,
+                    path=stats.path,
+                    route=route.path if route is not None else None,
+                    queries=stats.count,
+                    db_ms=round(stats.db_ms, 2),
+                    top=[{"sql": sql, "count": n} for sql, n in stats.statements.most_common(3)],
+                )
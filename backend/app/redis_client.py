@@ -0,0 +1,47 @@
+import redis
+import redis.asyncio as aioredis
+
+from app.config import settings
+
+# Connection pool dùng chung cho cả app (tạo trong lifespan, không tạo kết nối mới mỗi request)
+pool = None
+async_pool = None
+
+def _pool_kwargs() -> dict:
+    return dict(
+        host=settings.REDIS_HOST,
+        port=settings.REDIS_PORT,
+        username=settings.REDIS_USERNAME,
+        password=settings.REDIS_PASSWORD,
+        decode_responses=True,
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        socket_connect_timeout=0.2,
+        socket_timeout=1,
+    )
+
+def init_redis():
+    """Tạo pool (không mở kết nối nào cho tới khi có lệnh đầu tiên)"""
+    global pool, async_pool
+    if pool is None:
+        pool = redis.ConnectionPool(**_pool_kwargs())
+    if async_pool is None:
+        async_pool = aioredis.ConnectionPool(**_pool_kwargs())
+
+async def close_redis():
+    global pool, async_pool
+    if pool is not None:
+        pool.disconnect()
+        pool = None
+    if async_pool is not None:
+        await async_pool.disconnect()
+        async_pool = None
+
+def get_redis() -> redis.Redis:
+    if pool is None:
+        init_redis()
+    return redis.Redis(connection_pool=pool)
+
+def get_async_redis() -> aioredis.Redis:
+    if async_pool is None:
+        init_redis()
+    return aioredis.Redis(connection_pool=async_pool)
@@ -0,0 +1,65 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from typing import List
+
+from app.database import get_db
+from app.models.models import Dish, normalize_dish_name
+from app.schemas.schemas import DishResponse, DishCreate, DishUpdate
+from app.services.dish_catalog import dish_catalog, catalog_response
+
+router = APIRouter()
+
+def _get_dish(db: Session, dish_id: int) -> Dish:
+    dish = db.get(Dish, dish_id)
+    if not dish:
+        raise HTTPException(status_code=404, detail=f"Dish {dish_id} not found")
+    return dish
+
+@router.get("/", response_model=List[DishResponse])
+def get_dishes(request: Request, db: Session = Depends(get_db)):
+    """Menu from the in-process catalog (ETag / If-None-Match -> 304 Not Modified)"""
+    return catalog_response(request, dish_catalog.ensure(db))
+
+@router.get("/{dish_id}", response_model=DishResponse)
+def get_dish(dish_id: int, db: Session = Depends(get_db)):
+    """Get one dish by id"""
+    dish = dish_catalog.ensure(db).by_id.get(dish_id)
+    if not dish:
+        raise HTTPException(status_code=404, detail=f"Dish {dish_id} not found")
+    return dish._asdict()
+
+@router.post("/", response_model=DishResponse)
+def create_dish(data: DishCreate, db: Session = Depends(get_db)):
+    """Add a dish to the menu"""
+    dish = Dish(**data.model_dump())
+    db.add(dish)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=f"Dish '{data.name}' already exists")
+    db.refresh(dish)
+    dish_catalog.invalidate()
+    return dish
+
+@router.put("/{dish_id}", response_model=DishResponse)
+def update_dish(dish_id: int, data: DishUpdate, db: Session = Depends(get_db)):
+    """Rename / reprice a dish"""
+    dish = _get_dish(db, dish_id)
+    for field, value in data.model_dump(exclude_none=True).items():
+        setattr(dish, field, value)
+    if data.name is not None:
+        dish.dish_key = normalize_dish_name(data.name)
+    db.commit()
+    db.refresh(dish)
+    dish_catalog.invalidate()
+    return dish
+
+@router.delete("/{dish_id}")
+def delete_dish(dish_id: int, db: Session = Depends(get_db)):
+    """Remove a dish from the menu (orders keep their dish_name)"""
+    db.delete(_get_dish(db, dish_id))
+    db.commit()
+    dish_catalog.invalidate()
+    return {"message": "Dish deleted successfully"}
@@ -0,0 +1,66 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
+from typing import List
+
+from app.database import get_async_db
+from app.models.models import Dish, normalize_dish_name
+from app.schemas.schemas import DishResponse, DishCreate, DishUpdate
+from app.services.dish_catalog import dish_catalog, catalog_response
+
+# Bản async của app/routers/dishes.py (bật bằng DB_ASYNC=true), giữ nguyên route và response
+router = APIRouter()
+
+async def _get_dish(db: AsyncSession, dish_id: int) -> Dish:
+    dish = await db.get(Dish, dish_id)
+    if not dish:
+        raise HTTPException(status_code=404, detail=f"Dish {dish_id} not found")
+    return dish
+
+@router.get("/", response_model=List[DishResponse])
+async def get_dishes(request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Menu from the in-process catalog (ETag / If-None-Match -> 304 Not Modified)"""
+    return catalog_response(request, await dish_catalog.ensure_async(db))
+
+@router.get("/{dish_id}", response_model=DishResponse)
+async def get_dish(dish_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Get one dish by id"""
+    dish = (await dish_catalog.ensure_async(db)).by_id.get(dish_id)
+    if not dish:
+        raise HTTPException(status_code=404, detail=f"Dish {dish_id} not found")
+    return dish._asdict()
+
+@router.post("/", response_model=DishResponse)
+async def create_dish(data: DishCreate, db: AsyncSession = Depends(get_async_db)):
+    """Add a dish to the menu"""
+    dish = Dish(**data.model_dump())
+    db.add(dish)
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail=f"Dish '{data.name}' already exists")
+    await db.refresh(dish)
+    dish_catalog.invalidate()
+    return dish
+
+@router.put("/{dish_id}", response_model=DishResponse)
+async def update_dish(dish_id: int, data: DishUpdate, db: AsyncSession = Depends(get_async_db)):
+    """Rename / reprice a dish"""
+    dish = await _get_dish(db, dish_id)
+    for field, value in data.model_dump(exclude_none=True).items():
+        setattr(dish, field, value)
+    if data.name is not None:
+        dish.dish_key = normalize_dish_name(data.name)
+    await db.commit()
+    await db.refresh(dish)
+    dish_catalog.invalidate()
+    return dish
+
+@router.delete("/{dish_id}")
+async def delete_dish(dish_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Remove a dish from the menu (orders keep their dish_name)"""
+    await db.delete(await _get_dish(db, dish_id))
+    await db.commit()
+    dish_catalog.invalidate()
+    return {"message": "Dish deleted successfully"}
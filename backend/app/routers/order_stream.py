@@ -0,0 +1,67 @@
+import asyncio
+import json
+from typing import Optional
+
+from fastapi import APIRouter, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+
+from app.services.order_events import order_events
+
+# Đẩy thay đổi order tới client (SSE hoặc WebSocket) thay cho việc poll orders/
+router = APIRouter()
+
+KEEPALIVE_SECONDS = 15
+
+def _matches(event: dict, table_id: Optional[int]) -> bool:
+    """Lọc theo bàn; sự kiện không gắn bàn (clear all, resync) luôn được gửi"""
+    return table_id is None or event.get("table") in (None, table_id)
+
+@router.get("/stream")
+async def stream_order_events(request: Request, table_id: Optional[int] = None):
+    """Server-Sent Events: mỗi sự kiện là 1 dòng `data: {...}`"""
+    queue = order_events.subscribe()
+
+    async def event_source():
+        try:
+            yield ": connected\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": ping\n\n"
+                    continue
+                if _matches(event, table_id):
+                    yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+        finally:
+            order_events.unsubscribe(queue)
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.websocket("/stream")
+async def stream_order_events_ws(websocket: WebSocket, table_id: Optional[int] = None):
+    """WebSocket: mỗi sự kiện là 1 message JSON"""
+    await websocket.accept()
+    queue = order_events.subscribe()
+
+    async def forward():
+        while True:
+            event = await queue.get()
+            if _matches(event, table_id):
+                await websocket.send_json(event)
+
+    sender = asyncio.create_task(forward())
+    try:
+        # Client không gửi gì; đọc để phát hiện ngắt kết nối ngay (không đợi tới sự kiện sau)
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        order_events.unsubscribe(queue)
@@ -1,14 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Dict, List, Literal, Optional
 from urllib.parse import unquote
 from datetime import datetime
 from pydantic import BaseModel
-from sqlalchemy import func
+from sqlalchemy import select, insert, update, delete
 
 from app.database import get_db
-from app.models.models import Order
-from app.schemas.schemas import OrderResponse, OrderCreate, AddOrderRequest
+from app.models.models import Order, normalize_dish_name
+from app.schemas.schemas import (
+    OrderResponse, OrderCreate, AddOrderRequest, ReportResponse, DisplayDate, DisplayTime,
+)
+from app.services.listing import apply_keyset, set_next_cursor, stream_ndjson, NDJSON_MEDIA_TYPE
+from app.services.table_sync import plan_table_sync, sync_events
+from app.services.order_upsert import upsert_order
+from app.services.checkout import checkout_table
+from app.services.order_cache import order_cache, table_key, versioned_key, ALL_ORDERS_KEY, serialize_orders
+from app.services.order_versions import order_versions
+from app.services.http_cache import weak_etag, etag_matches, cache_headers, not_modified
+from app.services.order_events import upsert_event, remove_event, clear_event
+from app.services.order_changes import orders_committed, orders_buffered
+from app.services.order_write_buffer import order_write_buffer
 
 router = APIRouter()
 
@@ -20,63 +33,147 @@ class ItemCreate(BaseModel):
     quantity: int = 1
     note: str = ""
 
+class TableChange(BaseModel):
+    type: Literal["add", "update", "remove", "note"]
+    dish_name: str
+    quantity: Optional[int] = None
+    note: Optional[str] = None
+
+class TableSyncRequest(BaseModel):
+    changes: List[TableChange]
+
+class CheckoutRequest(BaseModel):
+    date: DisplayDate
+    time: DisplayTime
+    total: Optional[float] = None  # tổng bill (sau giảm giá + ship); bỏ trống -> server tính theo giá thực đơn
+    discount: float = 0
+    ship_fee: float = 0
+    product_codes: Dict[str, str] = {}  # tên món -> mã hàng, chỉ cần cho món ngoài thực đơn
+
 @router.post("/table/{table_id}/item", response_model=OrderResponse)
 def create_item(table_id: int, data: ItemCreate, db: Session = Depends(get_db)):
-    """Create or update an order item with note in ONE transaction."""
-    name = data.dish_name.strip()
+    """Create or update an order item with note in ONE statement (INSERT ... ON CONFLICT)."""
+    order_write_buffer.flush(table_id)  # write-behind: ghi các lần bấm +/- đang chờ của bàn trước
+    values = {
+        "table_id": table_id,
+        "dish_name": data.dish_name.strip(),
+        "quantity": data.quantity,
+        "note": data.note or "",
+        "date": datetime.now().date(),
+        "time": datetime.now().time().replace(microsecond=0),
+    }
+    # upsert: cập nhật luôn số lượng + note
+    order = upsert_order(db, values, ["quantity", "note", "date", "time"])
+    result = OrderResponse.model_validate(order)
+    db.commit()
+    orders_committed(table_id, [upsert_event(result)])
+    return result
 
-    existing = (
-        db.query(Order)
-        .filter(
-            Order.table_id == table_id,
-            func.lower(func.trim(Order.dish_name)) == func.lower(func.trim(name)),
-        )
-        .first()
-    )
+@router.post("/table/{table_id}/sync", response_model=List[OrderResponse])
+def sync_table_changes(table_id: int, data: TableSyncRequest, db: Session = Depends(get_db)):
+    """Apply a table's whole pending change list in ONE transaction, return the final state."""
+    order_write_buffer.flush(table_id)
+    try:
+        existing = db.execute(
+            select(Order.id, Order.dish_key, Order.dish_name).where(Order.table_id == table_id)
+        ).all()
+        delete_ids, updates, inserts = plan_table_sync(table_id, data.changes, existing)
+
+        if delete_ids:
+            db.execute(delete(Order).where(Order.id.in_(delete_ids)))
+        if updates:
+            db.execute(update(Order), updates)
+        if inserts:
+            db.execute(insert(Order), inserts)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"Error syncing table {table_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error syncing table {table_id}: {str(e)}")
 
-    now_date = datetime.now().strftime("%Y-%m-%d")
-    now_time = datetime.now().strftime("%H:%M:%S")
+    rows = db.query(Order).filter(Order.table_id == table_id).all()
+    orders_committed(table_id, sync_events(table_id, existing, delete_ids, updates, inserts, rows))
+    orders = serialize_orders(rows, OrderResponse)
+    return orders
 
-    if existing:
-        # upsert: cập nhật luôn số lượng + note
-        existing.quantity = data.quantity
-        if data.note is not None:
-            existing.note = data.note
-        existing.date = now_date
-        existing.time = now_time
+@router.post("/table/{table_id}/checkout", response_model=List[ReportResponse])
+def checkout_table_orders(table_id: int, bill: CheckoutRequest, db: Session = Depends(get_db)):
+    """Move a table's orders into report and clear the table in ONE transaction."""
+    order_write_buffer.flush(table_id)  # flush-on-checkout: report phải có số lượng / note mới nhất
+    try:
+        reports = [ReportResponse.model_validate(r) for r in checkout_table(db, table_id, bill)]
         db.commit()
-        db.refresh(existing)
-        return existing
-
-    db_order = Order(
-        table_id=table_id,
-        dish_name=name,
-        quantity=data.quantity,
-        note=data.note or "",
-        date=now_date,
-        time=now_time,
-    )
-    db.add(db_order)
-    db.commit()
-    db.refresh(db_order)
-    return db_order
+    except HTTPException:
+        db.rollback()
+        raise
+    except Exception as e:
+        db.rollback()
+        print(f"Error checking out table {table_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error checking out table {table_id}: {str(e)}")
+
+    orders_committed(table_id, [clear_event(table_id)])
+    print(f"Checked out table {table_id}: {len(reports)} report rows")
+    return reports
 
 # SỬA LỖI: Đã xóa dòng @router.get("") bị trùng lặp. Chỉ giữ lại một dòng.
 @router.get("/", response_model=List[OrderResponse])
-def get_all_orders(db: Session = Depends(get_db)):
-    """Get all orders"""
-    orders = db.query(Order).order_by(Order.dish_name).all()
+def get_all_orders(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    format: Literal["json", "ndjson"] = "json",
+    db: Session = Depends(get_db),
+):
+    """Get all orders (limit/cursor -> keyset pages by id, format=ndjson -> streamed, full list -> ETag / 304)"""
+    if format == "ndjson":
+        stmt = apply_keyset(select(Order), Order.id, cursor, limit)
+        return StreamingResponse(stream_ndjson(stmt, OrderResponse), media_type=NDJSON_MEDIA_TYPE)
+    if limit is None and cursor is None:
+        # Đọc version TRƯỚC dữ liệu: ghi xen giữa -> lần sau ra version mới, không giữ tag cũ cho dữ liệu mới
+        version = order_versions.all_version()
+        if version is not None:
+            etag = weak_etag(version)
+            if etag_matches(request, etag):
+                return not_modified(etag)
+            response.headers.update(cache_headers(etag))
+        key = versioned_key(ALL_ORDERS_KEY, version)
+        orders = order_cache.get(key)
+        if orders is None:
+            orders = serialize_orders(db.query(Order).order_by(Order.dish_name).all(), OrderResponse)
+            order_cache.set(key, orders)
+        return order_write_buffer.overlay(orders)  # cache = trạng thái DB, thêm thay đổi đang chờ ghi
+
+    limit = limit or 100
+    orders = db.scalars(apply_keyset(select(Order), Order.id, cursor, limit)).all()
+    set_next_cursor(response, orders, limit)
     return orders
 
+@router.get("/cache/stats")
+def get_order_cache_stats():
+    """Hit / miss counters of the order read cache"""
+    return order_cache.stats()
+
 @router.get("/table/{table_id}", response_model=List[OrderResponse])
-def get_orders_by_table(table_id: int, db: Session = Depends(get_db)):
-    """Get orders by table ID"""
-    orders = db.query(Order).filter(Order.table_id == table_id).all()
-    return orders
+def get_orders_by_table(table_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    """Get orders by table ID (read-through Redis cache, ETag / If-None-Match -> 304 Not Modified)"""
+    version = order_versions.table_version(table_id)
+    if version is not None:
+        etag = weak_etag(version)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        response.headers.update(cache_headers(etag))
+    key = versioned_key(table_key(table_id), version)
+    orders = order_cache.get(key)
+    if orders is None:
+        orders = serialize_orders(db.query(Order).filter(Order.table_id == table_id).all(), OrderResponse)
+        order_cache.set(key, orders)
+    return order_write_buffer.overlay(orders, table_id)  # cache = trạng thái DB, thêm thay đổi đang chờ ghi
 
 @router.post("/", response_model=OrderResponse)
 def create_order(order_request: AddOrderRequest, db: Session = Depends(get_db)):
     """Create a new order or update existing one"""
+    order_write_buffer.flush(order_request.table_id)
     order_data = OrderCreate(
         table_id=order_request.table_id,
         date=order_request.date,
@@ -87,31 +184,15 @@ def create_order(order_request: AddOrderRequest, db: Session = Depends(get_db)):
     )
     
     try:
-        existing_order = db.query(Order).filter(
-            Order.table_id == order_data.table_id,
-            Order.dish_name == order_data.dish_name
-        ).first()
-        
-        if existing_order:
-            # Nếu đã tồn tại, cập nhật quantity, note, và thời gian
-            print(f"Order exists, updating: Table {order_data.table_id}, Dish: {order_data.dish_name}")
-            existing_order.quantity = order_data.quantity
-            if order_data.note:
-                existing_order.note = order_data.note
-            existing_order.date = order_data.date
-            existing_order.time = order_data.time
-            db.commit()
-            db.refresh(existing_order)
-            return existing_order
-        else:
-            # Tạo order mới
-            print(f"Creating new order: Table {order_data.table_id}, Dish: {order_data.dish_name}, Qty: {order_data.quantity}")
-            db_order = Order(**order_data.model_dump())
-            db.add(db_order)
-            db.commit()
-            db.refresh(db_order)
-            return db_order
-            
+        print(f"Upserting order: Table {order_data.table_id}, Dish: {order_data.dish_name}, Qty: {order_data.quantity}")
+        # Nếu đã tồn tại, cập nhật quantity, note (khi có), và thời gian
+        update_fields = ["quantity", "date", "time"] + (["note"] if order_data.note else [])
+        order = upsert_order(db, order_data.model_dump(), update_fields)
+        result = OrderResponse.model_validate(order)
+        db.commit()
+        orders_committed(order_data.table_id, [upsert_event(result)])
+        return result
+
     except Exception as e:
         db.rollback()
         print(f"Error creating/updating order: {str(e)}")
@@ -125,13 +206,20 @@ def update_order_note(
     db: Session = Depends(get_db),
 ):
     decoded = unquote(dish_name)
+    changes = {"note": note_data.note or ""}
 
-    # tìm món theo tên, bỏ khoảng trắng và không phân biệt hoa thường
+    # write-behind: món đang chờ ghi -> gộp trong RAM, không đụng DB
+    pending = order_write_buffer.buffered(table_id, decoded, changes)
+    if pending is not None:
+        orders_buffered(table_id, [upsert_event(pending)])
+        return {"message": "ok", "order_id": pending.id, "note": pending.note}
+
+    # tìm món theo dish_key (đã chuẩn hóa lower/trim, có index)
     order = (
         db.query(Order)
         .filter(
             Order.table_id == table_id,
-            func.lower(func.trim(Order.dish_name)) == func.lower(func.trim(decoded)),
+            Order.dish_key == normalize_dish_name(decoded),
         )
         .first()
     )
@@ -141,44 +229,55 @@ def update_order_note(
             status_code=404,
             detail=f"Order not found for table {table_id} and dish '{decoded}'",
         )
+    if order_write_buffer.enabled:
+        pending = order_write_buffer.add(order, changes)
+        orders_buffered(table_id, [upsert_event(pending)])
+        return {"message": "ok", "order_id": pending.id, "note": pending.note}
 
-    order.note = note_data.note or ""
+    order.note = changes["note"]
+    result = {"message": "ok", "order_id": order.id, "note": order.note}
+    event = upsert_event(order)
     db.commit()
-    db.refresh(order)
-    return {"message": "ok", "order_id": order.id, "note": order.note}
+    orders_committed(table_id, [event])
+    return result
 
 @router.put("/table/{table_id}/dish/{dish_name}")
 def update_order_quantity(table_id: int, dish_name: str, quantity_data: dict, db: Session = Depends(get_db)):
-    """Update order quantity for specific table and dish"""
+    """Update order quantity for specific table and dish (created if missing)"""
     try:
         decoded_dish_name = unquote(dish_name)
         print(f"Updating order - Table: {table_id}, Dish: {decoded_dish_name}, Data: {quantity_data}")
-        
-        order = db.query(Order).filter(
-            Order.table_id == table_id,
-            Order.dish_name == decoded_dish_name
-        ).first()
-        
-        if not order:
-            print(f"Order not found, creating new order for table {table_id} and dish '{decoded_dish_name}'")
-            new_order = Order(
-                table_id=table_id,
-                dish_name=decoded_dish_name,
-                quantity=quantity_data.get('quantity', 1),
-                date=datetime.now().strftime("%Y-%m-%d"),
-                time=datetime.now().strftime("%H:%M:%S"),
-                note=''
-            )
-            db.add(new_order)
-            db.commit()
-            db.refresh(new_order)
-            return {"message": "Order created successfully", "order": new_order}
-        else:
-            order.quantity = quantity_data.get('quantity', order.quantity)
-            db.commit()
-            db.refresh(order)
-            return {"message": "Order quantity updated successfully", "order": order}
-            
+
+        # write-behind: gộp các lần bấm +/- của món đã có, ghi sau (món mới vẫn INSERT ngay bên dưới)
+        if order_write_buffer.enabled and 'quantity' in quantity_data:
+            changes = {"quantity": quantity_data['quantity']}
+            pending = order_write_buffer.buffered(table_id, decoded_dish_name, changes)
+            if pending is None:
+                existing = db.scalars(select(Order).where(
+                    Order.table_id == table_id, Order.dish_key == normalize_dish_name(decoded_dish_name)
+                )).first()
+                if existing is not None:
+                    pending = order_write_buffer.add(existing, changes)
+            if pending is not None:
+                orders_buffered(table_id, [upsert_event(pending)])
+                return {"message": "Order quantity updated successfully", "order": pending}
+
+        values = {
+            "table_id": table_id,
+            "dish_name": decoded_dish_name.strip(),
+            "quantity": quantity_data.get('quantity', 1),
+            "date": datetime.now().date(),
+            "time": datetime.now().time().replace(microsecond=0),
+            "note": '',
+        }
+        # Không gửi quantity -> giữ số lượng cũ (SET table_id = table_id để RETURNING vẫn trả dòng)
+        update_fields = ["quantity"] if 'quantity' in quantity_data else ["table_id"]
+        order = upsert_order(db, values, update_fields)
+        result = OrderResponse.model_validate(order)
+        db.commit()
+        orders_committed(table_id, [upsert_event(result)])
+        return {"message": "Order quantity updated successfully", "order": result}
+
     except Exception as e:
         db.rollback()
         print(f"Error updating order: {str(e)}")
@@ -187,9 +286,11 @@ def update_order_quantity(table_id: int, dish_name: str, quantity_data: dict, db
 @router.delete("/by-table/{table_id}")
 def delete_orders_by_table(table_id: int, db: Session = Depends(get_db)):
     """Delete all orders for a specific table"""
+    order_write_buffer.flush(table_id)
     try:
         num_deleted = db.query(Order).filter(Order.table_id == table_id).delete(synchronize_session=False)
         db.commit()
+        orders_committed(table_id, [clear_event(table_id)])
         
         if num_deleted == 0:
             # Vẫn trả về thành công nếu không có order nào để xóa
@@ -205,6 +306,7 @@ def delete_orders_by_table(table_id: int, db: Session = Depends(get_db)):
 @router.delete("/table/{table_id}/dish/{dish_name}")
 def delete_order_by_table_and_dish(table_id: int, dish_name: str, db: Session = Depends(get_db)):
     """Delete order by table ID and dish name"""
+    order_write_buffer.flush(table_id)
     # CẢI THIỆN: Đã làm gọn khối try...except
     try:
         decoded_dish_name = unquote(dish_name)
@@ -212,15 +314,17 @@ def delete_order_by_table_and_dish(table_id: int, dish_name: str, db: Session =
         
         order = db.query(Order).filter(
             Order.table_id == table_id,
-            Order.dish_name == decoded_dish_name
+            Order.dish_key == normalize_dish_name(decoded_dish_name)
         ).first()
         
         if not order:
             print(f"Order not found for table {table_id} and dish '{decoded_dish_name}'")
             raise HTTPException(status_code=404, detail=f"Order not found for table {table_id} and dish '{decoded_dish_name}'")
         
+        event = remove_event(table_id, order.dish_name)
         db.delete(order)
         db.commit()
+        orders_committed(table_id, [event])
         
         print(f"Successfully deleted order for table {table_id} and dish '{decoded_dish_name}'")
         return {"message": "Order deleted successfully"}
@@ -232,9 +336,11 @@ def delete_order_by_table_and_dish(table_id: int, dish_name: str, db: Session =
 @router.delete("/")
 def delete_all_orders(db: Session = Depends(get_db)):
     """Delete all orders (TRUNCATE equivalent)"""
+    order_write_buffer.flush(reason="all")
     try:
         db.query(Order).delete()
         db.commit()
+        orders_committed(None, [clear_event()])
         return {"message": "All orders deleted successfully"}
     except Exception as e:
         db.rollback()
@@ -247,6 +353,10 @@ def delete_order(order_id: int, db: Session = Depends(get_db)):
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     
+    table_id = order.table_id
+    order_write_buffer.flush(table_id)
+    event = remove_event(table_id, order.dish_name)
     db.delete(order)
     db.commit()
+    orders_committed(table_id, [event])
     return {"message": "Order deleted successfully"}
\ No newline at end of file
@@ -0,0 +1,332 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional
+from urllib.parse import unquote
+from datetime import datetime
+from sqlalchemy import select, insert, update, delete
+
+from app.database import get_async_db
+from app.models.models import Order, normalize_dish_name
+from app.schemas.schemas import OrderResponse, OrderCreate, AddOrderRequest, ReportResponse
+from app.routers.orders import NoteUpdate, ItemCreate, TableSyncRequest, CheckoutRequest
+from app.services.listing import apply_keyset, set_next_cursor, stream_ndjson_async, NDJSON_MEDIA_TYPE
+from app.services.table_sync import plan_table_sync, sync_events
+from app.services.order_upsert import upsert_order_async
+from app.services.checkout import checkout_table_async
+from app.services.order_cache import order_cache, table_key, versioned_key, ALL_ORDERS_KEY, serialize_orders
+from app.services.order_versions import order_versions
+from app.services.http_cache import weak_etag, etag_matches, cache_headers, not_modified
+from app.services.order_events import upsert_event, remove_event, clear_event
+from app.services.order_changes import orders_committed_async, orders_buffered_async
+from app.services.order_write_buffer import order_write_buffer
+
+# Bản async của app/routers/orders.py (bật bằng DB_ASYNC=true), giữ nguyên route và response
+router = APIRouter()
+
+@router.post("/table/{table_id}/item", response_model=OrderResponse)
+async def create_item(table_id: int, data: ItemCreate, db: AsyncSession = Depends(get_async_db)):
+    """Create or update an order item with note in ONE statement (INSERT ... ON CONFLICT)."""
+    await order_write_buffer.aflush(table_id)  # write-behind: ghi các lần bấm +/- đang chờ của bàn trước
+    values = {
+        "table_id": table_id,
+        "dish_name": data.dish_name.strip(),
+        "quantity": data.quantity,
+        "note": data.note or "",
+        "date": datetime.now().date(),
+        "time": datetime.now().time().replace(microsecond=0),
+    }
+    order = await upsert_order_async(db, values, ["quantity", "note", "date", "time"])
+    await db.commit()
+    await orders_committed_async(table_id, [upsert_event(order)])
+    return order
+
+@router.post("/table/{table_id}/sync", response_model=List[OrderResponse])
+async def sync_table_changes(table_id: int, data: TableSyncRequest, db: AsyncSession = Depends(get_async_db)):
+    """Apply a table's whole pending change list in ONE transaction, return the final state."""
+    await order_write_buffer.aflush(table_id)
+    try:
+        result = await db.execute(
+            select(Order.id, Order.dish_key, Order.dish_name).where(Order.table_id == table_id)
+        )
+        existing = result.all()
+        delete_ids, updates, inserts = plan_table_sync(table_id, data.changes, existing)
+
+        if delete_ids:
+            await db.execute(delete(Order).where(Order.id.in_(delete_ids)))
+        if updates:
+            await db.execute(update(Order), updates)
+        if inserts:
+            await db.execute(insert(Order), inserts)
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        print(f"Error syncing table {table_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error syncing table {table_id}: {str(e)}")
+
+    result = await db.execute(
+        select(Order).filter(Order.table_id == table_id).execution_options(populate_existing=True)
+    )
+    rows = result.scalars().all()
+    await orders_committed_async(table_id, sync_events(table_id, existing, delete_ids, updates, inserts, rows))
+    orders = serialize_orders(rows, OrderResponse)
+    return orders
+
+@router.post("/table/{table_id}/checkout", response_model=List[ReportResponse])
+async def checkout_table_orders(table_id: int, bill: CheckoutRequest, db: AsyncSession = Depends(get_async_db)):
+    """Move a table's orders into report and clear the table in ONE transaction."""
+    await order_write_buffer.aflush(table_id)  # flush-on-checkout: report phải có số lượng / note mới nhất
+    try:
+        reports = [ReportResponse.model_validate(r) for r in await checkout_table_async(db, table_id, bill)]
+        await db.commit()
+    except HTTPException:
+        await db.rollback()
+        raise
+    except Exception as e:
+        await db.rollback()
+        print(f"Error checking out table {table_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error checking out table {table_id}: {str(e)}")
+
+    await orders_committed_async(table_id, [clear_event(table_id)])
+    print(f"Checked out table {table_id}: {len(reports)} report rows")
+    return reports
+
+@router.get("/", response_model=List[OrderResponse])
+async def get_all_orders(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    format: Literal["json", "ndjson"] = "json",
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Get all orders (limit/cursor -> keyset pages by id, format=ndjson -> streamed, full list -> ETag / 304)"""
+    if format == "ndjson":
+        stmt = apply_keyset(select(Order), Order.id, cursor, limit)
+        return StreamingResponse(stream_ndjson_async(stmt, OrderResponse), media_type=NDJSON_MEDIA_TYPE)
+    if limit is None and cursor is None:
+        # Đọc version TRƯỚC dữ liệu: ghi xen giữa -> lần sau ra version mới, không giữ tag cũ cho dữ liệu mới
+        version = await order_versions.aall_version()
+        if version is not None:
+            etag = weak_etag(version)
+            if etag_matches(request, etag):
+                return not_modified(etag)
+            response.headers.update(cache_headers(etag))
+        key = versioned_key(ALL_ORDERS_KEY, version)
+        orders = await order_cache.aget(key)
+        if orders is None:
+            result = await db.execute(select(Order).order_by(Order.dish_name))
+            orders = serialize_orders(result.scalars().all(), OrderResponse)
+            await order_cache.aset(key, orders)
+        return order_write_buffer.overlay(orders)  # cache = trạng thái DB, thêm thay đổi đang chờ ghi
+
+    limit = limit or 100
+    result = await db.execute(apply_keyset(select(Order), Order.id, cursor, limit))
+    orders = result.scalars().all()
+    set_next_cursor(response, orders, limit)
+    return orders
+
+@router.get("/cache/stats")
+async def get_order_cache_stats():
+    """Hit / miss counters of the order read cache"""
+    return order_cache.stats()
+
+@router.get("/table/{table_id}", response_model=List[OrderResponse])
+async def get_orders_by_table(table_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+    """Get orders by table ID (read-through Redis cache, ETag / If-None-Match -> 304 Not Modified)"""
+    version = await order_versions.atable_version(table_id)
+    if version is not None:
+        etag = weak_etag(version)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        response.headers.update(cache_headers(etag))
+    key = versioned_key(table_key(table_id), version)
+    orders = await order_cache.aget(key)
+    if orders is None:
+        result = await db.execute(select(Order).filter(Order.table_id == table_id))
+        orders = serialize_orders(result.scalars().all(), OrderResponse)
+        await order_cache.aset(key, orders)
+    return order_write_buffer.overlay(orders, table_id)  # cache = trạng thái DB, thêm thay đổi đang chờ ghi
+
+@router.post("/", response_model=OrderResponse)
+async def create_order(order_request: AddOrderRequest, db: AsyncSession = Depends(get_async_db)):
+    """Create a new order or update existing one"""
+    await order_write_buffer.aflush(order_request.table_id)
+    order_data = OrderCreate(
+        table_id=order_request.table_id,
+        date=order_request.date,
+        time=order_request.time,
+        dish_name=order_request.dish_name,
+        quantity=order_request.quantity,
+        note=order_request.note or ''
+    )
+
+    try:
+        print(f"Upserting order: Table {order_data.table_id}, Dish: {order_data.dish_name}, Qty: {order_data.quantity}")
+        update_fields = ["quantity", "date", "time"] + (["note"] if order_data.note else [])
+        order = await upsert_order_async(db, order_data.model_dump(), update_fields)
+        await db.commit()
+        await orders_committed_async(order_data.table_id, [upsert_event(order)])
+        return order
+
+    except Exception as e:
+        await db.rollback()
+        print(f"Error creating/updating order: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error creating/updating order: {str(e)}")
+
+@router.put("/table/{table_id}/dish/{dish_name}/note")
+async def update_order_note(
+    table_id: int,
+    dish_name: str,
+    note_data: NoteUpdate,
+    db: AsyncSession = Depends(get_async_db),
+):
+    decoded = unquote(dish_name)
+    changes = {"note": note_data.note or ""}
+
+    # write-behind: món đang chờ ghi -> gộp trong RAM, không đụng DB
+    pending = order_write_buffer.buffered(table_id, decoded, changes)
+    if pending is not None:
+        await orders_buffered_async(table_id, [upsert_event(pending)])
+        return {"message": "ok", "order_id": pending.id, "note": pending.note}
+
+    result = await db.execute(
+        select(Order)
+        .filter(
+            Order.table_id == table_id,
+            Order.dish_key == normalize_dish_name(decoded),
+        )
+        .limit(1)
+    )
+    order = result.scalars().first()
+    if not order:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Order not found for table {table_id} and dish '{decoded}'",
+        )
+    if order_write_buffer.enabled:
+        pending = order_write_buffer.add(order, changes)
+        await orders_buffered_async(table_id, [upsert_event(pending)])
+        return {"message": "ok", "order_id": pending.id, "note": pending.note}
+
+    order.note = changes["note"]
+    await db.commit()
+    await orders_committed_async(table_id, [upsert_event(order)])
+    return {"message": "ok", "order_id": order.id, "note": order.note}
+
+@router.put("/table/{table_id}/dish/{dish_name}")
+async def update_order_quantity(table_id: int, dish_name: str, quantity_data: dict, db: AsyncSession = Depends(get_async_db)):
+    """Update order quantity for specific table and dish (created if missing)"""
+    try:
+        decoded_dish_name = unquote(dish_name)
+        print(f"Updating order - Table: {table_id}, Dish: {decoded_dish_name}, Data: {quantity_data}")
+
+        # write-behind: gộp các lần bấm +/- của món đã có, ghi sau (món mới vẫn INSERT ngay bên dưới)
+        if order_write_buffer.enabled and 'quantity' in quantity_data:
+            changes = {"quantity": quantity_data['quantity']}
+            pending = order_write_buffer.buffered(table_id, decoded_dish_name, changes)
+            if pending is None:
+                existing = (await db.scalars(select(Order).where(
+                    Order.table_id == table_id, Order.dish_key == normalize_dish_name(decoded_dish_name)
+                ))).first()
+                if existing is not None:
+                    pending = order_write_buffer.add(existing, changes)
+            if pending is not None:
+                await orders_buffered_async(table_id, [upsert_event(pending)])
+                return {"message": "Order quantity updated successfully", "order": OrderResponse.model_validate(pending)}
+
+        values = {
+            "table_id": table_id,
+            "dish_name": decoded_dish_name.strip(),
+            "quantity": quantity_data.get('quantity', 1),
+            "date": datetime.now().date(),
+            "time": datetime.now().time().replace(microsecond=0),
+            "note": '',
+        }
+        # Không gửi quantity -> giữ số lượng cũ (SET table_id = table_id để RETURNING vẫn trả dòng)
+        update_fields = ["quantity"] if 'quantity' in quantity_data else ["table_id"]
+        order = await upsert_order_async(db, values, update_fields)
+        result = OrderResponse.model_validate(order)
+        await db.commit()
+        await orders_committed_async(table_id, [upsert_event(result)])
+        return {"message": "Order quantity updated successfully", "order": result}
+
+    except Exception as e:
+        await db.rollback()
+        print(f"Error updating order: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error updating order: {str(e)}")
+
+@router.delete("/by-table/{table_id}")
+async def delete_orders_by_table(table_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Delete all orders for a specific table"""
+    await order_write_buffer.aflush(table_id)
+    try:
+        result = await db.execute(delete(Order).where(Order.table_id == table_id))
+        num_deleted = result.rowcount
+        await db.commit()
+        await orders_committed_async(table_id, [clear_event(table_id)])
+
+        if num_deleted == 0:
+            print(f"No orders found for table {table_id} to delete.")
+
+        print(f"Successfully deleted {num_deleted} orders for table {table_id}")
+        return {"message": f"Successfully deleted {num_deleted} orders for table {table_id}"}
+    except Exception as e:
+        await db.rollback()
+        print(f"Error deleting orders for table {table_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error deleting orders for table {table_id}: {str(e)}")
+
+@router.delete("/table/{table_id}/dish/{dish_name}")
+async def delete_order_by_table_and_dish(table_id: int, dish_name: str, db: AsyncSession = Depends(get_async_db)):
+    """Delete order by table ID and dish name"""
+    await order_write_buffer.aflush(table_id)
+    decoded_dish_name = unquote(dish_name)
+    print(f"Deleting order - Table: {table_id}, Dish: {decoded_dish_name}")
+    try:
+        result = await db.execute(
+            delete(Order).where(
+                Order.table_id == table_id,
+                Order.dish_key == normalize_dish_name(decoded_dish_name)
+            )
+        )
+        num_deleted = result.rowcount
+        await db.commit()
+        if num_deleted:
+            await orders_committed_async(table_id, [remove_event(table_id, decoded_dish_name.strip())])
+    except Exception as e:
+        await db.rollback()
+        print(f"Error deleting order: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error deleting order: {str(e)}")
+
+    if num_deleted == 0:
+        print(f"Order not found for table {table_id} and dish '{decoded_dish_name}'")
+        raise HTTPException(status_code=404, detail=f"Order not found for table {table_id} and dish '{decoded_dish_name}'")
+
+    print(f"Successfully deleted order for table {table_id} and dish '{decoded_dish_name}'")
+    return {"message": "Order deleted successfully"}
+
+@router.delete("/")
+async def delete_all_orders(db: AsyncSession = Depends(get_async_db)):
+    """Delete all orders (TRUNCATE equivalent)"""
+    await order_write_buffer.aflush(reason="all")
+    try:
+        await db.execute(delete(Order))
+        await db.commit()
+        await orders_committed_async(None, [clear_event()])
+        return {"message": "All orders deleted successfully"}
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error deleting orders: {str(e)}")
+
+@router.delete("/{order_id}")
+async def delete_order(order_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Delete a specific order"""
+    order = await db.get(Order, order_id)
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+
+    await order_write_buffer.aflush(order.table_id)
+    await db.delete(order)
+    await db.commit()
+    await orders_committed_async(order.table_id, [remove_event(order.table_id, order.dish_name)])
+    return {"message": "Order deleted successfully"}
@@ -0,0 +1,218 @@
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from typing import List, Optional
+from urllib.parse import unquote
+from datetime import datetime
+
+from app.models.models import normalize_dish_name
+from app.schemas.schemas import OrderResponse, OrderCreate, AddOrderRequest, ReportResponse
+from app.routers.orders import NoteUpdate, ItemCreate, TableSyncRequest, CheckoutRequest
+from app.services.order_store import live_orders, run_in_session
+from app.services.dish_catalog import dish_catalog
+from app.services.checkout import checkout_report_rows
+from app.services.report_batch import insert_reports
+from app.services.listing import decode_cursor, set_next_cursor
+from app.services.table_sync import plan_table_sync, sync_events
+from app.services.http_cache import weak_etag, etag_matches, cache_headers, not_modified
+from app.services.order_events import upsert_event, remove_event, clear_event
+from app.services.order_changes import orders_live_changed
+
+# Bản STORAGE_BACKEND=memory của app/routers/orders.py: cùng route / response, đọc ghi trên
+# app/services/order_store.py (RAM, 1 worker), DB được ghi nền qua journal. Chỉ checkout chạm DB ngay
+# (report phải nằm trong DB trước khi bàn được xóa).
+router = APIRouter()
+
+async def _ready():
+    if not await live_orders.ready():
+        raise HTTPException(status_code=503, detail=f"Live order store not loaded: {live_orders.error}")
+
+async def _catalog():
+    # Thực đơn còn hạn -> không đụng DB
+    return dish_catalog.snapshot or await run_in_session(dish_catalog.ensure)
+
+def _dish_id(catalog, dish_name: str) -> Optional[int]:
+    dish = catalog.by_key.get(normalize_dish_name(dish_name))
+    return dish.id if dish else None
+
+async def _with_dish_id(values: dict) -> dict:
+    """dish_id cho trường hợp thêm món mới (default Python của model chỉ chạy lúc INSERT)"""
+    return {**values, "dish_id": _dish_id(await _catalog(), values["dish_name"])}
+
+def _list_response(request: Request, table_id: Optional[int] = None) -> Response:
+    version, body = live_orders.body(table_id)
+    etag = weak_etag(version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return Response(body, media_type="application/json", headers=cache_headers(etag))
+
+@router.post("/table/{table_id}/item", response_model=OrderResponse)
+async def create_item(table_id: int, data: ItemCreate):
+    """Create or update an order item with note (in memory, written to the DB in the background)."""
+    await _ready()
+    values = await _with_dish_id({
+        "table_id": table_id,
+        "dish_name": data.dish_name.strip(),
+        "quantity": data.quantity,
+        "note": data.note or "",
+        "date": datetime.now().date(),
+        "time": datetime.now().time().replace(microsecond=0),
+    })
+    order = live_orders.upsert(values, ["quantity", "note", "date", "time"])
+    await orders_live_changed([upsert_event(order)])
+    return order
+
+@router.post("/table/{table_id}/sync", response_model=List[OrderResponse])
+async def sync_table_changes(table_id: int, data: TableSyncRequest):
+    """Apply a table's whole pending change list atomically in memory, return the final state."""
+    await _ready()
+    catalog = await _catalog()
+    # Từ đây tới apply không có await -> không ghi nào khác chen vào bàn này
+    existing = live_orders.table_orders(table_id)
+    delete_ids, updates, inserts = plan_table_sync(table_id, data.changes, existing)
+    for values in inserts:
+        values["dish_id"] = _dish_id(catalog, values["dish_name"])
+    orders = live_orders.apply_sync(table_id, delete_ids, updates, inserts)
+    await orders_live_changed(sync_events(table_id, existing, delete_ids, updates, inserts, orders))
+    return orders
+
+@router.post("/table/{table_id}/checkout", response_model=List[ReportResponse])
+async def checkout_table_orders(table_id: int, bill: CheckoutRequest):
+    """Write the table's report rows to the DB, then clear exactly those orders from memory."""
+    await _ready()
+    orders = live_orders.table_orders(table_id)
+    if not orders:
+        return []
+
+    def write_reports(db):
+        rows = checkout_report_rows(orders, bill, dish_catalog.ensure(db))
+        reports = [ReportResponse.model_validate(r) for r in insert_reports(db, rows)]
+        db.commit()
+        return reports
+
+    try:
+        reports = await run_in_session(write_reports)
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error checking out table {table_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error checking out table {table_id}: {str(e)}")
+
+    # Chỉ xóa các dòng đã chuyển: món thêm vào trong lúc ghi report vẫn còn trên bàn
+    live_orders.remove([o.id for o in orders])
+    await orders_live_changed([clear_event(table_id)])
+    print(f"Checked out table {table_id}: {len(reports)} report rows")
+    return reports
+
+@router.get("/", response_model=List[OrderResponse])
+async def get_all_orders(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
+):
+    """Get all orders (limit/cursor -> pages by id, full list -> ETag / 304)"""
+    await _ready()
+    if limit is None and cursor is None:
+        return _list_response(request)
+
+    limit = limit or 100
+    last_id = decode_cursor(cursor) or 0
+    orders = sorted((o for o in live_orders.all_orders() if o.id > last_id), key=lambda o: o.id)[:limit]
+    set_next_cursor(response, orders, limit)
+    return orders
+
+@router.get("/table/{table_id}", response_model=List[OrderResponse])
+async def get_orders_by_table(table_id: int, request: Request):
+    """Get orders by table ID (served from memory, ETag / If-None-Match -> 304 Not Modified)"""
+    await _ready()
+    return _list_response(request, table_id)
+
+@router.post("/", response_model=OrderResponse)
+async def create_order(order_request: AddOrderRequest):
+    """Create a new order or update existing one"""
+    await _ready()
+    order_data = OrderCreate(
+        table_id=order_request.table_id,
+        date=order_request.date,
+        time=order_request.time,
+        dish_name=order_request.dish_name,
+        quantity=order_request.quantity,
+        note=order_request.note or ''
+    )
+    update_fields = ["quantity", "date", "time"] + (["note"] if order_data.note else [])
+    order = live_orders.upsert(await _with_dish_id(order_data.model_dump()), update_fields)
+    await orders_live_changed([upsert_event(order)])
+    return order
+
+@router.put("/table/{table_id}/dish/{dish_name}/note")
+async def update_order_note(table_id: int, dish_name: str, note_data: NoteUpdate):
+    await _ready()
+    decoded = unquote(dish_name)
+    order = live_orders.update(table_id, decoded, {"note": note_data.note or ""})
+    if order is None:
+        # trả 404 thật, FE sẽ bỏ pending cho món không còn tồn tại
+        raise HTTPException(
+            status_code=404,
+            detail=f"Order not found for table {table_id} and dish '{decoded}'",
+        )
+    await orders_live_changed([upsert_event(order)])
+    return {"message": "ok", "order_id": order.id, "note": order.note}
+
+@router.put("/table/{table_id}/dish/{dish_name}")
+async def update_order_quantity(table_id: int, dish_name: str, quantity_data: dict):
+    """Update order quantity for specific table and dish (created if missing)"""
+    await _ready()
+    decoded_dish_name = unquote(dish_name)
+    values = await _with_dish_id({
+        "table_id": table_id,
+        "dish_name": decoded_dish_name.strip(),
+        "quantity": quantity_data.get('quantity', 1),
+        "date": datetime.now().date(),
+        "time": datetime.now().time().replace(microsecond=0),
+        "note": '',
+    })
+    # Không gửi quantity -> giữ số lượng cũ
+    update_fields = ["quantity"] if 'quantity' in quantity_data else []
+    order = live_orders.upsert(values, update_fields)
+    await orders_live_changed([upsert_event(order)])
+    return {"message": "Order quantity updated successfully", "order": order}
+
+@router.delete("/by-table/{table_id}")
+async def delete_orders_by_table(table_id: int):
+    """Delete all orders for a specific table"""
+    await _ready()
+    num_deleted = len(live_orders.remove_table(table_id))
+    await orders_live_changed([clear_event(table_id)])
+    print(f"Successfully deleted {num_deleted} orders for table {table_id}")
+    return {"message": f"Successfully deleted {num_deleted} orders for table {table_id}"}
+
+@router.delete("/table/{table_id}/dish/{dish_name}")
+async def delete_order_by_table_and_dish(table_id: int, dish_name: str):
+    """Delete order by table ID and dish name"""
+    await _ready()
+    decoded_dish_name = unquote(dish_name)
+    if not live_orders.remove_table(table_id, decoded_dish_name):
+        print(f"Order not found for table {table_id} and dish '{decoded_dish_name}'")
+        raise HTTPException(status_code=404, detail=f"Order not found for table {table_id} and dish '{decoded_dish_name}'")
+
+    await orders_live_changed([remove_event(table_id, decoded_dish_name.strip())])
+    return {"message": "Order deleted successfully"}
+
+@router.delete("/")
+async def delete_all_orders():
+    """Delete all orders (TRUNCATE equivalent)"""
+    await _ready()
+    live_orders.clear()
+    await orders_live_changed([clear_event()])
+    return {"message": "All orders deleted successfully"}
+
+@router.delete("/{order_id}")
+async def delete_order(order_id: int):
+    """Delete a specific order"""
+    await _ready()
+    removed = live_orders.remove([order_id])
+    if not removed:
+        raise HTTPException(status_code=404, detail="Order not found")
+
+    order = removed[0]
+    await orders_live_changed([remove_event(order.table_id, order.dish_name)])
+    return {"message": "Order deleted successfully"}
@@ -0,0 +1,251 @@
+import asyncio
+from fastapi import APIRouter, HTTPException, Query, Response
+from typing import List, Optional
+from types import SimpleNamespace
+from urllib.parse import unquote
+from datetime import datetime
+
+from app.models.models import normalize_dish_name
+from app.schemas.schemas import OrderResponse, OrderCreate, AddOrderRequest, ReportResponse
+from app.routers.orders import NoteUpdate, ItemCreate, TableSyncRequest, CheckoutRequest
+from app.services.supabase_service import supabase_service
+from app.services.dish_catalog import dish_catalog
+from app.services.checkout import checkout_report_rows
+from app.services.listing import decode_cursor, set_next_cursor
+from app.services.table_sync import plan_table_sync, sync_events
+from app.services.order_events import upsert_event, remove_event, clear_event
+from app.services.order_changes import orders_committed_async
+
+# Bản STORAGE_BACKEND=supabase của app/routers/orders.py: cùng route / response, dữ liệu đọc ghi qua
+# PostgREST (app/services/supabase_service.py). REST không có transaction nhiều câu lệnh -> sync và
+# checkout chạy thành nhiều request nối tiếp (không atomic); write-behind không dùng ở chế độ này.
+router = APIRouter()
+
+def _rows(rows: List[dict]) -> List[SimpleNamespace]:
+    # plan_table_sync / bill_total / sync_events đọc thuộc tính (.id, .dish_key, ...) như dòng SQLAlchemy
+    return [SimpleNamespace(**row) for row in rows]
+
+async def _with_dish(values: dict) -> dict:
+    """Thêm dish_key + dish_id (Postgres không có default Python của model -> client phải gửi)"""
+    catalog = await dish_catalog.ensure_rows_async(supabase_service.get_dishes)
+    key = normalize_dish_name(values["dish_name"])
+    dish = catalog.by_key.get(key)
+    return {**values, "dish_key": key, "dish_id": dish.id if dish else None}
+
+async def _upsert_order(values: dict, update_fields: List[str]) -> dict:
+    """
+    Giống upsert_order (INSERT ... ON CONFLICT chỉ SET update_fields): PATCH dòng đã có trước,
+    chưa có -> INSERT; 2 request chèn cùng lúc -> on_conflict gộp vào dòng vừa tạo.
+    """
+    key = normalize_dish_name(values["dish_name"])
+    changes = {field: values[field] for field in update_fields}
+    if changes:
+        order = await supabase_service.update_order(values["table_id"], key, changes)
+    else:
+        rows = await supabase_service.select(
+            "order_list", table_id=f"eq.{values['table_id']}", dish_key=f"eq.{key}"
+        )
+        order = rows[0] if rows else None
+    if order is None:
+        rows = await supabase_service.upsert_orders([await _with_dish(values)])
+        order = rows[0]
+    return order
+
+@router.post("/table/{table_id}/item", response_model=OrderResponse)
+async def create_item(table_id: int, data: ItemCreate):
+    """Create or update an order item with note (PATCH, INSERT if missing)."""
+    values = {
+        "table_id": table_id,
+        "dish_name": data.dish_name.strip(),
+        "quantity": data.quantity,
+        "note": data.note or "",
+        "date": datetime.now().date(),
+        "time": datetime.now().time().replace(microsecond=0),
+    }
+    order = OrderResponse.model_validate(await _upsert_order(values, ["quantity", "note", "date", "time"]))
+    await orders_committed_async(table_id, [upsert_event(order)])
+    return order
+
+@router.post("/table/{table_id}/sync", response_model=List[OrderResponse])
+async def sync_table_changes(table_id: int, data: TableSyncRequest):
+    """Apply a table's pending change list with batched requests (DELETE in.(), parallel PATCH, bulk INSERT)."""
+    try:
+        existing = _rows(await supabase_service.get_orders_by_table(table_id))
+        delete_ids, updates, inserts = plan_table_sync(table_id, data.changes, existing)
+
+        if delete_ids:
+            await supabase_service.delete_orders(delete_ids)
+        if updates:
+            await asyncio.gather(*(
+                supabase_service.update("order_list", {k: v for k, v in u.items() if k != "id"}, id=f"eq.{u['id']}")
+                for u in updates
+            ))
+        if inserts:
+            await supabase_service.upsert_orders([await _with_dish(i) for i in inserts])
+        final = await supabase_service.get_orders_by_table(table_id)
+    except Exception as e:
+        print(f"Error syncing table {table_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error syncing table {table_id}: {str(e)}")
+
+    orders = [OrderResponse.model_validate(row) for row in final]
+    await orders_committed_async(table_id, sync_events(table_id, existing, delete_ids, updates, inserts, _rows(final)))
+    return orders
+
+@router.post("/table/{table_id}/checkout", response_model=List[ReportResponse])
+async def checkout_table_orders(table_id: int, bill: CheckoutRequest):
+    """Move a table's orders into report (bulk INSERT), then delete exactly those orders."""
+    try:
+        orders = _rows(await supabase_service.get_orders_by_table(table_id))
+        if not orders:
+            return []
+        catalog = await dish_catalog.ensure_rows_async(supabase_service.get_dishes)
+        reports = await supabase_service.create_reports(checkout_report_rows(orders, bill, catalog))
+        # Chỉ xóa các dòng đã chuyển: món thêm vào trong lúc checkout vẫn còn trên bàn
+        await supabase_service.delete_orders([o.id for o in orders])
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error checking out table {table_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error checking out table {table_id}: {str(e)}")
+
+    await orders_committed_async(table_id, [clear_event(table_id)])
+    print(f"Checked out table {table_id}: {len(reports)} report rows")
+    return reports
+
+@router.get("/", response_model=List[OrderResponse])
+async def get_all_orders(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
+):
+    """Get all orders (limit/cursor -> keyset pages by id)"""
+    if limit is None and cursor is None:
+        return await supabase_service.get_all_orders()
+
+    limit = limit or 100
+    params = {"order": "id.asc", "limit": limit}
+    last_id = decode_cursor(cursor)
+    if last_id is not None:
+        params["id"] = f"gt.{last_id}"
+    orders = [OrderResponse.model_validate(row) for row in await supabase_service.select("order_list", **params)]
+    set_next_cursor(response, orders, limit)
+    return orders
+
+@router.get("/table/{table_id}", response_model=List[OrderResponse])
+async def get_orders_by_table(table_id: int):
+    """Get orders by table ID"""
+    return await supabase_service.get_orders_by_table(table_id)
+
+@router.post("/", response_model=OrderResponse)
+async def create_order(order_request: AddOrderRequest):
+    """Create a new order or update existing one"""
+    order_data = OrderCreate(
+        table_id=order_request.table_id,
+        date=order_request.date,
+        time=order_request.time,
+        dish_name=order_request.dish_name,
+        quantity=order_request.quantity,
+        note=order_request.note or ''
+    )
+
+    try:
+        print(f"Upserting order: Table {order_data.table_id}, Dish: {order_data.dish_name}, Qty: {order_data.quantity}")
+        update_fields = ["quantity", "date", "time"] + (["note"] if order_data.note else [])
+        order = OrderResponse.model_validate(await _upsert_order(order_data.model_dump(), update_fields))
+        await orders_committed_async(order_data.table_id, [upsert_event(order)])
+        return order
+
+    except Exception as e:
+        print(f"Error creating/updating order: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error creating/updating order: {str(e)}")
+
+@router.put("/table/{table_id}/dish/{dish_name}/note")
+async def update_order_note(table_id: int, dish_name: str, note_data: NoteUpdate):
+    decoded = unquote(dish_name)
+    order = await supabase_service.update_order(table_id, normalize_dish_name(decoded), {"note": note_data.note or ""})
+    if order is None:
+        # trả 404 thật, FE sẽ bỏ pending cho món không còn tồn tại
+        raise HTTPException(
+            status_code=404,
+            detail=f"Order not found for table {table_id} and dish '{decoded}'",
+        )
+    order = OrderResponse.model_validate(order)
+    await orders_committed_async(table_id, [upsert_event(order)])
+    return {"message": "ok", "order_id": order.id, "note": order.note}
+
+@router.put("/table/{table_id}/dish/{dish_name}")
+async def update_order_quantity(table_id: int, dish_name: str, quantity_data: dict):
+    """Update order quantity for specific table and dish (created if missing)"""
+    try:
+        decoded_dish_name = unquote(dish_name)
+        print(f"Updating order - Table: {table_id}, Dish: {decoded_dish_name}, Data: {quantity_data}")
+        values = {
+            "table_id": table_id,
+            "dish_name": decoded_dish_name.strip(),
+            "quantity": quantity_data.get('quantity', 1),
+            "date": datetime.now().date(),
+            "time": datetime.now().time().replace(microsecond=0),
+            "note": '',
+        }
+        # Không gửi quantity -> giữ số lượng cũ
+        update_fields = ["quantity"] if 'quantity' in quantity_data else []
+        order = OrderResponse.model_validate(await _upsert_order(values, update_fields))
+        await orders_committed_async(table_id, [upsert_event(order)])
+        return {"message": "Order quantity updated successfully", "order": order}
+
+    except Exception as e:
+        print(f"Error updating order: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error updating order: {str(e)}")
+
+@router.delete("/by-table/{table_id}")
+async def delete_orders_by_table(table_id: int):
+    """Delete all orders for a specific table"""
+    try:
+        await supabase_service.delete_orders_by_table(table_id)
+        await orders_committed_async(table_id, [clear_event(table_id)])
+        print(f"Successfully deleted orders for table {table_id}")
+        return {"message": f"Successfully deleted orders for table {table_id}"}
+    except Exception as e:
+        print(f"Error deleting orders for table {table_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error deleting orders for table {table_id}: {str(e)}")
+
+@router.delete("/table/{table_id}/dish/{dish_name}")
+async def delete_order_by_table_and_dish(table_id: int, dish_name: str):
+    """Delete order by table ID and dish name"""
+    decoded_dish_name = unquote(dish_name)
+    print(f"Deleting order - Table: {table_id}, Dish: {decoded_dish_name}")
+    try:
+        deleted = await supabase_service.delete_orders_by_table(table_id, normalize_dish_name(decoded_dish_name))
+        if deleted:
+            await orders_committed_async(table_id, [remove_event(table_id, decoded_dish_name.strip())])
+    except Exception as e:
+        print(f"Error deleting order: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error deleting order: {str(e)}")
+
+    if not deleted:
+        print(f"Order not found for table {table_id} and dish '{decoded_dish_name}'")
+        raise HTTPException(status_code=404, detail=f"Order not found for table {table_id} and dish '{decoded_dish_name}'")
+
+    print(f"Successfully deleted order for table {table_id} and dish '{decoded_dish_name}'")
+    return {"message": "Order deleted successfully"}
+
+@router.delete("/")
+async def delete_all_orders():
+    """Delete all orders (TRUNCATE equivalent)"""
+    try:
+        await supabase_service.delete_all_orders()
+        await orders_committed_async(None, [clear_event()])
+        return {"message": "All orders deleted successfully"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error deleting orders: {str(e)}")
+
+@router.delete("/{order_id}")
+async def delete_order(order_id: int):
+    """Delete a specific order"""
+    rows = await supabase_service.delete("order_list", id=f"eq.{order_id}")
+    if not rows:
+        raise HTTPException(status_code=404, detail="Order not found")
+
+    order = rows[0]
+    await orders_committed_async(order["table_id"], [remove_event(order["table_id"], order["dish_name"])])
+    return {"message": "Order deleted successfully"}
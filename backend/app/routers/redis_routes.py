@@ -1,23 +1,23 @@
 from fastapi import APIRouter, HTTPException
-import redis
+from typing import Dict, Optional
 import json
-from app.config import settings
+from app.redis_client import get_redis
 
 router = APIRouter()
 
-# Redis connection
+# Layout: mỗi bàn 1 hash "tables:{table_id}" (field = tên món, value = JSON của món),
+# "tables:index" là set các bàn đang có dữ liệu.
+TABLE_INDEX_KEY = "tables:index"
+
+def table_hash_key(table_id: int) -> str:
+    return f"tables:{table_id}"
+
+def decode_table(raw: Dict[str, str]) -> Dict[str, dict]:
+    return {field: json.loads(value) for field, value in raw.items()}
+
 def get_redis_client():
-    try:
-        client = redis.Redis(
-            host=settings.REDIS_HOST,
-            port=settings.REDIS_PORT,
-            username=settings.REDIS_USERNAME,
-            password=settings.REDIS_PASSWORD,
-            decode_responses=True
-        )
-        return client
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Redis connection error: {str(e)}")
+    """Client dùng connection pool chung (tạo trong lifespan của app)"""
+    return get_redis()
 
 @router.get("/check")
 def check_redis_data():
@@ -29,28 +29,118 @@ def check_redis_data():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error checking Redis: {str(e)}")
 
-@router.get("/data")
+@router.get("/tables")
+def get_tables(ids: Optional[str] = None):
+    """Get several tables in one pipelined round trip (ids=1,2,3; default: every table)"""
+    try:
+        client = get_redis_client()
+        if ids:
+            table_ids = [int(i) for i in ids.split(",") if i.strip()]
+        else:
+            table_ids = sorted(int(i) for i in client.smembers(TABLE_INDEX_KEY))
+
+        pipe = client.pipeline(transaction=False)
+        for table_id in table_ids:
+            pipe.hgetall(table_hash_key(table_id))
+        results = pipe.execute()
+        return {"tables": {str(t): decode_table(raw) for t, raw in zip(table_ids, results)}}
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid table ids '{ids}'")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving tables from Redis: {str(e)}")
+
+@router.post("/tables")
+def set_tables(tables: Dict[int, Dict[str, dict]]):
+    """Replace several tables in one MULTI/EXEC pipeline"""
+    try:
+        client = get_redis_client()
+        pipe = client.pipeline(transaction=True)
+        for table_id, items in tables.items():
+            key = table_hash_key(table_id)
+            pipe.delete(key)
+            if items:
+                pipe.hset(key, mapping={dish: json.dumps(item) for dish, item in items.items()})
+                pipe.sadd(TABLE_INDEX_KEY, table_id)
+            else:
+                pipe.srem(TABLE_INDEX_KEY, table_id)
+        pipe.execute()
+        return {"message": f"Saved {len(tables)} tables"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error saving tables to Redis: {str(e)}")
+
+@router.get("/tables/{table_id}")
+def get_table(table_id: int):
+    """Get one table without reading the others"""
+    try:
+        client = get_redis_client()
+        return {"table_id": table_id, "items": decode_table(client.hgetall(table_hash_key(table_id)))}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving table {table_id} from Redis: {str(e)}")
+
+@router.put("/tables/{table_id}")
+def set_table(table_id: int, items: Dict[str, dict]):
+    """Replace one table"""
+    return set_tables({table_id: items})
+
+@router.patch("/tables/{table_id}")
+def update_table(table_id: int, items: Dict[str, Optional[dict]]):
+    """Update only the given dishes of one table (null -> remove the dish)"""
+    try:
+        client = get_redis_client()
+        key = table_hash_key(table_id)
+        upserts = {dish: json.dumps(item) for dish, item in items.items() if item is not None}
+        removals = [dish for dish, item in items.items() if item is None]
+
+        pipe = client.pipeline(transaction=True)
+        if upserts:
+            pipe.hset(key, mapping=upserts)
+            pipe.sadd(TABLE_INDEX_KEY, table_id)
+        if removals:
+            pipe.hdel(key, *removals)
+        pipe.hlen(key)
+        remaining = pipe.execute()[-1]
+        if remaining == 0:
+            client.srem(TABLE_INDEX_KEY, table_id)
+        return {"message": "Table updated successfully", "items": remaining}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error updating table {table_id} in Redis: {str(e)}")
+
+@router.delete("/tables/{table_id}")
+def delete_table(table_id: int):
+    """Delete one table"""
+    try:
+        client = get_redis_client()
+        pipe = client.pipeline(transaction=True)
+        pipe.delete(table_hash_key(table_id))
+        pipe.srem(TABLE_INDEX_KEY, table_id)
+        pipe.execute()
+        return {"message": f"Table {table_id} deleted successfully"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error deleting table {table_id} from Redis: {str(e)}")
+
+# --- Legacy: toàn bộ state trong 1 chuỗi JSON "myArray" (dùng /tables thay thế) ---
+@router.get("/data", deprecated=True)
 def get_redis_data():
     """Get data from Redis"""
     try:
         client = get_redis_client()
         key = "myArray"
         data = client.get(key)
-        
+
         if data is None:
             return {"data": None, "message": "No data found"}
-        
+
         # Try to parse as JSON
         try:
             parsed_data = json.loads(data)
             return {"data": parsed_data}
         except json.JSONDecodeError:
             return {"data": data}
-            
+
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving data from Redis: {str(e)}")
 
-@router.post("/data")
+@router.post("/data", deprecated=True)
 def set_redis_data(data: dict):
     """Set data in Redis"""
     try:
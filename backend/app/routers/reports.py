@@ -1,24 +1,96 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy import select
+from typing import List, Literal, Optional, Union
+from datetime import date
 
 from app.database import get_db
 from app.models.models import Report
-from app.schemas.schemas import ReportResponse, ReportCreate, AddReportRequest, AddReportRequestBatch
+from app.schemas.schemas import (
+    ReportResponse, ReportCreate, AddReportRequest, AddReportRequestBatch,
+    ReportSummary, ReportSummaryGroup, ReportBatchResult,
+)
+from app.services.report_batch import report_rows, insert_reports
+from app.services.report_export import (
+    build_export_query, export_headers, stream_csv, stream_xlsx, EXPORT_MEDIA_TYPES,
+)
+from app.services.report_summary import (
+    apply_date_range, build_summary_query, build_rollup_query, merge_summaries, summary_row_to_dict, ROLLUP_GROUPS,
+)
+from app.services.report_archive import report_archive
+from app.services.daily_sales import add_to_daily_sales, clear_reports, delete_reports
+from app.services.lean_json import REPORT_COLUMNS, rows_response
+from app.services.listing import apply_keyset, decode_cursor, ndjson_lines, set_next_cursor, stream_ndjson, NDJSON_MEDIA_TYPE
 
 router = APIRouter()
 
 @router.get("/", response_model=List[ReportResponse])
-def get_all_reports(db: Session = Depends(get_db)):
-    """Get all reports"""
-    reports = db.query(Report).order_by(Report.created_at.desc()).all()
-    return reports
+def get_all_reports(
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    format: Literal["json", "ndjson"] = "json",
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    db: Session = Depends(get_db),
+):
+    """Get all reports, newest first (limit/cursor -> keyset pages by id, format=ndjson -> streamed, from/to -> date range)"""
+    # Khoảng ngày chạm tới tháng đã archive -> thêm các dòng từ file Parquet (app/services/report_archive.py)
+    if format == "ndjson" and limit is None:
+        stmt = apply_keyset(apply_date_range(select(Report), date_from, date_to), Report.id, cursor, None, descending=True)
+        archived = report_archive.rows(date_from, date_to, before_id=decode_cursor(cursor))
+        return StreamingResponse(stream_ndjson(stmt, ReportResponse, archived), media_type=NDJSON_MEDIA_TYPE)
+    # JSON: chỉ SELECT các cột của ReportResponse, orjson thẳng từ tuple (không dựng ORM / Pydantic từng dòng)
+    base = apply_date_range(select(*REPORT_COLUMNS), date_from, date_to)
+    if limit is None and cursor is None:
+        reports = db.execute(base.order_by(Report.created_at.desc())).all()
+        return rows_response(REPORT_COLUMNS, reports + report_archive.rows(date_from, date_to))
+
+    limit = limit or 100
+    reports = db.execute(apply_keyset(base, Report.id, cursor, limit, descending=True)).all()
+    reports = report_archive.merge_page(reports, date_from, date_to, decode_cursor(cursor), limit)
+    # ndjson + limit: cùng trang (đã trộn archive) với JSON, chỉ khác cách ghi
+    if format == "ndjson":
+        response = StreamingResponse(ndjson_lines(reports, ReportResponse), media_type=NDJSON_MEDIA_TYPE)
+    else:
+        response = rows_response(REPORT_COLUMNS, reports)
+    set_next_cursor(response, reports, limit)
+    return response
 
 @router.get("/table/{table_id}", response_model=List[ReportResponse])
-def get_reports_by_table(table_id: int, db: Session = Depends(get_db)):
-    """Get reports by table ID"""
-    reports = db.query(Report).filter(Report.table_id == table_id).all()
-    return reports
+def get_reports_by_table(
+    table_id: int,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    db: Session = Depends(get_db),
+):
+    """Get reports by table ID (from/to -> date range)"""
+    stmt = apply_date_range(select(*REPORT_COLUMNS).filter(Report.table_id == table_id), date_from, date_to)
+    archived = report_archive.rows(date_from, date_to, table_id=table_id, descending=False)
+    return rows_response(REPORT_COLUMNS, archived + db.execute(stmt).all())
+
+@router.get("/summary", response_model=ReportSummary)
+def get_reports_summary(
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    db: Session = Depends(get_db),
+):
+    """Total revenue / quantity / discount / ship fee in a date range (from the daily_sales rollup)"""
+    return summary_row_to_dict(db.execute(build_rollup_query(None, date_from, date_to)).one())
+
+@router.get("/summary/{group_by}", response_model=List[ReportSummaryGroup])
+def get_reports_summary_grouped(
+    group_by: Literal["day", "hour", "table", "product"],
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    db: Session = Depends(get_db),
+):
+    """Revenue / quantity / discount / ship fee grouped by day, hour, table or product_code"""
+    if group_by in ROLLUP_GROUPS:
+        # daily_sales đã gồm cả các tháng đã archive
+        return [summary_row_to_dict(r, group_by) for r in db.execute(build_rollup_query(group_by, date_from, date_to))]
+    rows = db.execute(build_summary_query(group_by, date_from, date_to)).all()
+    return merge_summaries(group_by, rows, report_archive.summary(group_by, date_from, date_to))
 
 # @router.post("/batch", response_model=List[ReportResponse])
 # def create_reports_batch(reports_request: AddReportRequestBatch, db: Session = Depends(get_db)):
@@ -50,29 +122,38 @@ def get_reports_by_table(table_id: int, db: Session = Depends(get_db)):
 #         db.rollback()
 #         raise HTTPException(status_code=500, detail=f"Error creating batch reports: {str(e)}")
 
-@router.post("/batch", response_model=List[ReportResponse])
-def create_reports_batch(reports_request: AddReportRequestBatch, db: Session = Depends(get_db)):
-    created = []
+@router.get("/export")
+def export_reports(
+    format: Literal["xlsx", "csv"] = "xlsx",
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+):
+    """Download reports as xlsx / csv, read in batches from a server-side cursor"""
+    stmt = build_export_query(date_from, date_to)
+    archived = report_archive.export_rows(date_from, date_to)
+    body = stream_csv(stmt, archived) if format == "csv" else stream_xlsx(stmt, archived)
+    return StreamingResponse(body, media_type=EXPORT_MEDIA_TYPES[format],
+                             headers=export_headers(format, date_from, date_to))
+
+@router.post("/batch", response_model=Union[List[ReportResponse], ReportBatchResult])
+def create_reports_batch(
+    reports_request: AddReportRequestBatch,
+    returning: bool = True,
+    db: Session = Depends(get_db),
+):
+    """Create many reports with one multi-row INSERT per chunk (returning=false -> only the count)"""
+    rows = report_rows(reports_request.reports)
     try:
-        for r in reports_request.reports:
-            data = ReportCreate(
-                table_id=r.tableNumber, date=r.date, hour=r.time,
-                product_code=r.code, product_name=r.nameDish,
-                quantity=r.quantity, total=r.totalCheck,
-                ship_fee=r.shipFee, discount=r.discountCheck
-            )
-            obj = Report(**data.model_dump())
-            db.add(obj)
-            created.append(obj)
-        db.flush()                 # cấp id cho obj
-        for obj in created:
-            db.refresh(obj)
+        created = [ReportResponse.model_validate(r) for r in insert_reports(db, rows, returning)]
         db.commit()
-        return created
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Error creating batch reports: {e}")
 
+    if not returning:
+        return {"count": len(rows)}
+    return created
+
 @router.post("/", response_model=ReportResponse)
 def create_report(report_request: AddReportRequest, db: Session = Depends(get_db)):
     """Create a new report entry"""
@@ -90,16 +171,19 @@ def create_report(report_request: AddReportRequest, db: Session = Depends(get_db
     
     db_report = Report(**report_data.model_dump())
     db.add(db_report)
+    add_to_daily_sales(db, [db_report])
     db.commit()
     db.refresh(db_report)
     return db_report
 
 @router.delete("/")
 def delete_all_reports(db: Session = Depends(get_db)):
-    """Delete all reports (TRUNCATE equivalent)"""
+    """Delete all reports (TRUNCATE equivalent), including archived months"""
     try:
-        db.query(Report).delete()
+        clear_reports(db)
         db.commit()
+        # Chỉ xóa file khi DB đã commit: lỗi giữa chừng không làm mất dữ liệu đã archive
+        report_archive.clear()
         return {"message": "All reports deleted successfully"}
     except Exception as e:
         db.rollback()
@@ -108,10 +192,11 @@ def delete_all_reports(db: Session = Depends(get_db)):
 @router.delete("/{report_id}")
 def delete_report(report_id: int, db: Session = Depends(get_db)):
     """Delete a specific report"""
-    report = db.query(Report).filter(Report.id == report_id).first()
-    if not report:
+    # Trừ dòng này khỏi daily_sales trong cùng transaction
+    if not delete_reports(db, Report.id == report_id):
+        if report_archive.contains(report_id):
+            raise HTTPException(status_code=409, detail="Report is in an archived month (read-only)")
         raise HTTPException(status_code=404, detail="Report not found")
-    
-    db.delete(report)
+
     db.commit()
     return {"message": "Report deleted successfully"}
@@ -0,0 +1,181 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional, Union
+from datetime import date
+from sqlalchemy import select
+from starlette.concurrency import run_in_threadpool
+
+from app.database import get_async_db
+from app.models.models import Report
+from app.schemas.schemas import (
+    ReportResponse, ReportCreate, AddReportRequest, AddReportRequestBatch,
+    ReportSummary, ReportSummaryGroup, ReportBatchResult,
+)
+from app.services.report_batch import report_rows, insert_reports_async
+from app.services.report_export import (
+    build_export_query, export_headers, stream_csv_async, stream_xlsx_async, EXPORT_MEDIA_TYPES,
+)
+from app.services.report_summary import (
+    apply_date_range, build_summary_query, build_rollup_query, merge_summaries, summary_row_to_dict, ROLLUP_GROUPS,
+)
+from app.services.report_archive import report_archive
+from app.services.daily_sales import add_to_daily_sales_async, clear_reports_async, delete_reports_async
+from app.services.lean_json import REPORT_COLUMNS, rows_response
+from app.services.listing import apply_keyset, decode_cursor, ndjson_lines, set_next_cursor, stream_ndjson_async, NDJSON_MEDIA_TYPE
+
+# Bản async của app/routers/reports.py (bật bằng DB_ASYNC=true), giữ nguyên route và response
+router = APIRouter()
+
+@router.get("/", response_model=List[ReportResponse])
+async def get_all_reports(
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    format: Literal["json", "ndjson"] = "json",
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Get all reports, newest first (limit/cursor -> keyset pages by id, format=ndjson -> streamed, from/to -> date range)"""
+    # Khoảng ngày chạm tới tháng đã archive -> thêm các dòng từ file Parquet (đọc trong threadpool)
+    if format == "ndjson" and limit is None:
+        stmt = apply_keyset(apply_date_range(select(Report), date_from, date_to), Report.id, cursor, None, descending=True)
+        archived = await run_in_threadpool(report_archive.rows, date_from, date_to, before_id=decode_cursor(cursor))
+        return StreamingResponse(stream_ndjson_async(stmt, ReportResponse, archived), media_type=NDJSON_MEDIA_TYPE)
+    # JSON: chỉ SELECT các cột của ReportResponse, orjson thẳng từ tuple (không dựng ORM / Pydantic từng dòng)
+    base = apply_date_range(select(*REPORT_COLUMNS), date_from, date_to)
+    if limit is None and cursor is None:
+        result = await db.execute(base.order_by(Report.created_at.desc()))
+        archived = await run_in_threadpool(report_archive.rows, date_from, date_to)
+        return rows_response(REPORT_COLUMNS, result.all() + archived)
+
+    limit = limit or 100
+    result = await db.execute(apply_keyset(base, Report.id, cursor, limit, descending=True))
+    reports = await run_in_threadpool(
+        report_archive.merge_page, result.all(), date_from, date_to, decode_cursor(cursor), limit,
+    )
+    # ndjson + limit: cùng trang (đã trộn archive) với JSON, chỉ khác cách ghi
+    if format == "ndjson":
+        response = StreamingResponse(ndjson_lines(reports, ReportResponse), media_type=NDJSON_MEDIA_TYPE)
+    else:
+        response = rows_response(REPORT_COLUMNS, reports)
+    set_next_cursor(response, reports, limit)
+    return response
+
+@router.get("/table/{table_id}", response_model=List[ReportResponse])
+async def get_reports_by_table(
+    table_id: int,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Get reports by table ID (from/to -> date range)"""
+    stmt = apply_date_range(select(*REPORT_COLUMNS).filter(Report.table_id == table_id), date_from, date_to)
+    result = await db.execute(stmt)
+    archived = await run_in_threadpool(report_archive.rows, date_from, date_to, table_id=table_id, descending=False)
+    return rows_response(REPORT_COLUMNS, archived + result.all())
+
+@router.get("/summary", response_model=ReportSummary)
+async def get_reports_summary(
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Total revenue / quantity / discount / ship fee in a date range (from the daily_sales rollup)"""
+    result = await db.execute(build_rollup_query(None, date_from, date_to))
+    return summary_row_to_dict(result.one())
+
+@router.get("/summary/{group_by}", response_model=List[ReportSummaryGroup])
+async def get_reports_summary_grouped(
+    group_by: Literal["day", "hour", "table", "product"],
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Revenue / quantity / discount / ship fee grouped by day, hour, table or product_code"""
+    if group_by in ROLLUP_GROUPS:
+        # daily_sales đã gồm cả các tháng đã archive
+        result = await db.execute(build_rollup_query(group_by, date_from, date_to))
+        return [summary_row_to_dict(r, group_by) for r in result.all()]
+    result = await db.execute(build_summary_query(group_by, date_from, date_to))
+    archived = await run_in_threadpool(report_archive.summary, group_by, date_from, date_to)
+    return merge_summaries(group_by, result.all(), archived)
+
+@router.get("/export")
+async def export_reports(
+    format: Literal["xlsx", "csv"] = "xlsx",
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+):
+    """Download reports as xlsx / csv, read in batches from a server-side cursor"""
+    stmt = build_export_query(date_from, date_to)
+    archived = await run_in_threadpool(report_archive.export_rows, date_from, date_to)
+    body = stream_csv_async(stmt, archived) if format == "csv" else stream_xlsx_async(stmt, archived)
+    return StreamingResponse(body, media_type=EXPORT_MEDIA_TYPES[format],
+                             headers=export_headers(format, date_from, date_to))
+
+@router.post("/batch", response_model=Union[List[ReportResponse], ReportBatchResult])
+async def create_reports_batch(
+    reports_request: AddReportRequestBatch,
+    returning: bool = True,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Create many reports with one multi-row INSERT per chunk (returning=false -> only the count)"""
+    rows = report_rows(reports_request.reports)
+    try:
+        created = [ReportResponse.model_validate(r) for r in await insert_reports_async(db, rows, returning)]
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error creating batch reports: {e}")
+
+    if not returning:
+        return {"count": len(rows)}
+    return created
+
+@router.post("/", response_model=ReportResponse)
+async def create_report(report_request: AddReportRequest, db: AsyncSession = Depends(get_async_db)):
+    """Create a new report entry"""
+    report_data = ReportCreate(
+        table_id=report_request.tableNumber,
+        date=report_request.date,
+        hour=report_request.time,
+        product_code=report_request.code,
+        product_name=report_request.nameDish,
+        quantity=report_request.quantity,
+        total=report_request.totalCheck,
+        ship_fee=report_request.shipFee,
+        discount=report_request.discountCheck
+    )
+
+    db_report = Report(**report_data.model_dump())
+    db.add(db_report)
+    await add_to_daily_sales_async(db, [db_report])
+    await db.commit()
+    await db.refresh(db_report)
+    return db_report
+
+@router.delete("/")
+async def delete_all_reports(db: AsyncSession = Depends(get_async_db)):
+    """Delete all reports (TRUNCATE equivalent), including archived months"""
+    try:
+        await clear_reports_async(db)
+        await db.commit()
+        # Chỉ xóa file khi DB đã commit: lỗi giữa chừng không làm mất dữ liệu đã archive
+        await run_in_threadpool(report_archive.clear)
+        return {"message": "All reports deleted successfully"}
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error deleting reports: {str(e)}")
+
+@router.delete("/{report_id}")
+async def delete_report(report_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Delete a specific report"""
+    # Trừ dòng này khỏi daily_sales trong cùng transaction
+    if not await delete_reports_async(db, Report.id == report_id):
+        if await run_in_threadpool(report_archive.contains, report_id):
+            raise HTTPException(status_code=409, detail="Report is in an archived month (read-only)")
+        raise HTTPException(status_code=404, detail="Report not found")
+
+    await db.commit()
+    return {"message": "Report deleted successfully"}
@@ -0,0 +1,99 @@
+from fastapi import APIRouter, HTTPException, Query, Response
+from typing import List, Optional, Union
+from datetime import date
+from starlette.concurrency import run_in_threadpool
+
+from app.schemas.schemas import (
+    ReportResponse, ReportCreate, AddReportRequest, AddReportRequestBatch, ReportBatchResult,
+)
+from app.services.supabase_service import supabase_service
+from app.services.report_batch import report_rows
+from app.services.listing import decode_cursor, set_next_cursor
+from app.services.report_archive import report_archive
+
+# Bản STORAGE_BACKEND=supabase của app/routers/reports.py (đọc ghi qua PostgREST).
+# summary / export cần GROUP BY / stream trên SQL -> chỉ có ở router SQL.
+# Tháng đã archive (python -m app.services.report_archive, cùng database) được đọc kèm từ file Parquet.
+router = APIRouter()
+
+@router.get("/", response_model=List[ReportResponse])
+async def get_all_reports(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+):
+    """Get all reports, newest first (limit/cursor -> keyset pages by id, from/to -> date range)"""
+    if limit is None and cursor is None:
+        rows = await supabase_service.get_reports(date_from, date_to)
+        archived = await run_in_threadpool(report_archive.rows, date_from, date_to)
+        return rows + [row._asdict() for row in archived]
+
+    limit = limit or 100
+    rows = await supabase_service.get_reports(date_from, date_to, limit=limit, before_id=decode_cursor(cursor))
+    reports = await run_in_threadpool(
+        report_archive.merge_page, [ReportResponse.model_validate(row) for row in rows],
+        date_from, date_to, decode_cursor(cursor), limit,
+    )
+    set_next_cursor(response, reports, limit)
+    return reports
+
+@router.get("/table/{table_id}", response_model=List[ReportResponse])
+async def get_reports_by_table(
+    table_id: int,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+):
+    """Get reports by table ID (from/to -> date range)"""
+    rows = await supabase_service.get_reports(date_from, date_to, table_id=table_id)
+    archived = await run_in_threadpool(report_archive.rows, date_from, date_to, table_id=table_id)
+    return rows + [row._asdict() for row in archived]
+
+@router.post("/batch", response_model=Union[List[ReportResponse], ReportBatchResult])
+async def create_reports_batch(reports_request: AddReportRequestBatch, returning: bool = True):
+    """Create many reports with one bulk POST per chunk (chunks sent concurrently)"""
+    rows = report_rows(reports_request.reports)
+    try:
+        created = await supabase_service.create_reports(rows)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error creating batch reports: {e}")
+
+    if not returning:
+        return {"count": len(rows)}
+    return created
+
+@router.post("/", response_model=ReportResponse)
+async def create_report(report_request: AddReportRequest):
+    """Create a new report entry"""
+    report_data = ReportCreate(
+        table_id=report_request.tableNumber,
+        date=report_request.date,
+        hour=report_request.time,
+        product_code=report_request.code,
+        product_name=report_request.nameDish,
+        quantity=report_request.quantity,
+        total=report_request.totalCheck,
+        ship_fee=report_request.shipFee,
+        discount=report_request.discountCheck
+    )
+    return await supabase_service.create_report(report_data.model_dump())
+
+@router.delete("/")
+async def delete_all_reports():
+    """Delete all reports (TRUNCATE equivalent), including archived months"""
+    try:
+        await supabase_service.delete_all_reports()
+        await run_in_threadpool(report_archive.clear)
+        return {"message": "All reports deleted successfully"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error deleting reports: {str(e)}")
+
+@router.delete("/{report_id}")
+async def delete_report(report_id: int):
+    """Delete a specific report"""
+    if not await supabase_service.delete("report", id=f"eq.{report_id}"):
+        if await run_in_threadpool(report_archive.contains, report_id):
+            raise HTTPException(status_code=409, detail="Report is in an archived month (read-only)")
+        raise HTTPException(status_code=404, detail="Report not found")
+    return {"message": "Report deleted successfully"}
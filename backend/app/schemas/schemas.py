@@ -1,13 +1,49 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, BeforeValidator, PlainSerializer
 from typing import Optional
-from datetime import datetime
-from typing import List
+from datetime import date, datetime, time
+from typing import Annotated, List
+
+# Ngày / giờ: cột DATE / TIME trong DB, trên API vẫn là chuỗi như frontend đang dùng
+# (toLocaleDateString('vi-VN') -> "17/10/2026", có thể không có số 0 đầu: "7/1/2026")
+def parse_display_date(value):
+    """"dd/mm/yyyy" hoặc ISO "yyyy-mm-dd[...]" -> date"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date) or not isinstance(value, str):
+        return value
+    text = value.strip()
+    if "/" in text:
+        day, month, year = text.split("/")
+        return date(int(year), int(month), int(day))
+    return date.fromisoformat(text[:10])
+
+def parse_display_time(value):
+    """"HH:MM[:SS]" -> time (bỏ phần lẻ của giây)"""
+    if isinstance(value, datetime):
+        value = value.time()
+    if isinstance(value, time):
+        return value.replace(microsecond=0)
+    if not isinstance(value, str):
+        return value
+    parts = [int(p) for p in value.strip().split(":")]
+    return time(*parts[:3])
+
+DisplayDate = Annotated[
+    date,
+    BeforeValidator(parse_display_date),
+    PlainSerializer(lambda d: d.strftime("%d/%m/%Y"), return_type=str, when_used="json"),
+]
+DisplayTime = Annotated[
+    time,
+    BeforeValidator(parse_display_time),
+    PlainSerializer(lambda t: t.strftime("%H:%M:%S"), return_type=str, when_used="json"),
+]
 
 # Order schemas
 class OrderBase(BaseModel):
     table_id: int
-    date: str
-    time: str
+    date: DisplayDate
+    time: DisplayTime
     dish_name: str
     quantity: int
     note: Optional[str] = ''  # Thêm note field
@@ -17,16 +53,36 @@ class OrderCreate(OrderBase):
 
 class OrderResponse(OrderBase):
     id: int
+    dish_id: Optional[int] = None
     created_at: datetime
     
     class Config:
         from_attributes = True
 
+# Dish schemas (thực đơn)
+class DishBase(BaseModel):
+    code: str
+    name: str
+    price: int
+
+class DishCreate(DishBase):
+    pass
+
+class DishUpdate(BaseModel):
+    name: Optional[str] = None
+    price: Optional[int] = None
+
+class DishResponse(DishBase):
+    id: int
+
+    class Config:
+        from_attributes = True
+
 # Report schemas
 class ReportBase(BaseModel):
     table_id: int
-    date: str
-    hour: str
+    date: DisplayDate
+    hour: DisplayTime
     product_code: str
     product_name: str
     quantity: int
@@ -49,14 +105,14 @@ class AddOrderRequest(BaseModel):
     table_id: int
     dish_name: str
     quantity: int
-    date: str
-    time: str
+    date: DisplayDate
+    time: DisplayTime
     note: Optional[str] = ''  # Thêm note field
 
 class AddReportRequest(BaseModel):
     tableNumber: int
-    date: str
-    time: str
+    date: DisplayDate
+    time: DisplayTime
     code: str
     nameDish: str
     quantity: int
@@ -65,4 +121,19 @@ class AddReportRequest(BaseModel):
     discountCheck: float
 
 class AddReportRequestBatch(BaseModel):
-    reports: List[AddReportRequest]
\ No newline at end of file
+    reports: List[AddReportRequest]
+
+class ReportBatchResult(BaseModel):
+    count: int
+
+# Report summary schemas (GROUP BY trong DB)
+class ReportSummary(BaseModel):
+    rows: int
+    quantity: int
+    revenue: float
+    discount: float
+    ship_fee: float
+
+class ReportSummaryGroup(ReportSummary):
+    key: str
+    product_name: Optional[str] = None
@@ -0,0 +1,135 @@
+from typing import Dict, List
+
+from fastapi import HTTPException
+from sqlalchemy import select, insert, delete, case, cast, literal, func, Date, Float, Time
+
+from app.models.models import Dish, Order, Report, normalize_dish_name
+from app.services.dish_catalog import dish_catalog
+from app.services.daily_sales import add_to_daily_sales, add_to_daily_sales_async
+
+REPORT_COLUMNS = ["table_id", "date", "hour", "product_code", "product_name",
+                  "quantity", "total", "ship_fee", "discount"]
+
+def _code_map(product_codes: Dict[str, str]) -> Dict[str, str]:
+    return {normalize_dish_name(name): code for name, code in product_codes.items()}
+
+def _product_code(product_codes: Dict[str, str]):
+    """
+    Mã hàng: món trong thực đơn -> dish.code (join theo dish_id);
+    món ngoài thực đơn -> product_codes client gửi, không có nữa -> tên món (cắt 50 ký tự)
+    """
+    fallback = func.substr(Order.dish_name, 1, 50)
+    codes = _code_map(product_codes)
+    if codes:
+        fallback = case(codes, value=Order.dish_key, else_=fallback)
+    return func.coalesce(Dish.code, fallback)
+
+def bill_total(bill, orders, catalog) -> float:
+    """Client gửi total -> dùng luôn; không gửi -> tính từ giá trong thực đơn (giống OrderPanel)"""
+    if bill.total is not None:
+        return bill.total
+    subtotal = 0
+    for order in orders:
+        dish = catalog.by_id.get(order.dish_id) or catalog.by_key.get(order.dish_key)
+        if dish is None:
+            raise HTTPException(status_code=422, detail=f"'{order.dish_name}' is not on the menu, send the bill total")
+        subtotal += dish.price * order.quantity
+    return subtotal - bill.discount + bill.ship_fee
+
+def build_checkout_select(order_ids: List[int], bill, total: float):
+    """SELECT trên order_list trả về đúng các cột của report (tổng bill lặp lại trên mỗi dòng)"""
+    stmt = select(
+        Order.table_id,
+        literal(bill.date, Date),  # không CAST: trên SQLite CAST(... AS DATE) thành số
+        literal(bill.time, Time),
+        _product_code(bill.product_codes),
+        Order.dish_name,
+        Order.quantity,
+        # CAST để Postgres không suy kiểu tham số thành text
+        cast(literal(total), Float),
+        cast(literal(bill.ship_fee), Float),
+        cast(literal(bill.discount), Float),
+    )
+    stmt = stmt.select_from(Order).outerjoin(Dish, Dish.id == Order.dish_id)
+    return stmt.where(Order.id.in_(order_ids)).order_by(Order.id)
+
+def _report_from_order(order, bill, total: float, codes: Dict[str, str], catalog) -> Report:
+    dish = catalog.by_id.get(order.dish_id)
+    code = dish.code if dish else codes.get(order.dish_key)
+    return Report(
+        table_id=order.table_id,
+        date=bill.date,
+        hour=bill.time,
+        product_code=code or order.dish_name[:50],
+        product_name=order.dish_name,
+        quantity=order.quantity,
+        total=total,
+        ship_fee=bill.ship_fee,
+        discount=bill.discount,
+    )
+
+def checkout_report_rows(orders, bill, catalog) -> List[dict]:
+    """Dòng report (dict theo REPORT_COLUMNS) tính trong Python từ các order của bàn (STORAGE_BACKEND=supabase)"""
+    total = bill_total(bill, orders, catalog)
+    codes = _code_map(bill.product_codes)
+    reports = [_report_from_order(o, bill, total, codes, catalog) for o in orders]
+    return [{column: getattr(r, column) for column in REPORT_COLUMNS} for r in reports]
+
+def _locked_orders(table_id: int):
+    # Khóa các dòng của bàn: chỉ chuyển + xóa đúng những dòng này,
+    # món thêm vào đồng thời không bị xóa mà không có trong report
+    return select(
+        Order.id, Order.table_id, Order.dish_id, Order.dish_key, Order.dish_name, Order.quantity,
+    ).where(Order.table_id == table_id).order_by(Order.id).with_for_update()
+
+def checkout_table(db, table_id: int, bill) -> List[Report]:
+    """
+    INSERT INTO report ... SELECT FROM order_list + DELETE (+ cộng vào daily_sales) trong cùng transaction.
+    Không commit.
+    """
+    orders = db.execute(_locked_orders(table_id)).all()
+    if not orders:
+        return []
+    order_ids = [o.id for o in orders]
+    catalog = dish_catalog.ensure(db)
+    total = bill_total(bill, orders, catalog)
+
+    if db.get_bind().dialect.insert_returning:
+        stmt = insert(Report).from_select(REPORT_COLUMNS, build_checkout_select(order_ids, bill, total))
+        reports = list(db.scalars(stmt.returning(Report)))
+    else:
+        # Fallback: DB không có INSERT ... RETURNING -> tạo report từ các dòng order
+        codes = _code_map(bill.product_codes)
+        reports = [_report_from_order(o, bill, total, codes, catalog) for o in orders]
+        db.add_all(reports)
+        db.flush()
+        for report in reports:
+            db.refresh(report)
+
+    add_to_daily_sales(db, reports)
+    db.execute(delete(Order).where(Order.id.in_(order_ids)))
+    return reports
+
+async def checkout_table_async(db, table_id: int, bill) -> List[Report]:
+    """Bản async của checkout_table"""
+    orders = (await db.execute(_locked_orders(table_id))).all()
+    if not orders:
+        return []
+    order_ids = [o.id for o in orders]
+    catalog = await dish_catalog.ensure_async(db)
+    total = bill_total(bill, orders, catalog)
+
+    if db.get_bind().dialect.insert_returning:
+        stmt = insert(Report).from_select(REPORT_COLUMNS, build_checkout_select(order_ids, bill, total))
+        reports = list(await db.scalars(stmt.returning(Report)))
+    else:
+        codes = _code_map(bill.product_codes)
+        reports = [_report_from_order(o, bill, total, codes, catalog) for o in orders]
+        db.add_all(reports)
+        await db.flush()
+        for report in reports:
+            await db.refresh(report)
+
+    await add_to_daily_sales_async(db, reports)
+    await db.execute(delete(Order).where(Order.id.in_(order_ids)))
+    return reports
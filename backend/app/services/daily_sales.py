@@ -0,0 +1,213 @@
+import argparse
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import case, delete, func, insert, select, text
+
+from app.models.models import DailySales, Report
+
+# Bảng rollup daily_sales: tổng của report theo (date, product_code, table_id). Mỗi lần ghi report (create / batch /
+# checkout) cộng thêm và mỗi lần xóa report trừ đi trong CÙNG transaction -> /api/reports/summary đọc vài trăm dòng
+# rollup thay vì gộp cả bảng report. Archive sang Parquet không đụng tới rollup (tổng vẫn gồm các tháng đã archive).
+# Ghi qua STORAGE_BACKEND=supabase (PostgREST) không cập nhật rollup -> chạy lại: python -m app.services.daily_sales
+ROLLUP_KEY = ["date", "product_code", "table_id"]
+SUM_FIELDS = ["rows", "quantity", "revenue", "discount", "ship_fee"]
+# 9 cột x 1000 dòng / câu lệnh, dưới giới hạn tham số của SQLite và Postgres
+UPSERT_CHUNK_SIZE = 1000
+# Cột đọc lại từ các dòng report bị xóa để trừ khỏi rollup
+DELETED_COLUMNS = (Report.id, Report.date, Report.product_code, Report.table_id, Report.product_name,
+                   Report.quantity, Report.total, Report.discount, Report.ship_fee)
+
+def _value(row, name: str):
+    return row[name] if isinstance(row, dict) else getattr(row, name)
+
+def rollup_deltas(rows: Iterable) -> List[dict]:
+    """Dòng report (dict theo cột hoặc object Report) -> phần cộng thêm cho từng dòng daily_sales"""
+    groups: Dict[tuple, dict] = {}
+    for row in rows:
+        key = tuple(_value(row, name) for name in ROLLUP_KEY)
+        delta = groups.get(key)
+        if delta is None:
+            delta = groups[key] = dict(zip(ROLLUP_KEY, key), product_name=_value(row, "product_name"),
+                                       rows=0, quantity=0, revenue=0.0, discount=0.0, ship_fee=0.0)
+        delta["rows"] += 1
+        delta["quantity"] += _value(row, "quantity")
+        delta["revenue"] += _value(row, "total")
+        delta["discount"] += _value(row, "discount") or 0
+        delta["ship_fee"] += _value(row, "ship_fee") or 0
+        delta["product_name"] = max(delta["product_name"], _value(row, "product_name"))
+    return list(groups.values())
+
+def grouped_reports(*conditions):
+    """SELECT ... GROUP BY (date, product_code, table_id) trên report, cùng cột với daily_sales"""
+    return select(
+        Report.date, Report.product_code, Report.table_id,
+        func.max(Report.product_name).label("product_name"),
+        func.count(Report.id).label("rows"),
+        func.sum(Report.quantity).label("quantity"),
+        func.sum(Report.total).label("revenue"),
+        func.sum(Report.discount).label("discount"),
+        func.sum(Report.ship_fee).label("ship_fee"),
+    ).where(*conditions).group_by(Report.date, Report.product_code, Report.table_id)
+
+def _dialect(db):
+    bind = db.get_bind() if hasattr(db, "get_bind") else db  # Session / AsyncSession hoặc Connection
+    return bind.dialect
+
+def _dialect_name(db) -> str:
+    return _dialect(db).name
+
+def _upsert_statements(dialect_name: str, deltas: List[dict]):
+    """INSERT ... ON CONFLICT (date, product_code, table_id) DO UPDATE SET rows = rows + excluded.rows, ..."""
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+
+    for start in range(0, len(deltas), UPSERT_CHUNK_SIZE):
+        stmt = dialect_insert(DailySales).values(deltas[start:start + UPSERT_CHUNK_SIZE])
+        excluded = stmt.excluded
+        set_ = {field: getattr(DailySales, field) + excluded[field] for field in SUM_FIELDS}
+        # Tên món: giữ giá trị lớn nhất như MAX(product_name) của summary (CASE chạy được cả Postgres lẫn SQLite)
+        set_["product_name"] = case(
+            (excluded.product_name > DailySales.product_name, excluded.product_name),
+            else_=DailySales.product_name,
+        )
+        yield stmt.on_conflict_do_update(index_elements=ROLLUP_KEY, set_=set_)
+
+def _negate(data) -> dict:
+    delta = dict(data)
+    for field in SUM_FIELDS:
+        delta[field] = -(delta[field] or 0)
+    return delta
+
+def _drop_empty(deltas: List[dict]):
+    """Nhóm không còn dòng report nào -> xóa dòng rollup"""
+    dates = sorted({delta["date"] for delta in deltas})
+    return delete(DailySales).where(DailySales.rows <= 0, DailySales.date.in_(dates))
+
+def add_to_daily_sales(db, rows: Iterable) -> None:
+    """Cộng các dòng report vừa ghi vào daily_sales. Không commit."""
+    deltas = rollup_deltas(rows)
+    for stmt in _upsert_statements(_dialect_name(db), deltas):
+        db.execute(stmt)
+
+async def add_to_daily_sales_async(db, rows: Iterable) -> None:
+    """Bản async của add_to_daily_sales"""
+    deltas = rollup_deltas(rows)
+    for stmt in _upsert_statements(_dialect_name(db), deltas):
+        await db.execute(stmt)
+
+def _deleting(db, conditions):
+    """DELETE ... RETURNING các cột rollup; DB không có RETURNING -> SELECT ... FOR UPDATE rồi xóa theo đúng id đã đọc"""
+    if _dialect(db).delete_returning:
+        return delete(Report).where(*conditions).returning(*DELETED_COLUMNS), None
+    return select(*DELETED_COLUMNS).where(*conditions).with_for_update(), _delete_by_id
+
+def _delete_by_id(rows: list):
+    for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+        yield delete(Report).where(Report.id.in_([row.id for row in rows[start:start + UPSERT_CHUNK_SIZE]]))
+
+def _subtract_statements(dialect_name: str, deleted: list):
+    deltas = [_negate(delta) for delta in rollup_deltas(deleted)]
+    yield from _upsert_statements(dialect_name, deltas)
+    yield _drop_empty(deltas)
+
+def delete_reports(db, *conditions) -> int:
+    """DELETE FROM report WHERE ... và trừ đúng các dòng đã xóa khỏi daily_sales; trả về số dòng đã xóa. Không commit."""
+    stmt, delete_locked = _deleting(db, conditions)
+    # Delta tính từ chính các dòng bị xóa -> dòng ghi đồng thời không bị xóa mà không trừ (hoặc trừ mà không xóa)
+    deleted = db.execute(stmt).all()
+    if not deleted:
+        return 0
+    for stmt in (delete_locked(deleted) if delete_locked else ()):
+        db.execute(stmt)
+    for stmt in _subtract_statements(_dialect_name(db), deleted):
+        db.execute(stmt)
+    return len(deleted)
+
+async def delete_reports_async(db, *conditions) -> int:
+    """Bản async của delete_reports"""
+    stmt, delete_locked = _deleting(db, conditions)
+    deleted = (await db.execute(stmt)).all()
+    if not deleted:
+        return 0
+    for stmt in (delete_locked(deleted) if delete_locked else ()):
+        await db.execute(stmt)
+    for stmt in _subtract_statements(_dialect_name(db), deleted):
+        await db.execute(stmt)
+    return len(deleted)
+
+def _lock_report_writes(dialect_name: str):
+    # Postgres: chặn INSERT report (kèm phần cộng rollup cùng transaction) tới khi commit; SQLite: DELETE đầu tiên
+    # đã giữ write lock của cả database
+    if dialect_name == "postgresql":
+        yield text("LOCK TABLE report IN SHARE ROW EXCLUSIVE MODE")
+
+def clear_reports(db) -> int:
+    """
+    DELETE /api/reports: xóa hết report và daily_sales (gồm cả nhóm của các tháng đã archive, route xóa file archive
+    sau khi commit); trả về số dòng report đã xóa. Không commit.
+    """
+    for stmt in _lock_report_writes(_dialect_name(db)):
+        db.execute(stmt)
+    count = db.execute(delete(Report)).rowcount
+    db.execute(delete(DailySales))
+    return count
+
+async def clear_reports_async(db) -> int:
+    """Bản async của clear_reports"""
+    for stmt in _lock_report_writes(_dialect_name(db)):
+        await db.execute(stmt)
+    count = (await db.execute(delete(Report))).rowcount
+    await db.execute(delete(DailySales))
+    return count
+
+def _date_range(column, date_from: Optional[date], date_to: Optional[date]) -> list:
+    conditions = []
+    if date_from is not None:
+        conditions.append(column >= date_from)
+    if date_to is not None:
+        conditions.append(column <= date_to)
+    return conditions
+
+def rebuild_daily_sales(engine, date_from: Optional[date] = None, date_to: Optional[date] = None) -> int:
+    """Dựng lại daily_sales (trong khoảng ngày) từ report + các tháng đã archive; trả về số dòng rollup"""
+    from app.services.report_archive import report_archive
+
+    report_range = _date_range(Report.date, date_from, date_to)
+    rollup_range = _date_range(DailySales.date, date_from, date_to)
+    archived = report_archive.daily_sales(date_from, date_to)
+    with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            # Chặn ghi report tới khi dựng xong (đọc vẫn chạy) -> không mất / đếm trùng dòng ghi đồng thời
+            conn.execute(text("LOCK TABLE report IN SHARE MODE"))
+        conn.execute(delete(DailySales).where(*rollup_range))
+        columns = ROLLUP_KEY + ["product_name"] + SUM_FIELDS
+        conn.execute(insert(DailySales).from_select(columns, grouped_reports(*report_range)))
+        for stmt in _upsert_statements(conn.dialect.name, archived):
+            conn.execute(stmt)
+        return conn.execute(select(func.count()).select_from(DailySales).where(*rollup_range)).scalar()
+
+def backfill_daily_sales_if_empty(engine) -> int:
+    """daily_sales trống nhưng đã có report (bảng vừa được tạo) -> dựng lần đầu lúc khởi động"""
+    from app.services.report_archive import report_archive
+
+    with engine.connect() as conn:
+        if conn.execute(select(DailySales.date).limit(1)).first() is not None:
+            return 0
+        has_reports = conn.execute(select(Report.id).limit(1)).first() is not None
+    if not has_reports and not report_archive.months():
+        return 0
+    return rebuild_daily_sales(engine)
+
+if __name__ == "__main__":
+    # Dựng lại sau khi sửa report ngoài API (SQL tay, STORAGE_BACKEND=supabase): python -m app.services.daily_sales
+    parser = argparse.ArgumentParser(description="Rebuild the daily_sales rollup from the report table and archive")
+    parser.add_argument("--from", dest="date_from", type=date.fromisoformat, help="yyyy-mm-dd, default: all")
+    parser.add_argument("--to", dest="date_to", type=date.fromisoformat, help="yyyy-mm-dd, default: all")
+    args = parser.parse_args()
+
+    from app.database import engine
+    count = rebuild_daily_sales(engine, args.date_from, args.date_to)
+    print(f"daily_sales rebuilt: {count} rows")
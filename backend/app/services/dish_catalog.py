@@ -0,0 +1,106 @@
+import hashlib
+import json
+import time
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from fastapi import Request, Response
+from sqlalchemy import func, insert, select
+
+from app.config import settings
+from app.models.models import Dish, normalize_dish_name
+from app.services.http_cache import cache_headers, etag_matches, not_modified
+
+# Thực đơn gốc (cùng dữ liệu với frontend/src/data/dishes.ts và migrations/003) nằm trong backend -> image Docker
+# chỉ copy backend/ vẫn seed được bảng dish khi DB còn trống (SQLite local, benchmark)
+MENU_FILE = Path(__file__).resolve().parents[1] / "data" / "menu.json"
+
+def load_menu(path: Path = MENU_FILE) -> List[Tuple[str, str, int]]:
+    """menu.json -> [(code, name, price)]"""
+    return [(d["code"], d["name"], int(d["price"])) for d in json.loads(path.read_text(encoding="utf-8"))]
+
+class DishEntry(NamedTuple):
+    id: int
+    code: str
+    name: str
+    price: int
+
+class CatalogSnapshot:
+    """Thực đơn tại 1 thời điểm: tra theo id / dish_key + body JSON và ETag dựng sẵn"""
+
+    def __init__(self, dishes: List[DishEntry]):
+        self.dishes = dishes
+        self.by_id: Dict[int, DishEntry] = {d.id: d for d in dishes}
+        self.by_key: Dict[str, DishEntry] = {normalize_dish_name(d.name): d for d in dishes}
+        self.body = json.dumps([d._asdict() for d in dishes], ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self.etag = '"' + hashlib.sha1(self.body).hexdigest()[:16] + '"'
+        self.loaded_at = time.monotonic()
+
+class DishCatalog:
+    """
+    Thực đơn cache trong process: đọc bảng dish 1 lần / DISH_CACHE_TTL giây.
+    Sửa món qua /api/dishes -> invalidate ngay trên worker đó, worker khác cập nhật sau tối đa TTL.
+    """
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self._snapshot: Optional[CatalogSnapshot] = None
+
+    def _fresh(self) -> Optional[CatalogSnapshot]:
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - snapshot.loaded_at < self.ttl:
+            return snapshot
+        return None
+
+    @property
+    def snapshot(self) -> Optional[CatalogSnapshot]:
+        """Thực đơn đã nạp còn hạn, không đụng DB (None -> cần ensure)"""
+        return self._fresh()
+
+    def ensure(self, bind) -> CatalogSnapshot:
+        """bind: Session / Connection sync (trong route async: await db.run_sync(dish_catalog.ensure))"""
+        snapshot = self._fresh()
+        if snapshot is None:
+            rows = bind.execute(select(Dish.id, Dish.code, Dish.name, Dish.price).order_by(Dish.id)).all()
+            snapshot = self._snapshot = CatalogSnapshot([DishEntry(*row) for row in rows])
+        return snapshot
+
+    async def ensure_async(self, db) -> CatalogSnapshot:
+        snapshot = self._fresh()
+        if snapshot is None:
+            snapshot = await db.run_sync(self.ensure)
+        return snapshot
+
+    async def ensure_rows_async(self, load) -> CatalogSnapshot:
+        """load: hàm async trả về các dòng dish dạng dict (STORAGE_BACKEND=supabase đọc qua REST)"""
+        snapshot = self._fresh()
+        if snapshot is None:
+            rows = await load()
+            snapshot = self._snapshot = CatalogSnapshot(
+                [DishEntry(r["id"], r["code"], r["name"], r["price"]) for r in rows]
+            )
+        return snapshot
+
+    def invalidate(self):
+        self._snapshot = None
+
+dish_catalog = DishCatalog(settings.DISH_CACHE_TTL)
+
+def catalog_response(request: Request, snapshot: CatalogSnapshot) -> Response:
+    """Body JSON dựng sẵn + ETag; client gửi If-None-Match trùng -> 304 không có body"""
+    if etag_matches(request, snapshot.etag):
+        return not_modified(snapshot.etag)
+    return Response(snapshot.body, media_type="application/json", headers=cache_headers(snapshot.etag))
+
+def seed_menu_if_empty(engine, path: Path = MENU_FILE) -> int:
+    """Bảng dish trống -> chép thực đơn app/data/menu.json vào DB (Postgres: xem migrations/003)"""
+    if not path.exists():
+        return 0
+    with engine.begin() as conn:
+        if conn.execute(select(func.count(Dish.id))).scalar():
+            return 0
+        menu = load_menu(path)
+        if menu:
+            conn.execute(insert(Dish), [{"code": c, "name": n, "price": p} for c, n, p in menu])
+    dish_catalog.invalidate()
+    return len(menu)
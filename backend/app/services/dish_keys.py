@@ -0,0 +1,55 @@
+from typing import Dict, Tuple
+
+from sqlalchemy import bindparam, delete, inspect, select, text, update
+
+from app.models.models import Dish, Order, normalize_dish_name
+
+# order_list.dish_key phải tính bằng đúng normalize_dish_name như lúc ghi (INSERT ... ON CONFLICT (table_id, dish_key)):
+# lower(trim(...)) của SQL khác str.strip().lower() (trim chỉ bỏ dấu cách, lower theo locale của DB)
+# -> backfill ở đây thay cho UPDATE trong SQL. Chạy lại được: chỉ sửa dòng có key lệch, gộp dòng trùng.
+CHUNK_SIZE = 1000
+
+def _temporary_key(order_id: int) -> str:
+    # Không trùng key thật (tên món không chứa \x00): tránh vi phạm unique index khi 2 dòng đổi key cho nhau
+    return f"\x00{order_id}"
+
+def backfill_dish_keys(engine) -> Tuple[int, int]:
+    """Tính lại dish_key của order_list, gộp dòng trùng (cùng bàn + key, giữ dòng mới nhất); trả về (số dòng sửa, số dòng xóa)"""
+    table = Order.__table__
+    with engine.begin() as conn:
+        rows = conn.execute(select(table.c.id, table.c.table_id, table.c.dish_name, table.c.dish_key)
+                            .order_by(table.c.id).with_for_update()).all()
+        newest: Dict[tuple, int] = {}
+        for row in rows:
+            newest[(row.table_id, normalize_dish_name(row.dish_name))] = row.id  # id tăng dần -> giữ id lớn nhất
+        keep = set(newest.values())
+        dropped = [row.id for row in rows if row.id not in keep]
+        changed = [
+            {"row_id": row.id, "key": normalize_dish_name(row.dish_name)}
+            for row in rows if row.id in keep and row.dish_key != normalize_dish_name(row.dish_name)
+        ]
+
+        for start in range(0, len(dropped), CHUNK_SIZE):
+            conn.execute(delete(table).where(table.c.id.in_(dropped[start:start + CHUNK_SIZE])))
+        if changed:
+            stmt = update(table).where(table.c.id == bindparam("row_id")).values(dish_key=bindparam("key"))
+            conn.execute(stmt, [{"row_id": c["row_id"], "key": _temporary_key(c["row_id"])} for c in changed])
+            conn.execute(stmt, changed)
+
+        if conn.dialect.name == "postgresql":
+            # migrations/001 chỉ thêm cột: ràng buộc đặt sau khi mọi dòng đã có key
+            conn.execute(text("ALTER TABLE order_list ALTER COLUMN dish_key SET NOT NULL"))
+            conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS uq_order_list_table_dish_key "
+                              "ON order_list (table_id, dish_key)"))
+        if "dish_id" in {c["name"] for c in inspect(conn).get_columns("order_list")}:
+            # Sau migrations/003: món vừa đổi key có thể giờ mới khớp thực đơn
+            dish_id = select(Dish.id).where(Dish.dish_key == table.c.dish_key).scalar_subquery()
+            conn.execute(update(table).where(table.c.dish_id.is_(None)).values(dish_id=dish_id))
+    return len(changed), len(dropped)
+
+if __name__ == "__main__":
+    # Sau migrations/001 (và với DB đã chạy bản 001 cũ dùng lower(trim(...))): python -m app.services.dish_keys
+    from app.database import engine
+
+    changed, dropped = backfill_dish_keys(engine)
+    print(f"order_list.dish_key: {changed} rows updated, {dropped} duplicate rows merged")
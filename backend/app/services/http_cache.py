@@ -0,0 +1,24 @@
+from fastapi import Request, Response
+
+# Conditional GET: ETag + If-None-Match -> 304 không body
+
+def weak_etag(version: str) -> str:
+    # W/: cùng phiên bản dữ liệu nhưng JSON có thể khác thứ tự dòng
+    return f'W/"{version}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """So sánh yếu (bỏ W/) với từng tag trong If-None-Match"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    wanted = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == wanted for tag in header.split(","))
+
+def cache_headers(etag: str) -> dict:
+    # no-cache: trình duyệt được lưu nhưng phải hỏi lại server (If-None-Match) mỗi lần dùng
+    return {"ETag": etag, "Cache-Control": "no-cache"}
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=cache_headers(etag))
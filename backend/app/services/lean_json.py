@@ -0,0 +1,56 @@
+from typing import Callable, Dict, List, Sequence
+
+import orjson
+from fastapi import Response
+from sqlalchemy import Date, Time
+
+from app.models.models import Report
+from app.schemas.schemas import ReportResponse
+
+# Đường đọc danh sách lớn: SELECT đúng các cột của schema rồi orjson thẳng từ tuple,
+# không dựng ORM object + model Pydantic cho từng dòng. Định dạng giữ y như response_model.
+
+# Cùng thứ tự / tên field với ReportResponse (response_model của các route report)
+REPORT_COLUMNS = [getattr(Report, name) for name in ReportResponse.model_fields]
+
+# datetime: orjson tự ghi ISO 8601, OPT_UTC_Z -> "...Z" như Pydantic
+ORJSON_OPTIONS = orjson.OPT_UTC_Z
+
+def _memo(fmt: str) -> Callable:
+    # Ngày / giờ lặp lại rất nhiều giữa các dòng -> strftime 1 lần cho mỗi giá trị
+    cache: Dict = {}
+
+    def format_value(value):
+        text = cache.get(value)
+        if text is None and value is not None:
+            text = cache[value] = value.strftime(fmt)
+        return text
+    return format_value
+
+def _formatters(columns) -> Dict[int, Callable]:
+    """Vị trí cột DATE / TIME -> hàm định dạng giống DisplayDate / DisplayTime"""
+    formatters = {}
+    for i, column in enumerate(columns):
+        if isinstance(column.type, Date):
+            formatters[i] = _memo("%d/%m/%Y")
+        elif isinstance(column.type, Time):
+            formatters[i] = _memo("%H:%M:%S")
+    return formatters
+
+def dumps_rows(columns, rows: Sequence[Sequence]) -> bytes:
+    keys = [column.key for column in columns]
+    formatters = _formatters(columns)
+    if formatters:
+        items = list(formatters.items())
+        converted = []
+        for row in rows:
+            values = list(row)
+            for i, format_value in items:
+                values[i] = format_value(values[i])
+            converted.append(dict(zip(keys, values)))
+    else:
+        converted = [dict(zip(keys, row)) for row in rows]
+    return orjson.dumps(converted, option=ORJSON_OPTIONS)
+
+def rows_response(columns, rows: List[Sequence]) -> Response:
+    return Response(dumps_rows(columns, rows), media_type="application/json")
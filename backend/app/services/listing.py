@@ -0,0 +1,61 @@
+from typing import Iterable, Optional
+from fastapi import HTTPException
+
+from app.database import SessionLocal, AsyncSessionLocal
+
+# Số dòng đọc mỗi lần từ server-side cursor khi stream NDJSON
+STREAM_BATCH_SIZE = 500
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+def decode_cursor(cursor: Optional[str]) -> Optional[int]:
+    """Cursor là id của dòng cuối trang trước"""
+    if cursor is None:
+        return None
+    try:
+        return int(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor '{cursor}'")
+
+def apply_keyset(stmt, id_column, cursor: Optional[str], limit: Optional[int], descending: bool = False):
+    """Keyset pagination trên cột id (dùng index khóa chính, không OFFSET)"""
+    last_id = decode_cursor(cursor)
+    if descending:
+        if last_id is not None:
+            stmt = stmt.where(id_column < last_id)
+        stmt = stmt.order_by(id_column.desc())
+    else:
+        if last_id is not None:
+            stmt = stmt.where(id_column > last_id)
+        stmt = stmt.order_by(id_column.asc())
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return stmt
+
+def set_next_cursor(response, rows, limit: int):
+    """Trang đầy -> trả cursor trang sau qua header X-Next-Cursor"""
+    if len(rows) == limit:
+        response.headers["X-Next-Cursor"] = str(rows[-1].id)
+
+def ndjson_lines(rows: Iterable, schema):
+    """Các dòng đã có sẵn (trang keyset, dòng archive) -> từng dòng JSON"""
+    for obj in rows:
+        yield schema.model_validate(obj).model_dump_json() + "\n"
+
+def stream_ndjson(stmt, schema, archived: Iterable = ()):
+    """Đọc theo lô bằng yield_per và ghi từng dòng JSON, bộ nhớ không tăng theo số dòng (archived: ghi sau DB)"""
+    db = SessionLocal()
+    try:
+        for obj in db.scalars(stmt.execution_options(yield_per=STREAM_BATCH_SIZE)):
+            yield schema.model_validate(obj).model_dump_json() + "\n"
+    finally:
+        db.close()
+    yield from ndjson_lines(archived, schema)
+
+async def stream_ndjson_async(stmt, schema, archived: Iterable = ()):
+    """Bản async của stream_ndjson (DB_ASYNC=true)"""
+    async with AsyncSessionLocal() as db:
+        result = await db.stream_scalars(stmt.execution_options(yield_per=STREAM_BATCH_SIZE))
+        async for obj in result:
+            yield schema.model_validate(obj).model_dump_json() + "\n"
+    for line in ndjson_lines(archived, schema):
+        yield line
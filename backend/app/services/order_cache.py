@@ -0,0 +1,112 @@
+import json
+import logging
+import threading
+import time
+from typing import List, Optional
+
+import redis
+
+from app.config import settings
+from app.redis_client import get_redis, get_async_redis
+
+logger = logging.getLogger(__name__)
+
+ALL_ORDERS_KEY = "orders:all"
+
+def table_key(table_id: int) -> str:
+    return f"orders:table:{table_id}"
+
+def versioned_key(key: str, version: Optional[str]) -> Optional[str]:
+    # Gắn version (order_versions) vào key: ghi mới -> key mới, bản cũ tự hết hạn theo TTL (không cần xóa).
+    # Không đọc được version -> None: không cache, vì không có gì làm entry đó cũ đi
+    return None if version is None else f"{key}:{version}"
+
+class OrderCache:
+    """
+    Read-through cache cho trạng thái order theo bàn (Redis), key có version -> không bao giờ phải xóa.
+    Redis lỗi / không chạy -> tạm tắt cache trong RETRY_AFTER giây, router đọc thẳng DB.
+    """
+    RETRY_AFTER = 30
+
+    def __init__(self, ttl: int, enabled: bool = True):
+        self.ttl = ttl
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self._down_until = 0.0
+
+    def _available(self) -> bool:
+        return self.enabled and time.monotonic() >= self._down_until
+
+    # --- counters ---
+    def _count(self, field: str):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def _mark_down(self, e: Exception):
+        if time.monotonic() >= self._down_until:
+            logger.warning("Order cache disabled for %ss, Redis error: %s", self.RETRY_AFTER, e)
+        self._down_until = time.monotonic() + self.RETRY_AFTER
+        self._count("errors")
+
+    def _decode(self, raw: Optional[str]) -> Optional[List[dict]]:
+        if raw is None:
+            self._count("misses")
+            return None
+        self._count("hits")
+        return json.loads(raw)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "available": self._available(),
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
+
+    # --- sync API (router sync) ---
+    def get(self, key: Optional[str]) -> Optional[List[dict]]:
+        if key is None or not self._available():
+            return None
+        try:
+            return self._decode(get_redis().get(key))
+        except redis.RedisError as e:
+            self._mark_down(e)
+            return None
+
+    def set(self, key: Optional[str], rows: List[dict]):
+        if key is None or not self._available():
+            return
+        try:
+            get_redis().set(key, json.dumps(rows), ex=self.ttl)
+        except redis.RedisError as e:
+            self._mark_down(e)
+
+    # --- async API (router async) ---
+    async def aget(self, key: Optional[str]) -> Optional[List[dict]]:
+        if key is None or not self._available():
+            return None
+        try:
+            return self._decode(await get_async_redis().get(key))
+        except redis.RedisError as e:
+            self._mark_down(e)
+            return None
+
+    async def aset(self, key: Optional[str], rows: List[dict]):
+        if key is None or not self._available():
+            return
+        try:
+            await get_async_redis().set(key, json.dumps(rows), ex=self.ttl)
+        except redis.RedisError as e:
+            self._mark_down(e)
+
+order_cache = OrderCache(ttl=settings.ORDER_CACHE_TTL, enabled=settings.ORDER_CACHE_ENABLED)
+
+def serialize_orders(orders, schema) -> List[dict]:
+    return [schema.model_validate(o).model_dump(mode="json") for o in orders]
@@ -0,0 +1,29 @@
+from typing import List, Optional
+
+from app.services.order_events import order_events
+from app.services.order_versions import order_versions
+
+# Gọi sau MỖI commit ghi vào order_list: tăng version (ETag, đồng thời là key cache đọc) + đẩy sự kiện cho client đang nghe stream
+
+def orders_committed(table_id: Optional[int], events: List[dict]):
+    """table_id=None -> thay đổi trên toàn bộ bàn"""
+    order_versions.bump(table_id)
+    order_events.publish(events)
+
+async def orders_committed_async(table_id: Optional[int], events: List[dict]):
+    await order_versions.abump(table_id)
+    await order_events.apublish(events)
+
+# Thay đổi mới nằm trong write-behind buffer (chưa commit): cache vẫn đúng với DB (router overlay buffer),
+# chỉ đổi version (ETag) + phát sự kiện ngay
+def orders_buffered(table_id: int, events: List[dict]):
+    order_versions.bump(table_id)
+    order_events.publish(events)
+
+async def orders_buffered_async(table_id: int, events: List[dict]):
+    await order_versions.abump(table_id)
+    await order_events.apublish(events)
+
+# STORAGE_BACKEND=memory: store trong RAM tự giữ version (ETag), không có cache Redis -> chỉ phát sự kiện
+async def orders_live_changed(events: List[dict]):
+    await order_events.apublish(events)
@@ -0,0 +1,140 @@
+import asyncio
+import json
+import logging
+import threading
+from typing import List, Optional, Set
+
+import redis
+
+from app.config import settings
+from app.redis_client import get_redis, get_async_redis
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "orders:events"
+
+# --- Sự kiện thay đổi (gọn: bàn, món, số lượng, note) ---
+def upsert_event(order) -> dict:
+    return {"op": "upsert", "table": order.table_id, "dish": order.dish_name,
+            "quantity": order.quantity, "note": order.note or ""}
+
+def remove_event(table_id: int, dish_name: str) -> dict:
+    return {"op": "remove", "table": table_id, "dish": dish_name}
+
+def clear_event(table_id: Optional[int] = None) -> dict:
+    """table_id=None -> xóa toàn bộ order"""
+    return {"op": "clear", "table": table_id}
+
+class OrderEventBroadcaster:
+    """
+    Phát sự kiện order tới các client /api/orders/stream.
+    backend="memory": fan-out trong process (1 worker).
+    backend="redis": PUBLISH lên Redis, mỗi worker SUBSCRIBE rồi fan-out cho client của mình.
+    """
+    QUEUE_SIZE = 100
+
+    def __init__(self, backend: str = "memory"):
+        self.backend = backend
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._listener: Optional[asyncio.Task] = None
+        self._lock = threading.Lock()
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        if self.backend == "redis":
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        self._loop = None
+
+    # --- subscribers ---
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        with self._lock:
+            self._subscribers.discard(queue)
+
+    def _fanout(self, events: List[dict]):
+        """Chạy trên event loop"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for queue in subscribers:
+            for event in events:
+                try:
+                    queue.put_nowait(event)
+                except asyncio.QueueFull:
+                    # Client đọc không kịp -> bỏ hàng đợi, báo client tải lại toàn bộ
+                    while not queue.empty():
+                        queue.get_nowait()
+                    queue.put_nowait({"op": "resync"})
+                    break
+
+    def _fanout_threadsafe(self, events: List[dict]):
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._fanout(events)
+        else:
+            loop.call_soon_threadsafe(self._fanout, events)
+
+    # --- publish (gọi sau commit) ---
+    def publish(self, events: List[dict]):
+        """Dùng từ handler sync (threadpool)"""
+        if not events:
+            return
+        if self.backend == "redis":
+            try:
+                get_redis().publish(CHANNEL, json.dumps(events))
+                return
+            except redis.RedisError as e:
+                logger.warning("Redis publish failed, local fan-out only: %s", e)
+        self._fanout_threadsafe(events)
+
+    async def apublish(self, events: List[dict]):
+        """Dùng từ handler async"""
+        if not events:
+            return
+        if self.backend == "redis":
+            try:
+                await get_async_redis().publish(CHANNEL, json.dumps(events))
+                return
+            except redis.RedisError as e:
+                logger.warning("Redis publish failed, local fan-out only: %s", e)
+        self._fanout(events)
+
+    async def _listen(self):
+        while True:
+            pubsub = get_async_redis().pubsub()
+            try:
+                await pubsub.subscribe(CHANNEL)
+                while True:
+                    # timeout ngắn thay cho listen(): pool có socket_timeout, listen() sẽ bị ngắt
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message is not None:
+                        self._fanout(json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Order event listener error, retrying in 5s: %s", e)
+                await asyncio.sleep(5)
+            finally:
+                await pubsub.reset()
+
+order_events = OrderEventBroadcaster(backend=settings.ORDER_EVENTS_BACKEND)
@@ -0,0 +1,396 @@
+import asyncio
+import logging
+import os
+import threading
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+import orjson
+from sqlalchemy import delete, insert, select, text
+
+from app.config import settings
+from app.database import SessionLocal, AsyncSessionLocal
+from app.metrics import ORDER_JOURNAL_PENDING, ORDER_JOURNAL_FLUSHES
+from app.models.models import Order, normalize_dish_name
+from app.schemas.schemas import OrderResponse
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_CHUNK_SIZE = 500  # số id / 1 câu DELETE ... IN (...)
+
+class LiveOrder(OrderResponse):
+    """1 dòng order_list trong RAM, trả ra API y như OrderResponse"""
+
+    @property
+    def dish_key(self) -> str:
+        return normalize_dish_name(self.dish_name)
+
+async def run_in_session(work: Callable):
+    """work(session) chạy với Session sync: DB_ASYNC=true -> AsyncSession.run_sync, không thì trong threadpool"""
+    if settings.DB_ASYNC:
+        async with AsyncSessionLocal() as db:
+            return await db.run_sync(work)
+
+    def run():
+        with SessionLocal() as db:
+            return work(db)
+    return await asyncio.to_thread(run)
+
+def collapse_journal(entries: Iterable[dict]) -> Tuple[bool, Dict[int, Optional[dict]]]:
+    """
+    Gộp các bản ghi journal -> (có xóa toàn bộ không, id -> dòng cuối cùng hoặc None nếu đã xóa).
+    Áp dụng lại nhiều lần cho cùng kết quả (nạp lại journal sau crash an toàn).
+    """
+    clear = False
+    rows: Dict[int, Optional[dict]] = {}
+    for entry in entries:
+        if entry["op"] == "put":
+            rows[entry["row"]["id"]] = entry["row"]
+        elif entry["op"] == "del":
+            rows.update((order_id, None) for order_id in entry["ids"])
+        elif entry["op"] == "clear":
+            clear = True
+            rows.clear()
+    return clear, rows
+
+def write_journal(db, clear: bool, rows: Dict[int, Optional[dict]]):
+    """DELETE các id bị đụng tới rồi INSERT lại trạng thái cuối (cùng 1 transaction, không phụ thuộc dialect)"""
+    table = Order.__table__
+    if clear:
+        db.execute(delete(table))
+    ids = list(rows)
+    for start in range(0, len(ids), JOURNAL_CHUNK_SIZE):
+        db.execute(delete(table).where(table.c.id.in_(ids[start:start + JOURNAL_CHUNK_SIZE])))
+    live = [
+        {**order.model_dump(), "dish_key": order.dish_key}
+        for order in (LiveOrder.model_validate(row) for row in rows.values() if row is not None)
+    ]
+    if live:
+        db.execute(insert(table), live)
+        if db.get_bind().dialect.name == "postgresql":
+            # id do store cấp -> kéo sequence theo để INSERT của chế độ sql sau này không trùng id
+            db.execute(text("SELECT setval(pg_get_serial_sequence('order_list', 'id'), (SELECT MAX(id) FROM order_list))"))
+    db.commit()
+
+class OrderJournal:
+    """
+    Nhật ký append-only các thay đổi chưa ghi DB: {"op": "put", "row"} / {"op": "del", "ids"} / {"op": "clear"}.
+    Có path -> nối thêm từng dòng JSON vào file (không fsync); ghi DB xong thì cắt bỏ phần đã ghi.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path) if path else None
+        self.entries: List[dict] = []
+        self._file = None
+
+    def open(self) -> List[dict]:
+        """Mở file journal, trả về các bản ghi còn sót từ lần chạy trước (chưa kịp ghi DB)"""
+        leftover = []
+        if self.path is not None:
+            if self.path.exists():
+                for line in self.path.read_bytes().splitlines():
+                    try:
+                        leftover.append(orjson.loads(line))
+                    except orjson.JSONDecodeError:
+                        break  # dòng cuối ghi dở khi process chết
+            self._file = self.path.open("ab")
+        self.entries = list(leftover)
+        ORDER_JOURNAL_PENDING.set(len(self.entries))
+        return leftover
+
+    def append(self, entry: dict):
+        self.entries.append(entry)
+        ORDER_JOURNAL_PENDING.inc()
+        if self._file is not None:
+            self._file.write(orjson.dumps(entry) + b"\n")
+            self._file.flush()
+
+    def committed(self, count: int):
+        """count bản ghi đầu đã nằm trong DB -> bỏ khỏi journal (file viết lại sau bằng compact)"""
+        del self.entries[:count]
+        ORDER_JOURNAL_PENDING.set(len(self.entries))
+
+    def compact(self, lock: threading.Lock):
+        """
+        Viết lại file chỉ với các bản ghi còn lại: phần lớn ghi ra file tạm ngoài lock của store,
+        giữ lock chỉ để nối các bản ghi append trong lúc đó rồi đổi file.
+        Chỉ gọi từ flush (đã tuần tự) -> giữa 2 lần lấy lock, entries chỉ dài thêm.
+        """
+        if self.path is None:
+            return
+        with lock:
+            if self._file is None:
+                return
+            snapshot = list(self.entries)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with tmp.open("wb") as f:
+            f.write(b"".join(orjson.dumps(entry) + b"\n" for entry in snapshot))
+        with lock:
+            if self._file is None:
+                tmp.unlink(missing_ok=True)
+                return
+            with tmp.open("ab") as f:
+                f.write(b"".join(orjson.dumps(entry) + b"\n" for entry in self.entries[len(snapshot):]))
+            os.replace(tmp, self.path)  # chết giữa chừng: file cũ vẫn đủ, áp lại journal cho cùng kết quả
+            self._file.close()
+            self._file = self.path.open("ab")
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+class LiveOrderStore:
+    """
+    STORAGE_BACKEND=memory: toàn bộ order_list (chỉ bàn đang mở, vài trăm dòng) nằm trong RAM của 1 worker.
+    Đọc / ghi dưới 1 lock, không đi qua mạng; mỗi thay đổi nối vào journal và được ghi xuống DB
+    theo lô mỗi ORDER_STORE_FLUSH_MS ms. Khởi động: nạp order_list từ DB rồi áp phần journal còn sót.
+    """
+
+    def __init__(self, enabled: bool, flush_ms: int, journal_path: str):
+        self.enabled = enabled
+        self.interval = flush_ms / 1000
+        self.journal = OrderJournal(journal_path)
+        self._lock = threading.Lock()
+        self._by_id: Dict[int, LiveOrder] = {}
+        self._tables: Dict[int, Dict[str, LiveOrder]] = {}
+        self._next_id = 1
+        # ETag: epoch đổi mỗi lần khởi động, revision tăng theo mỗi thay đổi
+        self._epoch = uuid.uuid4().hex[:8]
+        self._revision = 0
+        self._table_revisions: Dict[int, int] = {}
+        self._bodies: Dict[Optional[int], bytes] = {}  # JSON dựng sẵn cho GET, xóa khi bàn thay đổi
+        self._loaded: Optional[asyncio.Event] = None
+        self.error: Optional[str] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+
+    # --- trạng thái trong RAM (gọi khi đang giữ _lock) ---
+    def _put(self, order: LiveOrder):
+        old = self._by_id.pop(order.id, None)
+        if old is not None and self._tables[old.table_id].get(old.dish_key) is old:
+            del self._tables[old.table_id][old.dish_key]
+        table = self._tables.setdefault(order.table_id, {})
+        other = table.get(order.dish_key)
+        if other is not None and other.id != order.id:
+            self._by_id.pop(other.id, None)
+        table[order.dish_key] = order
+        self._by_id[order.id] = order
+        self._next_id = max(self._next_id, order.id + 1)
+
+    def _drop(self, order_id: int) -> Optional[LiveOrder]:
+        order = self._by_id.pop(order_id, None)
+        if order is not None:
+            table = self._tables[order.table_id]
+            table.pop(order.dish_key, None)
+            if not table:
+                del self._tables[order.table_id]
+        return order
+
+    def _replay(self, entry: dict):
+        if entry["op"] == "put":
+            self._put(LiveOrder.model_validate(entry["row"]))
+        elif entry["op"] == "del":
+            for order_id in entry["ids"]:
+                self._drop(order_id)
+        elif entry["op"] == "clear":
+            self._by_id.clear()
+            self._tables.clear()
+
+    def _changed(self, table_ids: Iterable[Optional[int]]):
+        """table_ids chứa None -> mọi bàn đều đổi"""
+        self._revision += 1
+        if None in table_ids:
+            self._table_revisions = dict.fromkeys(set(self._table_revisions) | set(self._tables), self._revision)
+            self._bodies.clear()
+            return
+        for table_id in table_ids:
+            self._table_revisions[table_id] = self._revision
+            self._bodies.pop(table_id, None)
+        self._bodies.pop(None, None)
+
+    def _record_put(self, order: LiveOrder):
+        self._put(order)
+        self.journal.append({"op": "put", "row": order.model_dump(mode="json")})
+
+    def _new_order(self, values: dict) -> LiveOrder:
+        order_id = self._next_id
+        self._next_id += 1
+        return LiveOrder(id=order_id, created_at=datetime.now(timezone.utc), **values)
+
+    # --- đọc ---
+    def table_orders(self, table_id: int) -> List[LiveOrder]:
+        with self._lock:
+            return list(self._tables.get(table_id, {}).values())
+
+    def all_orders(self) -> List[LiveOrder]:
+        with self._lock:
+            return sorted(self._by_id.values(), key=lambda o: o.dish_name)
+
+    def get(self, table_id: int, dish_name: str) -> Optional[LiveOrder]:
+        with self._lock:
+            return self._tables.get(table_id, {}).get(normalize_dish_name(dish_name))
+
+    def version(self, table_id: Optional[int] = None) -> str:
+        """Token cho ETag: cả danh sách hoặc 1 bàn"""
+        revision = self._revision if table_id is None else self._table_revisions.get(table_id, 0)
+        return f"{self._epoch}.{revision}"
+
+    def body(self, table_id: Optional[int] = None) -> Tuple[str, bytes]:
+        """(version, JSON của danh sách) - dựng lại chỉ khi bàn đã đổi"""
+        with self._lock:
+            version = self.version(table_id)
+            body = self._bodies.get(table_id)
+            if body is None:
+                orders = (
+                    sorted(self._by_id.values(), key=lambda o: o.dish_name) if table_id is None
+                    else self._tables.get(table_id, {}).values()
+                )
+                body = self._bodies[table_id] = orjson.dumps([o.model_dump(mode="json") for o in orders])
+            return version, body
+
+    # --- ghi ---
+    def upsert(self, values: dict, update_fields: Iterable[str]) -> LiveOrder:
+        """Giống upsert_order: món đã có -> chỉ đổi update_fields, chưa có -> thêm dòng mới từ values"""
+        with self._lock:
+            existing = self._tables.get(values["table_id"], {}).get(normalize_dish_name(values["dish_name"]))
+            if existing is None:
+                order = self._new_order(values)
+            else:
+                order = existing.model_copy(update={field: values[field] for field in update_fields})
+            self._record_put(order)
+            self._changed([order.table_id])
+            return order
+
+    def update(self, table_id: int, dish_name: str, changes: dict) -> Optional[LiveOrder]:
+        with self._lock:
+            existing = self._tables.get(table_id, {}).get(normalize_dish_name(dish_name))
+            if existing is None:
+                return None
+            order = existing.model_copy(update=changes)
+            self._record_put(order)
+            self._changed([table_id])
+            return order
+
+    def apply_sync(self, table_id: int, delete_ids: List[int], updates: List[dict], inserts: List[dict]) -> List[LiveOrder]:
+        """Kết quả plan_table_sync: xóa / sửa / thêm trong 1 lần giữ lock, trả về trạng thái cuối của bàn"""
+        with self._lock:
+            if delete_ids:
+                for order_id in delete_ids:
+                    self._drop(order_id)
+                self.journal.append({"op": "del", "ids": list(delete_ids)})
+            for values in updates:
+                existing = self._by_id.get(values["id"])
+                if existing is not None:
+                    self._record_put(existing.model_copy(update={k: v for k, v in values.items() if k != "id"}))
+            for values in inserts:
+                values = {k: v for k, v in values.items() if k != "dish_key"}
+                self._record_put(self._new_order(values))
+            self._changed([table_id])
+            return list(self._tables.get(table_id, {}).values())
+
+    def remove(self, order_ids: List[int]) -> List[LiveOrder]:
+        with self._lock:
+            removed = [order for order in map(self._drop, order_ids) if order is not None]
+            if removed:
+                self.journal.append({"op": "del", "ids": [o.id for o in removed]})
+                self._changed({o.table_id for o in removed})
+            return removed
+
+    def remove_table(self, table_id: int, dish_name: Optional[str] = None) -> List[LiveOrder]:
+        with self._lock:
+            table = self._tables.get(table_id, {})
+            if dish_name is None:
+                ids = [o.id for o in table.values()]
+            else:
+                order = table.get(normalize_dish_name(dish_name))
+                ids = [order.id] if order is not None else []
+        return self.remove(ids)
+
+    def clear(self):
+        with self._lock:
+            self._by_id.clear()
+            self._tables.clear()
+            self.journal.append({"op": "clear"})
+            self._changed([None])
+
+    # --- ghi xuống DB ---
+    async def flush(self, reason: str = "timer") -> int:
+        """Ghi các bản ghi journal hiện có trong 1 transaction; lỗi -> giữ nguyên, lần sau thử lại"""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            with self._lock:
+                entries = list(self.journal.entries)
+            if not entries:
+                return 0
+            clear, rows = collapse_journal(entries)
+            await run_in_session(lambda db: write_journal(db, clear, rows))
+            with self._lock:
+                self.journal.committed(len(entries))
+            await asyncio.to_thread(self.journal.compact, self._lock)
+        ORDER_JOURNAL_FLUSHES.labels(reason=reason).inc()
+        return len(entries)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.warning("Order journal flush failed, retrying: %s", e)
+
+    # --- vòng đời (lifespan) ---
+    def _load(self, db) -> List[LiveOrder]:
+        return [LiveOrder.model_validate(o) for o in db.scalars(select(Order))]
+
+    async def _start(self, wait_for_schema: Callable[[], Awaitable[None]]):
+        try:
+            await wait_for_schema()
+            orders = await run_in_session(self._load)
+            with self._lock:
+                for order in orders:
+                    self._put(order)
+                leftover = self.journal.open()
+                for entry in leftover:
+                    self._replay(entry)
+                self._changed([None])
+            logger.info("Live order store: %d orders loaded, %d journal entries replayed", len(orders), len(leftover))
+        except Exception as e:
+            self.error = str(e)
+            logger.exception("Live order store failed to load: %s", e)
+        finally:
+            self._loaded.set()
+        if self.error is None:
+            await self._run()
+
+    async def start(self, wait_for_schema: Callable[[], Awaitable[None]]):
+        if self.enabled and self._task is None:
+            self._loaded = asyncio.Event()
+            self._task = asyncio.create_task(self._start(wait_for_schema))
+
+    async def ready(self) -> bool:
+        """Chờ nạp xong từ DB (request đến sớm lúc khởi động); False nếu nạp lỗi"""
+        if self._loaded is not None:
+            await self._loaded.wait()
+        return self._loaded is not None and self.error is None
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            if self.error is None:
+                await self.flush("shutdown")  # flush-on-shutdown
+            self.journal.close()
+
+live_orders = LiveOrderStore(
+    enabled=settings.STORAGE_BACKEND == "memory",
+    flush_ms=settings.ORDER_STORE_FLUSH_MS,
+    journal_path=settings.ORDER_JOURNAL_PATH,
+)
@@ -0,0 +1,73 @@
+from typing import Iterable
+from sqlalchemy import select
+
+from app.models.models import Order, normalize_dish_name
+
+def build_order_upsert(dialect, values: dict, update_fields: Iterable[str]):
+    """
+    INSERT ... ON CONFLICT (table_id, dish_key) DO UPDATE ... RETURNING trong 1 câu lệnh.
+    Trả None nếu dialect không hỗ trợ (SQLite < 3.35, DB khác) -> dùng đường fallback.
+    """
+    if not dialect.insert_returning:
+        return None
+    if dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+
+    stmt = insert(Order).values(**values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Order.table_id, Order.dish_key],
+        set_={field: stmt.excluded[field] for field in update_fields},
+    )
+    return stmt.returning(Order).execution_options(populate_existing=True)
+
+def _with_dish_key(values: dict) -> dict:
+    return {**values, "dish_key": normalize_dish_name(values["dish_name"])}
+
+def upsert_order(db, values: dict, update_fields: Iterable[str]) -> Order:
+    """Tạo mới hoặc cập nhật dòng (table_id, dish_key). Không commit."""
+    values = _with_dish_key(values)
+    update_fields = list(update_fields)
+    stmt = build_order_upsert(db.get_bind().dialect, values, update_fields)
+    if stmt is not None:
+        return db.scalars(stmt).one()
+
+    # Fallback: select theo index (table_id, dish_key) rồi insert / update
+    existing = db.scalars(
+        select(Order).where(Order.table_id == values["table_id"], Order.dish_key == values["dish_key"])
+    ).first()
+    if existing:
+        for field in update_fields:
+            setattr(existing, field, values[field])
+        db.flush()
+        return existing
+    order = Order(**values)
+    db.add(order)
+    db.flush()
+    db.refresh(order)
+    return order
+
+async def upsert_order_async(db, values: dict, update_fields: Iterable[str]) -> Order:
+    """Bản async của upsert_order"""
+    values = _with_dish_key(values)
+    update_fields = list(update_fields)
+    stmt = build_order_upsert(db.get_bind().dialect, values, update_fields)
+    if stmt is not None:
+        return (await db.scalars(stmt)).one()
+
+    existing = (await db.scalars(
+        select(Order).where(Order.table_id == values["table_id"], Order.dish_key == values["dish_key"])
+    )).first()
+    if existing:
+        for field in update_fields:
+            setattr(existing, field, values[field])
+        await db.flush()
+        return existing
+    order = Order(**values)
+    db.add(order)
+    await db.flush()
+    await db.refresh(order)
+    return order
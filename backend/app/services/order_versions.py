@@ -0,0 +1,142 @@
+import logging
+import threading
+import time
+import uuid
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import redis
+
+from app.config import settings
+from app.redis_client import get_redis, get_async_redis
+
+logger = logging.getLogger(__name__)
+
+# Tách khỏi tiền tố "orders:" của cache đọc (app/services/order_cache.py)
+PREFIX = "order_version:"
+EPOCH_KEY = PREFIX + "epoch"
+ALL_KEY = PREFIX + "all"      # tăng ở mọi lần ghi -> GET /api/orders/
+CLEAR_KEY = PREFIX + "clear"  # tăng khi xóa toàn bộ order -> đổi version của mọi bàn
+
+def _table_key(table_id: int) -> str:
+    return f"{PREFIX}table:{table_id}"
+
+def _keys_to_bump(table_id: Optional[int]) -> List[str]:
+    return [ALL_KEY, CLEAR_KEY if table_id is None else _table_key(table_id)]
+
+class OrderVersions:
+    """
+    Số phiên bản tăng dần của từng bàn -> ETag cho GET /api/orders/table/{id} và GET /api/orders/.
+    Tăng sau MỖI commit ghi order (app/services/order_changes.py), đọc trước khi đọc dữ liệu.
+    backend="memory": đếm trong process (1 worker); backend="redis": INCR trên Redis (nhiều worker).
+    Version có kèm epoch (đổi khi process khởi động lại / Redis mất dữ liệu) -> không trùng tag cũ.
+    Redis lỗi -> không trả version (router bỏ qua ETag, đọc như bình thường).
+    """
+    RETRY_AFTER = 30
+
+    def __init__(self, backend: str = "memory"):
+        self.backend = backend
+        self._epoch = uuid.uuid4().hex[:8]
+        self._counts: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        self._down_until = 0.0
+        self._missed_bump = False
+
+    def _mark_down(self, e: Exception):
+        if time.monotonic() >= self._down_until:
+            logger.warning("Order versions disabled for %ss, Redis error: %s", self.RETRY_AFTER, e)
+        self._down_until = time.monotonic() + self.RETRY_AFTER
+
+    def _available(self) -> bool:
+        return time.monotonic() >= self._down_until
+
+    def _token(self, epoch, *counts) -> str:
+        return ".".join([epoch if isinstance(epoch, str) else epoch.decode()] + [str(int(c or 0)) for c in counts])
+
+    def _read_pipeline(self, client, keys: List[str]):
+        # 1 round trip: tạo epoch nếu chưa có (lần đầu / Redis bị xóa) rồi đọc epoch + bộ đếm
+        pipe = client.pipeline(transaction=False)
+        if self._missed_bump:
+            pipe.delete(EPOCH_KEY)  # có lần tăng bị mất khi Redis lỗi -> đổi epoch, bỏ mọi tag cũ
+        pipe.set(EPOCH_KEY, uuid.uuid4().hex[:8], nx=True)
+        pipe.mget([EPOCH_KEY, *keys])
+        return pipe
+
+    # --- memory ---
+    def _memory_bump(self, table_id: Optional[int]):
+        with self._lock:
+            for key in _keys_to_bump(table_id):
+                self._counts[key] += 1
+
+    def _memory_version(self, keys: List[str]) -> str:
+        with self._lock:
+            return self._token(self._epoch, *(self._counts[k] for k in keys))
+
+    # --- sync API (router sync) ---
+    def bump(self, table_id: Optional[int]):
+        """table_id=None -> thay đổi trên toàn bộ bàn"""
+        if self.backend != "redis":
+            return self._memory_bump(table_id)
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            for key in _keys_to_bump(table_id):
+                pipe.incr(key)
+            pipe.execute()
+        except redis.RedisError as e:
+            self._missed_bump = True
+            self._mark_down(e)
+
+    def _version(self, keys: List[str]) -> Optional[str]:
+        if self.backend != "redis":
+            return self._memory_version(keys)
+        if not self._available():
+            return None
+        try:
+            *_, values = self._read_pipeline(get_redis(), keys).execute()
+        except redis.RedisError as e:
+            self._mark_down(e)
+            return None
+        self._missed_bump = False
+        return self._token(*values)
+
+    def table_version(self, table_id: int) -> Optional[str]:
+        return self._version([CLEAR_KEY, _table_key(table_id)])
+
+    def all_version(self) -> Optional[str]:
+        return self._version([ALL_KEY])
+
+    # --- async API (router async) ---
+    async def abump(self, table_id: Optional[int]):
+        if self.backend != "redis":
+            return self._memory_bump(table_id)
+        try:
+            pipe = get_async_redis().pipeline(transaction=False)
+            for key in _keys_to_bump(table_id):
+                pipe.incr(key)
+            await pipe.execute()
+        except redis.RedisError as e:
+            self._missed_bump = True
+            self._mark_down(e)
+
+    async def _aversion(self, keys: List[str]) -> Optional[str]:
+        if self.backend != "redis":
+            return self._memory_version(keys)
+        if not self._available():
+            return None
+        try:
+            *_, values = await self._read_pipeline(get_async_redis(), keys).execute()
+        except redis.RedisError as e:
+            self._mark_down(e)
+            return None
+        self._missed_bump = False
+        return self._token(*values)
+
+    async def atable_version(self, table_id: int) -> Optional[str]:
+        return await self._aversion([CLEAR_KEY, _table_key(table_id)])
+
+    async def aall_version(self) -> Optional[str]:
+        return await self._aversion([ALL_KEY])
+
+# Version đồng thời là key của cache Redis (dùng chung mọi worker) -> cache bật thì bộ đếm phải nằm trên Redis,
+# nếu không worker khác không thấy lần tăng và trả bản cache / 304 cũ. Cache tắt: cùng chế độ với order_events
+order_versions = OrderVersions(backend="redis" if settings.ORDER_CACHE_ENABLED else settings.ORDER_EVENTS_BACKEND)
@@ -0,0 +1,212 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import bindparam, update
+
+from app.config import settings
+from app.database import SessionLocal, AsyncSessionLocal
+from app.metrics import ORDER_WRITES_BUFFERED, ORDER_WRITES_COALESCED, ORDER_WRITE_FLUSHES, ORDER_ROWS_FLUSHED
+from app.models.models import Order, normalize_dish_name
+from app.schemas.schemas import OrderResponse
+from app.services.order_changes import orders_committed, orders_committed_async
+
+logger = logging.getLogger(__name__)
+
+Key = Tuple[int, str]  # (table_id, dish_key)
+
+class PendingWrite:
+    """Trạng thái mới nhất của 1 món đang chờ ghi + các cột cần UPDATE"""
+
+    def __init__(self, order: OrderResponse):
+        self.order = order
+        self.changes: Dict[str, object] = {}
+        self.first_at = time.monotonic()
+
+    def merge(self, changes: dict):
+        self.changes.update(changes)
+        self.order = self.order.model_copy(update=changes)
+
+class OrderWriteBuffer:
+    """
+    Write-behind cho PUT số lượng / note (ORDER_WRITE_BEHIND_MS > 0, 1 worker):
+    các lần bấm +/- cùng (bàn, món) trong cửa sổ được gộp trong RAM rồi ghi 1 transaction.
+    Chỉ gộp UPDATE cho dòng đã có (theo id) -> không tạo lại dòng đã bị xóa.
+    Đọc qua get_orders_by_table thấy ngay trạng thái đã gộp (overlay); ghi khác trên cùng bàn
+    (item, sync, checkout, xóa) flush bàn đó trước; shutdown flush hết.
+    """
+
+    def __init__(self, window_ms: int):
+        self.window = window_ms / 1000
+        self._pending: Dict[Key, PendingWrite] = {}
+        self._flushing: Dict[Key, PendingWrite] = {}  # đang ghi: overlay vẫn thấy cho tới khi commit xong
+        self._lock = threading.Lock()
+        # Router sync flush trong threadpool -> threading.Lock; router async flush trên event loop -> asyncio.Lock
+        self._flush_lock = threading.Lock()
+        self._aflush_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0
+
+    # --- ghi vào buffer (router) ---
+    def buffered(self, table_id: int, dish_name: str, changes: dict) -> Optional[OrderResponse]:
+        """Món đang chờ ghi -> gộp thêm thay đổi, trả trạng thái mới; chưa có -> None (router đọc dòng rồi gọi add)"""
+        with self._lock:
+            pending = self._pending.get((table_id, normalize_dish_name(dish_name)))
+            if pending is None:
+                return None
+            pending.merge(changes)
+            ORDER_WRITES_COALESCED.inc()
+            return pending.order
+
+    def add(self, order, changes: dict) -> OrderResponse:
+        """Lần đầu cho (bàn, món): order là dòng hiện tại trong DB"""
+        snapshot = OrderResponse.model_validate(order)
+        with self._lock:
+            key = (snapshot.table_id, normalize_dish_name(snapshot.dish_name))
+            pending = self._pending.get(key)
+            if pending is None:
+                # Món vừa được lấy ra để ghi (chưa commit) -> lấy trạng thái đó làm gốc thay cho dòng DB cũ
+                flushing = self._flushing.get(key)
+                pending = self._pending[key] = PendingWrite(flushing.order if flushing is not None else snapshot)
+                ORDER_WRITES_BUFFERED.inc()
+            else:  # request khác vừa thêm cùng món
+                ORDER_WRITES_COALESCED.inc()
+            pending.merge(changes)
+            return pending.order
+
+    # --- đọc ---
+    def overlay(self, orders: List[dict], table_id: Optional[int] = None) -> List[dict]:
+        """Thay các dòng đang chờ ghi bằng trạng thái đã gộp (dòng không còn trong DB thì bỏ qua)"""
+        with self._lock:
+            if not self._pending and not self._flushing:
+                return orders
+            latest = {
+                p.order.id: p.order
+                for p in (*self._flushing.values(), *self._pending.values())
+                if table_id is None or p.order.table_id == table_id
+            }
+        if not latest:
+            return orders
+        return [latest[o["id"]].model_dump(mode="json") if o["id"] in latest else o for o in orders]
+
+    # --- flush ---
+    def _take(self, table_id: Optional[int], older_than: Optional[float]) -> Dict[Key, PendingWrite]:
+        with self._lock:
+            keys = [
+                key for key, p in self._pending.items()
+                if (table_id is None or key[0] == table_id) and (older_than is None or p.first_at <= older_than)
+            ]
+            batch = {key: self._pending.pop(key) for key in keys}
+            self._flushing.update(batch)
+            return batch
+
+    def _done(self, batch: Dict[Key, PendingWrite], ok: bool):
+        with self._lock:
+            for key, pending in batch.items():
+                self._flushing.pop(key, None)
+                if not ok and key not in self._pending:
+                    self._pending[key] = pending  # ghi lỗi -> giữ lại, lần flush sau thử tiếp
+                elif not ok:
+                    # có thay đổi mới hơn trong lúc ghi: giữ cả cột cũ chưa ghi được
+                    newer = self._pending[key]
+                    newer.changes = {**pending.changes, **newer.changes}
+
+    @staticmethod
+    def _statements(batch: Dict[Key, PendingWrite]):
+        """UPDATE ... WHERE id = ? (executemany), 1 câu cho mỗi tổ hợp cột; dòng đã bị xóa -> 0 dòng, bỏ qua"""
+        groups: Dict[Tuple[str, ...], List[dict]] = {}
+        for p in batch.values():
+            if p.changes:
+                groups.setdefault(tuple(sorted(p.changes)), []).append({"order_id": p.order.id, **p.changes})
+        table = Order.__table__
+        for columns, params in groups.items():
+            stmt = update(table).where(table.c.id == bindparam("order_id")).values({c: bindparam(c) for c in columns})
+            yield stmt, params
+
+    def flush(self, table_id: Optional[int] = None, reason: str = "table", older_than: Optional[float] = None) -> int:
+        """Ghi các món đang chờ (router sync / threadpool) trong 1 transaction"""
+        if not self.enabled:
+            return 0
+        with self._flush_lock:
+            batch = self._take(table_id, older_than)
+            if not batch:
+                return 0
+            ok = False
+            try:
+                with SessionLocal() as db:
+                    for stmt, params in self._statements(batch):
+                        db.execute(stmt, params)
+                    db.commit()
+                ok = True
+                # Làm mới cache / version trước khi bỏ overlay (sự kiện đã phát lúc gộp)
+                for table in {key[0] for key in batch}:
+                    orders_committed(table, [])
+            finally:
+                self._done(batch, ok)
+        self._committed(batch, reason)
+        return len(batch)
+
+    async def aflush(self, table_id: Optional[int] = None, reason: str = "table", older_than: Optional[float] = None) -> int:
+        """Bản async (DB_ASYNC=true)"""
+        if not self.enabled:
+            return 0
+        if self._aflush_lock is None:
+            self._aflush_lock = asyncio.Lock()
+        async with self._aflush_lock:
+            batch = self._take(table_id, older_than)
+            if not batch:
+                return 0
+            ok = False
+            try:
+                async with AsyncSessionLocal() as db:
+                    for stmt, params in self._statements(batch):
+                        await db.execute(stmt, params)
+                    await db.commit()
+                ok = True
+                for table in {key[0] for key in batch}:
+                    await orders_committed_async(table, [])
+            finally:
+                self._done(batch, ok)
+        self._committed(batch, reason)
+        return len(batch)
+
+    def _committed(self, batch: Dict[Key, PendingWrite], reason: str):
+        ORDER_WRITE_FLUSHES.labels(reason=reason).inc()
+        ORDER_ROWS_FLUSHED.inc(len(batch))
+
+    async def _flush_due(self, reason: str, older_than: Optional[float] = None):
+        if settings.DB_ASYNC:
+            await self.aflush(None, reason, older_than)
+        else:
+            await asyncio.to_thread(self.flush, None, reason, older_than)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.window / 2)
+            try:
+                await self._flush_due("timer", time.monotonic() - self.window)
+            except Exception as e:
+                logger.warning("Order write-behind flush failed, retrying: %s", e)
+
+    # --- vòng đời (lifespan) ---
+    async def start(self):
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.enabled:
+            await self._flush_due("shutdown")
+
+order_write_buffer = OrderWriteBuffer(settings.ORDER_WRITE_BEHIND_MS)
@@ -0,0 +1,345 @@
+import argparse
+import logging
+import os
+import threading
+from collections import OrderedDict, namedtuple
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import delete, func, select, text
+
+from app.config import settings
+from app.models.models import Report
+from app.services.lean_json import REPORT_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# Tháng đã đóng của bảng report -> file Parquet (zstd) REPORT_ARCHIVE_DIR/report_YYYY-MM.parquet, rồi xóa khỏi DB:
+# bảng nóng chỉ còn REPORT_HOT_MONTHS tháng gần nhất. Các route report đọc thêm file khi khoảng ngày chạm tới
+# tháng đã archive (không có from -> gồm mọi tháng). pandas / pyarrow chỉ import khi thật sự có file.
+# Archive chỉ đọc: DELETE /api/reports/{id} của dòng đã archive trả 409; DELETE /api/reports xóa cả các file.
+FILE_PATTERN = "report_*.parquet"
+TMP_SUFFIX = ".tmp"
+MAX_CACHED_MONTHS = 24
+DELETE_CHUNK_SIZE = 1000
+PARTITIONS_AHEAD = 2  # Postgres: tạo sẵn partition cho tháng này + 2 tháng tới
+
+ARCHIVE_COLUMNS = [column.key for column in Report.__table__.columns]
+# Dòng đọc từ archive: cùng thứ tự / tên với REPORT_COLUMNS (rows_response, set_next_cursor dùng được luôn)
+ArchivedReport = namedtuple("ArchivedReport", [column.key for column in REPORT_COLUMNS])
+
+def add_months(month: date, n: int) -> date:
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+def month_file(directory: Path, month: date) -> Path:
+    return directory / f"report_{month:%Y-%m}.parquet"
+
+def partition_name(month: date) -> str:
+    return f"report_{month:%Y_%m}"
+
+def _records(df) -> List[dict]:
+    # Giá trị numpy -> kiểu Python (cộng / ghi DB như kết quả SQL)
+    return [
+        {name: value.item() if hasattr(value, "item") else value for name, value in record.items()}
+        for record in df.to_dict("records")
+    ]
+
+class ReportArchive:
+    """Đọc các tháng đã archive; DataFrame của từng file cache trong process (file đổi -> đọc lại theo mtime)"""
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self._months_key = None
+        self._months: List[date] = []
+        self._frames: "OrderedDict[Path, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def months(self) -> List[date]:
+        """Ngày đầu của các tháng đã có file (chỉ listdir khi thư mục đổi)"""
+        try:
+            key = self.directory.stat().st_mtime_ns
+        except FileNotFoundError:
+            return []
+        if key != self._months_key:
+            months = []
+            for path in self.directory.glob(FILE_PATTERN):
+                year, _, month = path.stem[len("report_"):].partition("-")
+                months.append(date(int(year), int(month), 1))
+            self._months, self._months_key = sorted(months), key
+        return self._months
+
+    def months_in_range(self, date_from: Optional[date], date_to: Optional[date]) -> List[date]:
+        return [
+            month for month in self.months()
+            if (date_from is None or add_months(month, 1) > date_from) and (date_to is None or month <= date_to)
+        ]
+
+    def reaches(self, date_from: Optional[date], date_to: Optional[date]) -> bool:
+        return bool(self.months_in_range(date_from, date_to))
+
+    def _frame(self, month: date):
+        import pandas as pd
+
+        path = month_file(self.directory, month)
+        mtime = path.stat().st_mtime_ns
+        with self._lock:
+            cached = self._frames.get(path)
+            if cached is not None and cached[0] == mtime:
+                self._frames.move_to_end(path)
+                return cached[1]
+        frame = pd.read_parquet(path, engine="pyarrow")
+        with self._lock:
+            self._frames[path] = (mtime, frame)
+            while len(self._frames) > MAX_CACHED_MONTHS:
+                self._frames.popitem(last=False)
+        return frame
+
+    def frame(self, date_from: Optional[date] = None, date_to: Optional[date] = None,
+              table_id: Optional[int] = None, before_id: Optional[int] = None):
+        """Các dòng archive trong khoảng ngày, id giảm dần"""
+        import pandas as pd
+
+        frames = []
+        for month in self.months_in_range(date_from, date_to):
+            df = self._frame(month)
+            mask = pd.Series(True, index=df.index)
+            if date_from is not None:
+                mask &= df["date"] >= date_from
+            if date_to is not None:
+                mask &= df["date"] <= date_to
+            if table_id is not None:
+                mask &= df["table_id"] == table_id
+            if before_id is not None:
+                mask &= df["id"] < before_id
+            frames.append(df[mask])
+        if not frames:
+            return pd.DataFrame(columns=ARCHIVE_COLUMNS)
+        return pd.concat(frames, ignore_index=True).sort_values("id", ascending=False)
+
+    def rows(self, date_from: Optional[date] = None, date_to: Optional[date] = None,
+             table_id: Optional[int] = None, before_id: Optional[int] = None,
+             limit: Optional[int] = None, descending: bool = True) -> List[ArchivedReport]:
+        if not self.reaches(date_from, date_to):
+            return []
+        df = self.frame(date_from, date_to, table_id, before_id)
+        if limit is not None:
+            df = df.head(limit)
+        if not descending:
+            df = df.iloc[::-1]
+        import pandas as pd
+
+        columns = [
+            [None if value is pd.NaT else value.to_pydatetime() for value in df[name]] if name == "created_at"
+            else df[name].tolist()
+            for name in ArchivedReport._fields
+        ]
+        return [ArchivedReport(*values) for values in zip(*columns)]
+
+    def export_rows(self, date_from: Optional[date], date_to: Optional[date]) -> Iterator[tuple]:
+        """Cột của file xuất (build_export_query), id tăng dần -> đứng trước các dòng trong DB"""
+        if not self.reaches(date_from, date_to):
+            return iter(())
+        df = self.frame(date_from, date_to).iloc[::-1]
+        names = ["table_id", "date", "hour", "product_code", "product_name", "quantity", "total", "ship_fee", "discount"]
+        return zip(*(df[name].tolist() for name in names))
+
+    def summary(self, group_by: Optional[str], date_from: Optional[date], date_to: Optional[date]) -> List[dict]:
+        """Giống build_summary_query nhưng trên archive (key chưa định dạng), gộp bằng merge_summaries"""
+        if not self.reaches(date_from, date_to):
+            return []
+        df = self.frame(date_from, date_to)
+        if df.empty:
+            return []
+        if group_by is None:
+            return [{
+                "rows": len(df),
+                "quantity": int(df["quantity"].sum()),
+                "revenue": float(df["total"].sum()),
+                "discount": float(df["discount"].sum()),
+                "ship_fee": float(df["ship_fee"].sum()),
+            }]
+        keys = {
+            "day": lambda: df["date"],
+            "hour": lambda: df["hour"].map(lambda t: t.hour),
+            "table": lambda: df["table_id"],
+            "product": lambda: df["product_code"],
+        }
+        aggregates = dict(
+            rows=("id", "count"), quantity=("quantity", "sum"), revenue=("total", "sum"),
+            discount=("discount", "sum"), ship_fee=("ship_fee", "sum"),
+        )
+        if group_by == "product":
+            aggregates["product_name"] = ("product_name", "max")
+        grouped = df.assign(key=keys[group_by]()).groupby("key", sort=False).agg(**aggregates).reset_index()
+        return _records(grouped)
+
+    def daily_sales(self, date_from: Optional[date] = None, date_to: Optional[date] = None) -> List[dict]:
+        """Tổng theo (date, product_code, table_id) của các tháng đã archive (dựng lại bảng daily_sales)"""
+        if not self.reaches(date_from, date_to):
+            return []
+        df = self.frame(date_from, date_to)
+        grouped = df.groupby(["date", "product_code", "table_id"], sort=False).agg(
+            product_name=("product_name", "max"), rows=("id", "count"), quantity=("quantity", "sum"),
+            revenue=("total", "sum"), discount=("discount", "sum"), ship_fee=("ship_fee", "sum"),
+        ).reset_index()
+        return _records(grouped)
+
+    def merge_page(self, rows: list, date_from: Optional[date], date_to: Optional[date],
+                   before_id: Optional[int], limit: int) -> list:
+        """
+        Trang keyset (id giảm dần) trên DB + archive: dòng nhập lùi ngày có thể được archive sau với id lớn
+        hơn dòng còn trong DB -> lấy tối đa limit dòng mỗi bên rồi trộn theo id, không nối đơn giản.
+        """
+        archived = self.rows(date_from, date_to, before_id=before_id, limit=limit)
+        if not archived:
+            return rows
+        return sorted([*rows, *archived], key=lambda row: row.id, reverse=True)[:limit]
+
+    def contains(self, report_id: int) -> bool:
+        """id nằm trong 1 tháng đã archive (route xóa 1 dòng: archive chỉ đọc)"""
+        return any((self._frame(month)["id"] == report_id).any() for month in self.months())
+
+    def clear(self) -> int:
+        """
+        Xóa mọi file archive (DELETE /api/reports, sau khi DB đã commit); gồm cả file .tmp còn sót, nếu không
+        recover_pending sẽ đổi tên lại thành tháng đã archive. Trả về số tháng đã xóa.
+        """
+        months = self.months()
+        for path in [*self.directory.glob(FILE_PATTERN), *self.directory.glob(FILE_PATTERN + TMP_SUFFIX)]:
+            path.unlink(missing_ok=True)
+        with self._lock:
+            self._frames.clear()
+        self._months_key = None
+        return len(months)
+
+report_archive = ReportArchive(settings.REPORT_ARCHIVE_DIR)
+
+# --- Ghi archive (chạy định kỳ, 1 process: python -m app.services.report_archive) ---
+def _write_parquet(rows, path: Path, existing: Optional[Path]):
+    import pandas as pd
+
+    df = pd.DataFrame.from_records([tuple(row) for row in rows], columns=ARCHIVE_COLUMNS)
+    # Giữ created_at như DB trả (Postgres có múi giờ, SQLite không) -> response giống hệt trước khi archive
+    aware = any(value is not None and value.tzinfo is not None for value in df["created_at"])
+    df["created_at"] = pd.to_datetime(df["created_at"], utc=aware)
+    if existing is not None and existing.exists():
+        # Tháng đã có file (dòng nhập lùi ngày sau lần archive trước) -> gộp, id trùng lấy bản mới
+        df = pd.concat([pd.read_parquet(existing, engine="pyarrow"), df], ignore_index=True)
+        df = df.drop_duplicates("id", keep="last").sort_values("id")
+    df.to_parquet(path, engine="pyarrow", compression="zstd", index=False)
+    if len(pd.read_parquet(path, engine="pyarrow", columns=["id"])) != len(df):
+        raise RuntimeError(f"Archive file {path} is incomplete")
+    return len(df)
+
+def _is_partitioned(conn) -> bool:
+    if conn.dialect.name != "postgresql":
+        return False
+    return conn.execute(text("SELECT relkind FROM pg_class WHERE oid = to_regclass('report')")).scalar() == "p"
+
+def ensure_partitions(conn, first: date, count: int = PARTITIONS_AHEAD + 1):
+    """Postgres (report đã partition theo tháng, migrations/004): tạo partition cho các tháng sắp tới"""
+    if not _is_partitioned(conn):
+        return
+    for month in (add_months(first, i) for i in range(count)):
+        try:
+            with conn.begin_nested():
+                conn.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF report "
+                    f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+                ))
+        except Exception as e:
+            # report_default đang giữ dòng của tháng này -> để nguyên trong default, không chặn archive
+            logger.warning("Cannot create partition %s: %s", partition_name(month), e)
+
+def _drop_empty_partition(conn, month: date):
+    if _is_partitioned(conn):
+        name = partition_name(month)
+        if conn.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar() is not None:
+            if conn.execute(text(f"SELECT NOT EXISTS (SELECT 1 FROM {name})")).scalar():
+                conn.execute(text(f"DROP TABLE {name}"))
+
+def recover_pending(engine, directory: Path) -> int:
+    """
+    File .tmp còn sót (process chết giữa commit và đổi tên): dòng của nó không còn trong DB -> commit đã xong,
+    đổi tên thành file thật; còn trong DB -> transaction đã rollback, bỏ file.
+    """
+    recovered = 0
+    for tmp in directory.glob(FILE_PATTERN + TMP_SUFFIX):
+        import pandas as pd
+
+        ids = pd.read_parquet(tmp, engine="pyarrow", columns=["id"])["id"].tolist()
+        with engine.connect() as conn:
+            in_db = any(
+                conn.execute(select(Report.id).where(Report.id.in_(ids[start:start + DELETE_CHUNK_SIZE])).limit(1)).first()
+                for start in range(0, len(ids), DELETE_CHUNK_SIZE)
+            )
+        if in_db:
+            tmp.unlink()
+        else:
+            os.replace(tmp, tmp.with_suffix(""))
+            recovered += 1
+    return recovered
+
+def archive_month(engine, directory: Path, month: date, dry_run: bool = False) -> int:
+    """Chuyển các dòng report của 1 tháng sang Parquet rồi xóa khỏi DB; trả về số dòng đã chuyển"""
+    final = month_file(directory, month)
+    tmp = final.with_name(final.name + TMP_SUFFIX)
+    table = Report.__table__
+    # Điều kiện theo tháng -> Postgres chỉ đụng 1 partition
+    in_month = (table.c.date >= month, table.c.date < add_months(month, 1))
+    try:
+        with engine.begin() as conn:
+            rows = conn.execute(select(table).where(*in_month).order_by(table.c.id)).all()
+            if not rows or dry_run:
+                return len(rows)
+            _write_parquet(rows, tmp, final)
+            ids = [row.id for row in rows]
+            for start in range(0, len(ids), DELETE_CHUNK_SIZE):
+                conn.execute(delete(table).where(*in_month, table.c.id.in_(ids[start:start + DELETE_CHUNK_SIZE])))
+    except Exception:
+        tmp.unlink(missing_ok=True)
+        raise
+    # File chỉ xuất hiện sau khi DB đã xóa xong -> route đọc không bao giờ thấy 1 dòng ở cả 2 nơi
+    os.replace(tmp, final)
+    return len(rows)
+
+def archive_closed_months(engine, keep_months: int = settings.REPORT_HOT_MONTHS,
+                          today: Optional[date] = None, dry_run: bool = False) -> Dict[date, int]:
+    """Archive mọi tháng trước keep_months tháng gần nhất (tính cả tháng hiện tại)"""
+    directory = Path(settings.REPORT_ARCHIVE_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    if not dry_run:
+        recover_pending(engine, directory)
+    current = (today or date.today()).replace(day=1)
+    cutoff = add_months(current, -(max(keep_months, 1) - 1))
+
+    with engine.connect() as conn:
+        oldest = conn.execute(select(func.min(Report.date)).where(Report.date < cutoff)).scalar()
+    archived: Dict[date, int] = {}
+    month = oldest.replace(day=1) if oldest is not None else cutoff
+    while month < cutoff:
+        archived[month] = archive_month(engine, directory, month, dry_run)
+        month = add_months(month, 1)
+
+    if not dry_run:
+        with engine.begin() as conn:
+            for month in archived:
+                _drop_empty_partition(conn, month)
+            ensure_partitions(conn, current)
+    return archived
+
+if __name__ == "__main__":
+    # Chạy định kỳ (cron đầu tháng): python -m app.services.report_archive [--keep-months 3] [--dry-run]
+    parser = argparse.ArgumentParser(description="Move closed months of the report table to Parquet files")
+    parser.add_argument("--keep-months", type=int, default=settings.REPORT_HOT_MONTHS,
+                        help="months kept in the DB, current month included")
+    parser.add_argument("--dry-run", action="store_true", help="only count the rows that would be archived")
+    args = parser.parse_args()
+
+    from app.database import engine
+    result = archive_closed_months(engine, args.keep_months, dry_run=args.dry_run)
+    for month, count in result.items():
+        print(f"{month:%Y-%m}: {count} rows {'to archive' if args.dry_run else 'archived'}")
+    print(f"Archive directory: {Path(settings.REPORT_ARCHIVE_DIR).resolve()}")
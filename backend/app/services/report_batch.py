@@ -0,0 +1,81 @@
+from typing import Iterator, List
+
+from sqlalchemy import insert
+
+from app.models.models import Report
+from app.schemas.schemas import ReportCreate
+from app.services.daily_sales import add_to_daily_sales, add_to_daily_sales_async
+
+# 9 cột x 1000 dòng = 9000 tham số / câu lệnh, dưới giới hạn của SQLite (32766) và Postgres (32767)
+BATCH_CHUNK_SIZE = 1000
+
+def report_rows(requests) -> List[dict]:
+    """AddReportRequest (field của frontend) -> dict theo cột của bảng report"""
+    return [
+        ReportCreate(
+            table_id=r.tableNumber, date=r.date, hour=r.time,
+            product_code=r.code, product_name=r.nameDish,
+            quantity=r.quantity, total=r.totalCheck,
+            ship_fee=r.shipFee, discount=r.discountCheck
+        ).model_dump()
+        for r in requests
+    ]
+
+def _chunks(rows: List[dict], size: int) -> Iterator[List[dict]]:
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+def _returning_supported(db) -> bool:
+    return db.get_bind().dialect.insert_returning
+
+def insert_reports(db, rows: List[dict], returning: bool = True,
+                   chunk_size: int = BATCH_CHUNK_SIZE) -> List[Report]:
+    """
+    INSERT INTO report VALUES (...), (...) ... [RETURNING *] theo từng chunk, cộng vào daily_sales trong cùng transaction.
+    returning=False -> không đọc lại dòng nào, trả list rỗng. Không commit.
+    """
+    if not rows:
+        return []
+    add_to_daily_sales(db, rows)
+    if not returning:
+        for chunk in _chunks(rows, chunk_size):
+            db.execute(insert(Report).values(chunk))
+        return []
+
+    if not _returning_supported(db):
+        # Fallback: ORM add + refresh (DB không có INSERT ... RETURNING)
+        created = [Report(**row) for row in rows]
+        db.add_all(created)
+        db.flush()
+        for obj in created:
+            db.refresh(obj)
+        return created
+
+    created = []
+    for chunk in _chunks(rows, chunk_size):
+        created.extend(db.scalars(insert(Report).values(chunk).returning(Report)))
+    return created
+
+async def insert_reports_async(db, rows: List[dict], returning: bool = True,
+                               chunk_size: int = BATCH_CHUNK_SIZE) -> List[Report]:
+    """Bản async của insert_reports"""
+    if not rows:
+        return []
+    await add_to_daily_sales_async(db, rows)
+    if not returning:
+        for chunk in _chunks(rows, chunk_size):
+            await db.execute(insert(Report).values(chunk))
+        return []
+
+    if not _returning_supported(db):
+        created = [Report(**row) for row in rows]
+        db.add_all(created)
+        await db.flush()
+        for obj in created:
+            await db.refresh(obj)
+        return created
+
+    created = []
+    for chunk in _chunks(rows, chunk_size):
+        created.extend(await db.scalars(insert(Report).values(chunk).returning(Report)))
+    return created
@@ -0,0 +1,141 @@
+import csv
+import io
+import tempfile
+from datetime import date
+from typing import Iterable, Optional
+
+from sqlalchemy import select
+from starlette.concurrency import run_in_threadpool
+
+from app.database import SessionLocal, AsyncSessionLocal
+from app.models.models import Report
+from app.services.listing import STREAM_BATCH_SIZE
+from app.services.report_summary import apply_date_range
+
+# Cùng cột với nút "Xuất Excel" ở trang Report
+EXPORT_HEADERS = ["Bàn", "Ngày", "Giờ", "Mã hàng", "Tên hàng", "Số lượng", "Tổng cộng", "Thu thêm", "Giảm giá"]
+EXPORT_COLUMN_WIDTHS = [6, 12, 10, 10, 32, 10, 14, 12, 12]
+MONEY_FORMAT = '#,##0 "₫"'
+MONEY_COLUMNS = {6, 7, 8}
+DATE_COLUMN, TIME_COLUMN = 1, 2
+CELL_FORMATS = {DATE_COLUMN: "dd/mm/yyyy", TIME_COLUMN: "hh:mm:ss", **{i: MONEY_FORMAT for i in MONEY_COLUMNS}}
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",  # Starlette tự thêm "; charset=utf-8"
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+FILE_READ_SIZE = 64 * 1024
+
+def build_export_query(date_from: Optional[date] = None, date_to: Optional[date] = None):
+    """Chỉ lấy các cột cần xuất, đọc theo lô (server-side cursor) theo thứ tự id"""
+    stmt = select(
+        Report.table_id, Report.date, Report.hour, Report.product_code, Report.product_name,
+        Report.quantity, Report.total, Report.ship_fee, Report.discount,
+    )
+    stmt = apply_date_range(stmt, date_from, date_to).order_by(Report.id)
+    return stmt.execution_options(yield_per=STREAM_BATCH_SIZE)
+
+def export_headers(fmt: str, date_from: Optional[date], date_to: Optional[date]) -> dict:
+    period = "_".join(d.isoformat() for d in (date_from, date_to) if d is not None) or "all"
+    return {"Content-Disposition": f'attachment; filename="BaoCaoDonHang_{period}.{fmt}"'}
+
+# --- CSV: gửi header ngay, sau đó mỗi lô dòng là 1 chunk ---
+def _csv_row(row) -> list:
+    cells = list(row)
+    cells[DATE_COLUMN] = cells[DATE_COLUMN].strftime("%d/%m/%Y")
+    cells[TIME_COLUMN] = cells[TIME_COLUMN].strftime("%H:%M:%S")
+    return cells
+
+def _csv_chunk(rows: Iterable) -> bytes:
+    buf = io.StringIO()
+    csv.writer(buf).writerows(rows)
+    return buf.getvalue().encode("utf-8")
+
+def _csv_header() -> bytes:
+    # BOM để Excel nhận đúng UTF-8 (tên món tiếng Việt)
+    return "\ufeff".encode("utf-8") + _csv_chunk([EXPORT_HEADERS])
+
+# archived: dòng của các tháng đã chuyển sang Parquet (ReportArchive.export_rows), id nhỏ hơn -> ghi trước
+def stream_csv(stmt, archived: Iterable = ()):
+    yield _csv_header()
+    yield _csv_chunk(_csv_row(row) for row in archived)
+    db = SessionLocal()
+    try:
+        for partition in db.execute(stmt).partitions():
+            yield _csv_chunk(_csv_row(row) for row in partition)
+    finally:
+        db.close()
+
+async def stream_csv_async(stmt, archived: Iterable = ()):
+    yield _csv_header()
+    yield _csv_chunk(_csv_row(row) for row in archived)
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(stmt)
+        async for partition in result.partitions():
+            yield _csv_chunk(_csv_row(row) for row in partition)
+
+# --- XLSX: openpyxl write-only ghi từng dòng ra file tạm, xong mới zip -> stream file ---
+def _new_workbook():
+    # openpyxl nặng (~100ms import) -> chỉ import khi có người xuất file
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.utils import get_column_letter
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("BaoCao")
+    for i, width in enumerate(EXPORT_COLUMN_WIDTHS, start=1):
+        ws.column_dimensions[get_column_letter(i)].width = width
+    ws.append(EXPORT_HEADERS)
+    return wb, ws, WriteOnlyCell
+
+def _xlsx_row(ws, row, cell_class) -> list:
+    # Ngày / giờ ghi thành ô kiểu date / time của Excel (lọc, sắp xếp được)
+    cells = list(row)
+    for i, number_format in CELL_FORMATS.items():
+        cell = cell_class(ws, value=cells[i])
+        cell.number_format = number_format
+        cells[i] = cell
+    return cells
+
+def stream_xlsx(stmt, archived: Iterable = ()):
+    wb, ws, cell_class = _new_workbook()
+    for row in archived:
+        ws.append(_xlsx_row(ws, row, cell_class))
+    db = SessionLocal()
+    try:
+        for row in db.execute(stmt):
+            ws.append(_xlsx_row(ws, row, cell_class))
+    finally:
+        db.close()
+
+    with tempfile.TemporaryFile() as f:
+        wb.save(f)
+        f.seek(0)
+        while True:
+            chunk = f.read(FILE_READ_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+async def stream_xlsx_async(stmt, archived: Iterable = ()):
+    wb, ws, cell_class = _new_workbook()
+    for row in archived:
+        ws.append(_xlsx_row(ws, row, cell_class))
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(stmt)
+        async for partition in result.partitions():
+            for row in partition:
+                ws.append(_xlsx_row(ws, row, cell_class))
+
+    # Nén + đọc file chạy trong threadpool, không chặn event loop
+    f = tempfile.TemporaryFile()
+    try:
+        await run_in_threadpool(wb.save, f)
+        f.seek(0)
+        while True:
+            chunk = await run_in_threadpool(f.read, FILE_READ_SIZE)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        f.close()
@@ -0,0 +1,121 @@
+from datetime import date
+from typing import List, Optional
+from sqlalchemy import select, func, extract
+
+from app.models.models import DailySales, Report
+
+# Các kiểu gộp hỗ trợ cho /api/reports/summary/{group_by}
+GROUP_BY_COLUMNS = {
+    "day": lambda: Report.date,
+    "hour": lambda: extract("hour", Report.hour),  # 14:05:09 -> 14
+    "table": lambda: Report.table_id,
+    "product": lambda: Report.product_code,
+}
+
+# Nhóm tính được từ bảng rollup daily_sales (khóa date, product_code, table_id); theo giờ vẫn phải gộp trên report
+ROLLUP_GROUPS = {None, "day", "table", "product"}
+ROLLUP_GROUP_BY_COLUMNS = {
+    "day": lambda: DailySales.date,
+    "table": lambda: DailySales.table_id,
+    "product": lambda: DailySales.product_code,
+}
+
+def apply_date_range(stmt, date_from: Optional[date], date_to: Optional[date], column=Report.date):
+    """Lọc theo khoảng ngày (bao gồm cả hai đầu) trên cột date -> dùng index (date, product_code)"""
+    if date_from is not None:
+        stmt = stmt.where(column >= date_from)
+    if date_to is not None:
+        stmt = stmt.where(column <= date_to)
+    return stmt
+
+def build_summary_query(group_by: Optional[str] = None,
+                        date_from: Optional[date] = None,
+                        date_to: Optional[date] = None):
+    """SELECT ... GROUP BY chạy trong DB, số dòng trả về = số nhóm"""
+    aggregates = [
+        func.count(Report.id).label("rows"),
+        func.coalesce(func.sum(Report.quantity), 0).label("quantity"),
+        func.coalesce(func.sum(Report.total), 0).label("revenue"),
+        func.coalesce(func.sum(Report.discount), 0).label("discount"),
+        func.coalesce(func.sum(Report.ship_fee), 0).label("ship_fee"),
+    ]
+
+    if group_by is None:
+        return apply_date_range(select(*aggregates), date_from, date_to)
+
+    key = GROUP_BY_COLUMNS[group_by]().label("key")
+    columns = [key]
+    if group_by == "product":
+        columns.append(func.max(Report.product_name).label("product_name"))
+    stmt = select(*columns, *aggregates).group_by(key)
+    stmt = apply_date_range(stmt, date_from, date_to)
+
+    if group_by == "product":
+        return stmt.order_by(func.sum(Report.quantity).desc())
+    return stmt.order_by(key)
+
+SUM_FIELDS = ("rows", "quantity", "revenue", "discount", "ship_fee")
+
+def format_summary(data: dict, group_by: Optional[str] = None) -> dict:
+    if group_by == "day":
+        data["key"] = data["key"].strftime("%d/%m/%Y")  # cùng định dạng với field date của report
+    elif group_by == "hour":
+        data["key"] = f"{int(data['key']):02d}"  # EXTRACT trả numeric trên Postgres
+    elif group_by is not None:
+        data["key"] = str(data["key"])
+    return data
+
+def build_rollup_query(group_by: Optional[str] = None,
+                       date_from: Optional[date] = None,
+                       date_to: Optional[date] = None):
+    """Cùng cột / thứ tự với build_summary_query nhưng cộng các dòng daily_sales (đã gồm tháng archive)"""
+    aggregates = [
+        func.coalesce(func.sum(DailySales.rows), 0).label("rows"),
+        func.coalesce(func.sum(DailySales.quantity), 0).label("quantity"),
+        func.coalesce(func.sum(DailySales.revenue), 0).label("revenue"),
+        func.coalesce(func.sum(DailySales.discount), 0).label("discount"),
+        func.coalesce(func.sum(DailySales.ship_fee), 0).label("ship_fee"),
+    ]
+
+    if group_by is None:
+        return apply_date_range(select(*aggregates), date_from, date_to, DailySales.date)
+
+    key = ROLLUP_GROUP_BY_COLUMNS[group_by]().label("key")
+    columns = [key]
+    if group_by == "product":
+        columns.append(func.max(DailySales.product_name).label("product_name"))
+    stmt = select(*columns, *aggregates).group_by(key)
+    stmt = apply_date_range(stmt, date_from, date_to, DailySales.date)
+
+    if group_by == "product":
+        return stmt.order_by(func.sum(DailySales.quantity).desc())
+    return stmt.order_by(key)
+
+def summary_row_to_dict(row, group_by: Optional[str] = None) -> dict:
+    return format_summary(dict(row._mapping), group_by)
+
+def merge_summaries(group_by: Optional[str], rows, archived: List[dict]) -> List[dict]:
+    """Gộp kết quả build_summary_query (DB) với ReportArchive.summary (tháng đã archive) theo key gốc"""
+    if not archived:
+        return [summary_row_to_dict(r, group_by) for r in rows]
+
+    groups = {}
+    for data in [dict(r._mapping) for r in rows] + archived:
+        key = data.get("key")
+        if group_by == "hour":
+            key = data["key"] = int(key)
+        merged = groups.get(key)
+        if merged is None:
+            groups[key] = dict(data)
+            continue
+        for field in SUM_FIELDS:
+            merged[field] += data[field]
+        if group_by == "product":
+            merged["product_name"] = max(merged["product_name"], data["product_name"])
+
+    merged_rows = list(groups.values())
+    if group_by == "product":
+        merged_rows.sort(key=lambda data: data["quantity"], reverse=True)
+    elif group_by is not None:
+        merged_rows.sort(key=lambda data: data["key"])
+    return [format_summary(data, group_by) for data in merged_rows]
@@ -1,80 +1,215 @@
-from typing import List, Optional
-from supabase import Client
-from app.database import supabase
-from app.schemas.schemas import OrderCreate, ReportCreate
+import asyncio
 import logging
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional
+
+import httpx
+import orjson
+
+from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Gọi thẳng PostgREST (/rest/v1) của Supabase bằng httpx.AsyncClient: không chặn event loop,
+# giữ kết nối keep-alive trong pool, giới hạn số request đồng thời.
+BATCH_SIZE = 500  # số dòng tối đa / 1 request insert hoặc select theo danh sách id
+
+class SupabaseError(Exception):
+    """PostgREST trả lỗi (status >= 400)"""
+
+    def __init__(self, status_code: int, detail: Any):
+        super().__init__(f"Supabase error {status_code}: {detail}")
+        self.status_code = status_code
+        self.detail = detail
+
+def _in(values: Iterable) -> str:
+    return "in.(" + ",".join(str(v) for v in values) + ")"
+
+def _chunks(rows: List[Any], size: int = BATCH_SIZE):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
 class SupabaseService:
-    def __init__(self, client: Client):
-        self.client = client
-    
+    def __init__(
+        self,
+        url: str = settings.SUPABASE_URL,
+        key: str = settings.SUPABASE_KEY,
+        max_connections: int = settings.SUPABASE_MAX_CONNECTIONS,
+        max_concurrency: int = settings.SUPABASE_MAX_CONCURRENCY,
+        timeout: float = settings.SUPABASE_TIMEOUT,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        """transport: httpx.ASGITransport(app=...) -> chạy với PostgREST giả (benchmarks/postgrest_stub.py), không cần mạng"""
+        self.base_url = url.rstrip("/") + "/rest/v1"
+        self.headers = {"apikey": key, "Authorization": f"Bearer {key}"}
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Client tạo ở lần dùng đầu tiên, dùng chung cho mọi request (đóng trong lifespan)"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=self.headers,
+                limits=self.limits,
+                timeout=self.timeout,
+                transport=self.transport,
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _request(
+        self,
+        method: str,
+        table: str,
+        params: Optional[Dict[str, Any]] = None,
+        rows: Any = None,
+        prefer: Optional[str] = None,
+    ) -> Any:
+        client = self.client
+        headers = {}
+        content = None
+        if rows is not None:
+            headers["Content-Type"] = "application/json"
+            content = orjson.dumps(rows)  # date / time -> ISO, như PostgREST nhận
+        if prefer:
+            headers["Prefer"] = prefer
+        async with self._semaphore:
+            response = await client.request(method, f"/{table}", params=params, content=content, headers=headers)
+        if response.status_code >= 400:
+            try:
+                detail = response.json()
+            except ValueError:
+                detail = response.text
+            logger.error("Supabase %s %s failed: %s %s", method, table, response.status_code, detail)
+            raise SupabaseError(response.status_code, detail)
+        if not response.content:
+            return None
+        return orjson.loads(response.content)
+
+    async def select(self, table: str, **params) -> List[dict]:
+        return await self._request("GET", table, params={"select": "*", **params})
+
+    async def insert(self, table: str, rows: List[dict], on_conflict: Optional[str] = None) -> List[dict]:
+        """Bulk insert (upsert nếu có on_conflict), chia lô BATCH_SIZE dòng, các lô gửi song song"""
+        if not rows:
+            return []
+        params = {"on_conflict": on_conflict} if on_conflict else None
+        prefer = "return=representation" + (",resolution=merge-duplicates" if on_conflict else "")
+        results = await asyncio.gather(*(
+            self._request("POST", table, params=params, rows=chunk, prefer=prefer) for chunk in _chunks(rows)
+        ))
+        return [row for result in results for row in result]
+
+    async def update(self, table: str, values: dict, **filters) -> List[dict]:
+        """PATCH các dòng khớp filters, trả về các dòng sau khi sửa"""
+        return await self._request("PATCH", table, params=filters, rows=values, prefer="return=representation")
+
+    async def delete(self, table: str, **filters) -> List[dict]:
+        """DELETE các dòng khớp filters, trả về các dòng đã xóa"""
+        return await self._request("DELETE", table, params=filters, prefer="return=representation")
+
+    async def get_dishes(self) -> List[dict]:
+        return await self.select("dish", order="id")
+
     # Order operations
     async def get_all_orders(self) -> List[dict]:
-        """Get all orders using Supabase client"""
-        try:
-            result = self.client.table("order_list").select("*").order("dish_name").execute()
-            return result.data
-        except Exception as e:
-            logger.error(f"Error fetching orders: {e}")
-            raise
-    
+        return await self.select("order_list", order="dish_name")
+
     async def get_orders_by_table(self, table_id: int) -> List[dict]:
-        """Get orders by table ID using Supabase client"""
-        try:
-            result = self.client.table("order_list").select("*").eq("table_id", table_id).execute()
-            return result.data
-        except Exception as e:
-            logger.error(f"Error fetching orders for table {table_id}: {e}")
-            raise
-    
-    async def create_order(self, order_data: dict) -> dict:
-        """Create order using Supabase client"""
-        try:
-            result = self.client.table("order_list").insert(order_data).execute()
-            return result.data[0] if result.data else None
-        except Exception as e:
-            logger.error(f"Error creating order: {e}")
-            raise
-    
+        return await self.select("order_list", table_id=f"eq.{table_id}")
+
+    async def get_orders_by_tables(self, table_ids: List[int]) -> Dict[int, List[dict]]:
+        """Nhiều bàn: 1 request / BATCH_SIZE bàn (table_id=in.(...)) thay vì 1 request / bàn"""
+        results = await asyncio.gather(*(
+            self.select("order_list", table_id=_in(chunk), order="table_id,dish_name")
+            for chunk in _chunks(sorted(set(table_ids)))
+        ))
+        by_table: Dict[int, List[dict]] = {table_id: [] for table_id in table_ids}
+        for rows in results:
+            for row in rows:
+                by_table[row["table_id"]].append(row)
+        return by_table
+
+    async def create_order(self, order_data: dict) -> Optional[dict]:
+        rows = await self.insert("order_list", [order_data])
+        return rows[0] if rows else None
+
+    async def upsert_orders(self, rows: List[dict]) -> List[dict]:
+        """INSERT ... ON CONFLICT (table_id, dish_key) DO UPDATE cho cả lô (rows phải có dish_key)"""
+        return await self.insert("order_list", rows, on_conflict="table_id,dish_key")
+
+    async def update_order(self, table_id: int, dish_key: str, values: dict) -> Optional[dict]:
+        rows = await self.update("order_list", values, table_id=f"eq.{table_id}", dish_key=f"eq.{dish_key}")
+        return rows[0] if rows else None
+
+    async def delete_orders(self, order_ids: List[int]) -> None:
+        for chunk in _chunks(order_ids):
+            await self._request("DELETE", "order_list", params={"id": _in(chunk)})
+
+    async def delete_orders_by_table(self, table_id: int, dish_key: Optional[str] = None) -> List[dict]:
+        filters = {"table_id": f"eq.{table_id}"}
+        if dish_key is not None:
+            filters["dish_key"] = f"eq.{dish_key}"
+        return await self.delete("order_list", **filters)
+
     async def delete_all_orders(self) -> bool:
-        """Delete all orders using Supabase client"""
-        try:
-            # Supabase requires a condition for delete, so we use a condition that matches all
-            result = self.client.table("order_list").delete().neq("id", -1).execute()
-            return True
-        except Exception as e:
-            logger.error(f"Error deleting all orders: {e}")
-            raise
-    
+        # PostgREST bắt buộc có điều kiện khi DELETE -> điều kiện đúng với mọi dòng
+        await self._request("DELETE", "order_list", params={"id": "neq.-1"})
+        return True
+
     # Report operations
     async def get_all_reports(self) -> List[dict]:
-        """Get all reports using Supabase client"""
-        try:
-            result = self.client.table("report").select("*").order("created_at", desc=True).execute()
-            return result.data
-        except Exception as e:
-            logger.error(f"Error fetching reports: {e}")
-            raise
-    
-    async def create_report(self, report_data: dict) -> dict:
-        """Create report using Supabase client"""
-        try:
-            result = self.client.table("report").insert(report_data).execute()
-            return result.data[0] if result.data else None
-        except Exception as e:
-            logger.error(f"Error creating report: {e}")
-            raise
-    
+        return await self.select("report", order="created_at.desc")
+
+    async def get_reports(
+        self,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        table_id: Optional[int] = None,
+        limit: Optional[int] = None,
+        before_id: Optional[int] = None,
+    ) -> List[dict]:
+        """Lọc khoảng ngày / bàn, keyset theo id giảm dần (before_id = cursor)"""
+        params: Dict[str, Any] = {"order": "id.desc"}
+        date_filters = []
+        if date_from is not None:
+            date_filters.append(f"date.gte.{date_from.isoformat()}")
+        if date_to is not None:
+            date_filters.append(f"date.lte.{date_to.isoformat()}")
+        if date_filters:
+            params["and"] = "(" + ",".join(date_filters) + ")"
+        if table_id is not None:
+            params["table_id"] = f"eq.{table_id}"
+        if before_id is not None:
+            params["id"] = f"lt.{before_id}"
+        if limit is not None:
+            params["limit"] = limit
+        return await self.select("report", **params)
+
+    async def create_report(self, report_data: dict) -> Optional[dict]:
+        rows = await self.insert("report", [report_data])
+        return rows[0] if rows else None
+
+    async def create_reports(self, rows: List[dict]) -> List[dict]:
+        return await self.insert("report", rows)
+
     async def delete_all_reports(self) -> bool:
-        """Delete all reports using Supabase client"""
-        try:
-            result = self.client.table("report").delete().neq("id", -1).execute()
-            return True
-        except Exception as e:
-            logger.error(f"Error deleting all reports: {e}")
-            raise
+        """Xóa hết report rồi cả rollup daily_sales (gồm nhóm của các tháng đã archive, route xóa file archive)"""
+        await self._request("DELETE", "report", params={"id": "neq.-1"})
+        # daily_sales không có cột id: điều kiện đúng với mọi dòng theo cột date (NOT NULL)
+        await self._request("DELETE", "daily_sales", params={"date": "gte.0001-01-01"})
+        return True
 
 # Global service instance
-supabase_service = SupabaseService(supabase)
+supabase_service = SupabaseService()
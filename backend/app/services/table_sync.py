@@ -0,0 +1,85 @@
+from datetime import datetime
+from typing import Dict, List
+
+from app.models.models import normalize_dish_name as dish_key
+from app.services.order_events import upsert_event, remove_event
+
+def collapse_changes(changes) -> Dict[str, dict]:
+    """Gộp danh sách thay đổi (đúng thứ tự) thành trạng thái cuối cùng của từng món"""
+    states: Dict[str, dict] = {}
+    for ch in changes:
+        key = dish_key(ch.dish_name)
+        st = states.setdefault(key, {
+            "dish_name": ch.dish_name.strip(),
+            "removed": False,
+            "reset": False,
+            "quantity": None,
+            "note": None,
+        })
+        if ch.type == "remove":
+            st.update(removed=True, reset=True, quantity=None, note=None)
+        elif ch.type == "add":
+            st["removed"] = False
+            st["quantity"] = ch.quantity if ch.quantity is not None else 1
+            if ch.note is not None:
+                st["note"] = ch.note
+        elif ch.type == "update":
+            st["removed"] = False
+            if ch.quantity is not None:
+                st["quantity"] = ch.quantity
+            if ch.note is not None:
+                st["note"] = ch.note
+        elif ch.type == "note" and not st["removed"]:
+            st["note"] = ch.note or ""
+    return states
+
+def plan_table_sync(table_id: int, changes, existing_rows):
+    """
+    So sánh trạng thái cuối với các dòng hiện có (id, dish_key, dish_name) của bàn.
+    Trả về (delete_ids, updates, inserts) để chạy DELETE / UPDATE / INSERT theo lô.
+    """
+    existing = {row.dish_key: row.id for row in existing_rows}
+    now_date = datetime.now().date()
+    now_time = datetime.now().time().replace(microsecond=0)
+
+    delete_ids: List[int] = []
+    updates: List[dict] = []
+    inserts: List[dict] = []
+    for key, st in collapse_changes(changes).items():
+        row_id = existing.get(key)
+        if st["removed"]:
+            if row_id is not None:
+                delete_ids.append(row_id)
+            continue
+
+        if row_id is not None:
+            # Món bị xóa rồi thêm lại trong cùng lô -> bắt đầu lại từ giá trị mặc định
+            values = {"quantity": 1, "note": ""} if st["reset"] else {}
+            if st["quantity"] is not None:
+                values["quantity"] = st["quantity"]
+            if st["note"] is not None:
+                values["note"] = st["note"]
+            if values:
+                values.update(id=row_id, date=now_date, time=now_time)
+                updates.append(values)
+        elif st["quantity"] is not None:
+            # Chỉ đổi note cho món không còn tồn tại -> bỏ qua (giống 404 của route note)
+            inserts.append({
+                "table_id": table_id,
+                "dish_name": st["dish_name"],
+                "dish_key": key,
+                "quantity": st["quantity"],
+                "note": st["note"] or "",
+                "date": now_date,
+                "time": now_time,
+            })
+    return delete_ids, updates, inserts
+
+def sync_events(table_id: int, existing_rows, delete_ids, updates, inserts, final_rows) -> List[dict]:
+    """Sự kiện stream cho 1 lần sync: remove cho món bị xóa, upsert cho món được ghi"""
+    names = {row.id: row.dish_name for row in existing_rows}
+    touched_ids = {u["id"] for u in updates}
+    inserted_keys = {i["dish_key"] for i in inserts}
+    events = [remove_event(table_id, names[row_id]) for row_id in delete_ids]
+    events += [upsert_event(o) for o in final_rows if o.id in touched_ids or o.dish_key in inserted_keys]
+    return events
@@ -0,0 +1,90 @@
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+# Module này chỉ dùng thư viện chuẩn: main.py import nó đầu tiên để đo cả thời gian import
+
+class StartupTimer:
+    """Ghi lại thời gian từng bước khởi động (import, lifespan) -> in báo cáo + /api/ready"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.steps: List[Tuple[str, float]] = []
+        self.ready_ms: Optional[float] = None
+
+    @contextmanager
+    def step(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.steps.append((name, (time.perf_counter() - start) * 1000))
+
+    def mark_ready(self):
+        self.ready_ms = (time.perf_counter() - self.started) * 1000
+
+    def report(self) -> dict:
+        return {
+            "steps_ms": {name: round(ms, 1) for name, ms in self.steps},
+            "ready_ms": round(self.ready_ms, 1) if self.ready_ms is not None else None,
+        }
+
+    def print_report(self, title: str):
+        total = (time.perf_counter() - self.started) * 1000
+        print(f"Startup: {title} after {total:.0f} ms")
+        for name, ms in self.steps:
+            print(f"  {name:<32} {ms:>8.1f} ms")
+
+startup_timer = StartupTimer()
+
+class SchemaReadiness:
+    """
+    Trạng thái kiểm tra schema DB chạy nền sau khi server đã nhận request.
+    /api/health = process còn sống; /api/ready = DB đã sẵn sàng (503 trong lúc chờ / khi lỗi).
+    """
+
+    def __init__(self):
+        self.state = "pending"
+        self.error: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.state in ("ready", "skipped")
+
+    def skip(self):
+        self.state = "skipped"
+        startup_timer.mark_ready()
+
+    async def run(self, init: Callable[[], Awaitable[None]]):
+        self.state = "running"
+        try:
+            with startup_timer.step("schema init (background)"):
+                await init()
+            self.state = "ready"
+            startup_timer.mark_ready()
+            print(f"Database schema ready ({startup_timer.ready_ms:.0f} ms after import)")
+        except Exception as e:
+            self.state = "failed"
+            self.error = str(e)
+            logging.exception("Database schema init failed: %s", e)
+
+    def start(self, init: Callable[[], Awaitable[None]]):
+        self._task = asyncio.create_task(self.run(init))
+
+    async def wait(self):
+        """Chờ kiểm tra schema chạy nền xong (việc cần bảng đã có, vd. nạp order vào RAM)"""
+        if self._task is not None:
+            await asyncio.shield(self._task)
+
+    async def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+schema_readiness = SchemaReadiness()
@@ -0,0 +1,20 @@
+import re
+from pathlib import Path
+from typing import List, NamedTuple
+
+# Thực đơn đang nằm ở frontend (frontend/src/data/dishes.ts)
+DEFAULT_CATALOG = Path(__file__).resolve().parents[2] / "frontend" / "src" / "data" / "dishes.ts"
+
+DISH_PATTERN = re.compile(r'\{\s*id:\s*"([^"]+)",\s*name:\s*"([^"]+)",\s*price:\s*(\d+)\s*\}')
+
+class Dish(NamedTuple):
+    code: str
+    name: str
+    price: int
+
+def load_dishes(path: Path = DEFAULT_CATALOG) -> List[Dish]:
+    """Đọc danh sách món { id, name, price } từ dishes.ts"""
+    dishes = [Dish(code, name, int(price)) for code, name, price in DISH_PATTERN.findall(path.read_text(encoding="utf-8"))]
+    if not dishes:
+        raise ValueError(f"No dishes found in {path}")
+    return dishes
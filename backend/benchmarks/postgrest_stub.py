@@ -0,0 +1,222 @@
+"""
+PostgREST giả (đủ cho app/services/supabase_service.py) trên SQLAlchemy: chạy STORAGE_BACKEND=supabase
+và đo số request / độ trễ mà không cần mạng hay project Supabase thật.
+
+    cd backend
+    python -m benchmarks.postgrest_stub --port 54321 --latency-ms 20
+    STORAGE_BACKEND=supabase SUPABASE_URL=http://127.0.0.1:54321 python main.py
+
+Trong cùng process (không mở cổng):
+
+    transport = httpx.ASGITransport(app=create_app())
+    service = SupabaseService(url="http://stub", key="test", transport=transport)
+
+Hỗ trợ /rest/v1/{table} với GET / POST / PATCH / DELETE, filter eq/neq/gt/gte/lt/lte/in/is và and=(...),
+select=*, order=col[.asc|.desc],..., limit, Prefer: return=representation, on_conflict + resolution=merge-duplicates.
+PATCH / DELETE không có filter -> 400, giống extension safeupdate của Supabase.
+"""
+import argparse
+import asyncio
+from datetime import date, datetime, time
+from typing import Dict
+
+import orjson
+from sqlalchemy import Boolean, Date, DateTime, Float, Integer, Time, create_engine, delete, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.pool import StaticPool
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Route
+
+from app.database import Base
+import app.models.models  # noqa: F401  (đăng ký các bảng vào Base.metadata)
+from app.services.dish_catalog import seed_menu_if_empty
+
+RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns", "and"}
+OPERATORS = {
+    "eq": lambda c, v: c == v,
+    "neq": lambda c, v: c != v,
+    "gt": lambda c, v: c > v,
+    "gte": lambda c, v: c >= v,
+    "lt": lambda c, v: c < v,
+    "lte": lambda c, v: c <= v,
+}
+
+class StubError(Exception):
+    def __init__(self, status_code: int, message: str, code: str = "PGRST100"):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+        self.code = code
+
+def _convert(column, value):
+    """Giá trị dạng chuỗi / JSON -> kiểu Python của cột (ISO date / time như PostgREST nhận)"""
+    if value is None or not isinstance(value, str):
+        return value
+    column_type = column.type
+    if isinstance(column_type, DateTime):
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if isinstance(column_type, Date):
+        return date.fromisoformat(value)
+    if isinstance(column_type, Time):
+        return time.fromisoformat(value)
+    if isinstance(column_type, Boolean):
+        return value == "true"
+    if isinstance(column_type, Integer):
+        return int(value)
+    if isinstance(column_type, Float):
+        return float(value)
+    return value
+
+def _column(table, name: str):
+    if name not in table.c:
+        raise StubError(400, f"column {table.name}.{name} does not exist", "42703")
+    return table.c[name]
+
+def _condition(table, name: str, expression: str):
+    """"gte.2026-10-01" / "in.(1,2)" / "is.null" -> điều kiện SQLAlchemy"""
+    column = _column(table, name)
+    op, _, value = expression.partition(".")
+    if op == "in":
+        values = [v for v in value.strip("()").split(",") if v]
+        return column.in_([_convert(column, v) for v in values])
+    if op == "is":
+        return column.is_(None) if value == "null" else column.is_(value == "true")
+    if op not in OPERATORS:
+        raise StubError(400, f"unsupported operator '{op}'")
+    return OPERATORS[op](column, _convert(column, value))
+
+def _where(table, params) -> list:
+    conditions = [_condition(table, name, value) for name, value in params.items() if name not in RESERVED_PARAMS]
+    if "and" in params:
+        # and=(date.gte.2026-10-01,date.lte.2026-10-31)
+        for part in params["and"].strip("()").split(","):
+            name, _, expression = part.partition(".")
+            conditions.append(_condition(table, name, expression))
+    return conditions
+
+def _order_by(table, order: str) -> list:
+    clauses = []
+    for part in order.split(","):
+        name, _, direction = part.partition(".")
+        column = _column(table, name)
+        clauses.append(column.desc() if direction.startswith("desc") else column.asc())
+    return clauses
+
+def _rows_body(rows) -> bytes:
+    return orjson.dumps([dict(row._mapping) for row in rows])
+
+def _json(status_code: int, body: bytes) -> Response:
+    return Response(body, status_code=status_code, media_type="application/json")
+
+def create_app(database_url: str = "sqlite://", latency_ms: float = 0) -> Starlette:
+    """database_url mặc định: SQLite trong RAM (mất khi tắt); latency_ms: độ trễ cộng vào mỗi request"""
+    if database_url.startswith("sqlite"):
+        # 1 kết nối dùng chung -> SQLite trong RAM giữ được dữ liệu giữa các request
+        engine = create_engine(database_url, connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    else:
+        engine = create_engine(database_url)
+    dialect_insert = sqlite_insert if engine.dialect.name == "sqlite" else postgresql_insert  # cùng API on_conflict_*
+    Base.metadata.create_all(engine)
+    seed_menu_if_empty(engine)
+    tables = Base.metadata.tables
+    stats: Dict[str, int] = {"requests": 0}
+
+    def get(table, params) -> bytes:
+        stmt = select(table).where(*_where(table, params))
+        if "order" in params:
+            stmt = stmt.order_by(*_order_by(table, params["order"]))
+        if "limit" in params:
+            stmt = stmt.limit(int(params["limit"]))
+        if "offset" in params:
+            stmt = stmt.offset(int(params["offset"]))
+        with engine.connect() as conn:
+            return _rows_body(conn.execute(stmt))
+
+    def post(table, params, payload, prefer: str):
+        rows = payload if isinstance(payload, list) else [payload]
+        rows = [{name: _convert(_column(table, name), value) for name, value in row.items()} for row in rows]
+        if not rows:
+            return []
+        stmt = dialect_insert(table)
+        if params.get("on_conflict"):
+            conflict = params["on_conflict"].split(",")
+            if "resolution=merge-duplicates" in prefer:
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=conflict,
+                    set_={name: stmt.excluded[name] for name in rows[0] if name not in conflict},
+                )
+            else:
+                stmt = stmt.on_conflict_do_nothing(index_elements=conflict)
+        with engine.begin() as conn:
+            # Từng dòng trong 1 transaction: RETURNING đúng thứ tự gửi, default Python của model (dish_key, dish_id) vẫn chạy
+            return [conn.execute(stmt.returning(*table.c), row).one() for row in rows]
+
+    def patch(table, params, payload):
+        conditions = _where(table, params)
+        if not conditions:
+            raise StubError(400, "UPDATE requires a WHERE clause", "21000")
+        values = {name: _convert(_column(table, name), value) for name, value in payload.items()}
+        with engine.begin() as conn:
+            return conn.execute(update(table).where(*conditions).values(values).returning(*table.c)).all()
+
+    def remove(table, params):
+        conditions = _where(table, params)
+        if not conditions:
+            raise StubError(400, "DELETE requires a WHERE clause", "21000")
+        with engine.begin() as conn:
+            return conn.execute(delete(table).where(*conditions).returning(*table.c)).all()
+
+    async def endpoint(request: Request) -> Response:
+        stats["requests"] += 1
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+        table = tables.get(request.path_params["table"])
+        if table is None:
+            return _json(404, orjson.dumps({"code": "42P01", "message": "relation does not exist"}))
+        params = dict(request.query_params)
+        prefer = request.headers.get("prefer", "")
+        representation = "return=representation" in prefer
+        try:
+            if request.method == "GET":
+                return _json(200, get(table, params))
+            if request.method == "POST":
+                rows = post(table, params, orjson.loads(await request.body()), prefer)
+                return _json(201, _rows_body(rows)) if representation else Response(status_code=201)
+            if request.method == "PATCH":
+                rows = patch(table, params, orjson.loads(await request.body()))
+            else:
+                rows = remove(table, params)
+            return _json(200, _rows_body(rows)) if representation else Response(status_code=204)
+        except StubError as e:
+            return _json(e.status_code, orjson.dumps({"code": e.code, "message": e.message}))
+        except IntegrityError as e:
+            return _json(409, orjson.dumps({"code": "23505", "message": str(e.orig)}))
+
+    async def stub_stats(request: Request) -> Response:
+        return _json(200, orjson.dumps(stats))
+
+    app = Starlette(routes=[
+        Route("/rest/v1/{table}", endpoint, methods=["GET", "POST", "PATCH", "DELETE"]),
+        Route("/stats", stub_stats),
+    ])
+    app.state.engine = engine
+    app.state.stats = stats
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=54321)
+    parser.add_argument("--database-url", default="sqlite://", help="default: in-memory SQLite")
+    parser.add_argument("--latency-ms", type=float, default=0, help="simulated round trip per request")
+    args = parser.parse_args()
+
+    import uvicorn
+    uvicorn.run(create_app(args.database_url, args.latency_ms), host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
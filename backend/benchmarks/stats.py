@@ -0,0 +1,65 @@
+import math
+from collections import defaultdict
+from typing import Dict, List
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile trên list đã sắp xếp"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+class LatencyRecorder:
+    """Gom độ trễ (ms) và số lỗi theo endpoint"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    def record(self, endpoint: str, elapsed_ms: float, ok: bool):
+        self.latencies[endpoint].append(elapsed_ms)
+        if not ok:
+            self.errors[endpoint] += 1
+
+    def summarize(self, wall_seconds: float) -> Dict[str, dict]:
+        summary = {}
+        for endpoint in sorted(self.latencies):
+            values = sorted(self.latencies[endpoint])
+            summary[endpoint] = {
+                "count": len(values),
+                "errors": self.errors[endpoint],
+                "throughput_rps": round(len(values) / wall_seconds, 2) if wall_seconds else 0.0,
+                "mean_ms": round(sum(values) / len(values), 3),
+                "p50_ms": round(percentile(values, 50), 3),
+                "p95_ms": round(percentile(values, 95), 3),
+                "p99_ms": round(percentile(values, 99), 3),
+                "max_ms": round(values[-1], 3),
+            }
+        return summary
+
+def format_table(summary: Dict[str, dict]) -> str:
+    header = f"{'endpoint':<52} {'count':>6} {'err':>4} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}"
+    lines = [header, "-" * len(header)]
+    for endpoint, s in summary.items():
+        lines.append(
+            f"{endpoint:<52} {s['count']:>6} {s['errors']:>4} {s['throughput_rps']:>8.1f} "
+            f"{s['p50_ms']:>8.2f} {s['p95_ms']:>8.2f} {s['p99_ms']:>8.2f}"
+        )
+    return "\n".join(lines)
+
+def format_comparison(base: Dict[str, dict], head: Dict[str, dict]) -> str:
+    """So sánh 2 lần chạy: p50 / p95 / p99 và throughput, % thay đổi (âm = nhanh hơn)"""
+    def delta(old: float, new: float) -> str:
+        return f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+
+    header = f"{'endpoint':<52} {'p50':>18} {'p95':>18} {'p99':>18} {'rps':>16}"
+    lines = [header, "-" * len(header)]
+    for endpoint in sorted(set(base) & set(head)):
+        b, h = base[endpoint], head[endpoint]
+        cols = [f"{h[k]:>8.2f} {delta(b[k], h[k]):>9}" for k in ("p50_ms", "p95_ms", "p99_ms")]
+        cols.append(f"{h['throughput_rps']:>7.1f} {delta(b['throughput_rps'], h['throughput_rps']):>8}")
+        lines.append(f"{endpoint:<52} " + " ".join(cols))
+    only = sorted(set(base) ^ set(head))
+    if only:
+        lines.append(f"(chỉ có ở 1 lần chạy: {', '.join(only)})")
+    return "\n".join(lines)
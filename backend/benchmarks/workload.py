@@ -0,0 +1,147 @@
+import random
+import time
+from datetime import datetime
+from typing import Dict, List
+from urllib.parse import quote
+
+from benchmarks.catalog import Dish
+from benchmarks.stats import LatencyRecorder
+
+# Bàn dùng cho benchmark: 1001, 1002, ... (không đụng dữ liệu bàn thật khi chạy trên Postgres)
+TABLE_ID_BASE = 1000
+
+NOTES = ["", "ít cay", "không hành", "nhiều đá", "ít đường", "mang về", "cay cấp 3"]
+
+class SimulatedClient:
+    """
+    1 máy order: phục vụ một nhóm bàn riêng, gọi món / sửa số lượng / ghi chú / lưu hàng loạt,
+    xem bàn, thanh toán, thỉnh thoảng mở trang báo cáo.
+    """
+
+    def __init__(self, http, recorder: LatencyRecorder, dishes: List[Dish], tables: List[int], rng: random.Random):
+        self.http = http
+        self.recorder = recorder
+        self.dishes = dishes
+        self.tables = tables
+        self.rng = rng
+        # Trạng thái phía client: bàn -> {tên món: số lượng}
+        self.state: Dict[int, Dict[str, int]] = {t: {} for t in tables}
+
+    async def call(self, endpoint: str, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        response = await self.http.request(method, url, **kwargs)
+        self.recorder.record(endpoint, (time.perf_counter() - start) * 1000, response.status_code < 400)
+        return response
+
+    def _table(self) -> int:
+        return self.rng.choice(self.tables)
+
+    def _ordered(self, table: int):
+        """Món đã có trên bàn; bàn trống -> None"""
+        items = self.state[table]
+        return self.rng.choice(sorted(items)) if items else None
+
+    # --- Các thao tác ---
+    async def add_item(self):
+        table, dish = self._table(), self.rng.choice(self.dishes)
+        quantity = self.state[table].get(dish.name, 0) + 1
+        await self.call("POST /api/orders/table/{id}/item", "POST", f"/api/orders/table/{table}/item",
+                        json={"dish_name": dish.name, "quantity": quantity, "note": ""})
+        self.state[table][dish.name] = quantity
+
+    async def edit_quantity(self):
+        table = self._table()
+        name = self._ordered(table)
+        if name is None:
+            return await self.add_item()
+        quantity = self.rng.randint(1, 5)
+        await self.call("PUT /api/orders/table/{id}/dish/{name}", "PUT",
+                        f"/api/orders/table/{table}/dish/{quote(name, safe='')}", json={"quantity": quantity})
+        self.state[table][name] = quantity
+
+    async def edit_note(self):
+        table = self._table()
+        name = self._ordered(table)
+        if name is None:
+            return await self.add_item()
+        await self.call("PUT /api/orders/table/{id}/dish/{name}/note", "PUT",
+                        f"/api/orders/table/{table}/dish/{quote(name, safe='')}/note",
+                        json={"note": self.rng.choice(NOTES)})
+
+    async def sync_table(self):
+        """Lưu 2-6 thay đổi đang chờ của 1 bàn trong 1 request"""
+        table = self._table()
+        items = dict(self.state[table])
+        changes = []
+        for _ in range(self.rng.randint(2, 6)):
+            name = self.rng.choice(sorted(items)) if items and self.rng.random() < 0.6 else None
+            if name is None:
+                dish = self.rng.choice(self.dishes)
+                items[dish.name] = items.get(dish.name, 0) + 1
+                changes.append({"type": "add", "dish_name": dish.name, "quantity": items[dish.name]})
+                continue
+            kind = self.rng.choice(["update", "note", "remove"])
+            if kind == "update":
+                items[name] = self.rng.randint(1, 5)
+                changes.append({"type": "update", "dish_name": name, "quantity": items[name]})
+            elif kind == "note":
+                changes.append({"type": "note", "dish_name": name, "note": self.rng.choice(NOTES)})
+            else:
+                del items[name]
+                changes.append({"type": "remove", "dish_name": name})
+        await self.call("POST /api/orders/table/{id}/sync", "POST", f"/api/orders/table/{table}/sync",
+                        json={"changes": changes})
+        self.state[table] = items
+
+    async def read_table(self):
+        table = self._table()
+        await self.call("GET /api/orders/table/{id}", "GET", f"/api/orders/table/{table}")
+
+    async def read_all_orders(self):
+        await self.call("GET /api/orders/", "GET", "/api/orders/")
+
+    async def checkout(self):
+        table = self._table()
+        items = self.state[table]
+        if not items:
+            return await self.add_item()
+        # Tổng bill + mã hàng do server tính từ thực đơn (bảng dish)
+        now = datetime.now()
+        await self.call("POST /api/orders/table/{id}/checkout", "POST", f"/api/orders/table/{table}/checkout", json={
+            "date": now.strftime("%d/%m/%Y"),
+            "time": now.strftime("%H:%M:%S"),
+            "discount": self.rng.choice([0, 0, 0, 5000, 10000]),
+            "ship_fee": 0,
+        })
+        self.state[table] = {}
+
+    async def list_reports(self):
+        await self.call("GET /api/reports/?limit=100", "GET", "/api/reports/", params={"limit": 100})
+
+    async def report_summary(self):
+        group_by = self.rng.choice(["day", "hour", "table", "product"])
+        await self.call("GET /api/reports/summary/{group_by}", "GET", f"/api/reports/summary/{group_by}")
+
+    # Tỉ lệ thao tác (ước lượng từ một ca làm việc: chủ yếu gọi món / sửa món)
+    OPERATIONS = [
+        (add_item, 30),
+        (edit_quantity, 20),
+        (edit_note, 10),
+        (sync_table, 10),
+        (read_table, 15),
+        (read_all_orders, 4),
+        (checkout, 6),
+        (list_reports, 3),
+        (report_summary, 2),
+    ]
+
+    async def run(self, requests: int):
+        operations = [op for op, _ in self.OPERATIONS]
+        weights = [w for _, w in self.OPERATIONS]
+        for _ in range(requests):
+            await self.rng.choices(operations, weights)[0](self)
+
+def assign_tables(clients: int, tables: int) -> List[List[int]]:
+    """Chia bàn cho các client (mỗi bàn thuộc đúng 1 client)"""
+    table_ids = [TABLE_ID_BASE + i for i in range(1, tables + 1)]
+    return [table_ids[i::clients] for i in range(clients)]
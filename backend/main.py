@@ -1,27 +1,72 @@
 # main.py
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
+from app.startup import startup_timer, schema_readiness  # import đầu tiên: đo thời gian các import bên dưới
+
+with startup_timer.step("import fastapi"):
+    from fastapi import FastAPI
+    from fastapi.middleware.cors import CORSMiddleware
+    from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
 import logging, os
 
-from app.database import get_db, init_db
-from app.routers import orders, reports
-# redis_routes đôi khi làm crash nếu thiếu env/redis -> import tùy chọn
-try:
-    from app.routers import redis_routes
-    HAS_REDIS = True
-except Exception as e:
-    logging.exception("Redis routes disabled: %s", e)
-    HAS_REDIS = False
+with startup_timer.step("import app core (db, redis)"):
+    from app.config import settings
+    from app.database import get_db, init_db, close_db
+    from app.redis_client import init_redis, close_redis
+    from app.metrics import PrometheusMiddleware, metrics_response
+    from app.query_stats import QueryStatsMiddleware
+    from app.compression import CompressionMiddleware
+    from app.idempotency import IdempotencyMiddleware
+    from app.services.order_events import order_events
+    from app.services.order_write_buffer import order_write_buffer
+    from app.services.order_store import live_orders
+with startup_timer.step("import routers"):
+    # DB_ASYNC=true -> dùng router async (AsyncSession), mặc định giữ router sync để so sánh benchmark
+    if settings.DB_ASYNC:
+        from app.routers import orders_async as orders, reports_async as reports, dishes_async as dishes
+    else:
+        from app.routers import orders, reports, dishes
+    if settings.STORAGE_BACKEND == "supabase":
+        # order / report đọc ghi qua PostgREST của Supabase (httpx async, pool keep-alive); chỉ import httpx khi dùng
+        from app.routers import orders_supabase as orders, reports_supabase as reports
+        from app.services.supabase_service import supabase_service
+    elif settings.STORAGE_BACKEND == "memory":
+        # order của bàn đang mở nằm trong RAM (1 worker), report vẫn qua SQL
+        from app.routers import orders_memory as orders
+    from app.routers import order_stream
+    # redis_routes đôi khi làm crash nếu thiếu env/redis -> import tùy chọn
+    try:
+        from app.routers import redis_routes
+        HAS_REDIS = True
+    except Exception as e:
+        logging.exception("Redis routes disabled: %s", e)
+        HAS_REDIS = False
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Cho phép server khởi động ngay cả khi DB lỗi
-    try:
-        await init_db()
-    except Exception as e:
-        logging.exception("init_db failed, server still starts: %s", e)
+    with startup_timer.step("init_redis"):
+        init_redis()  # 1 connection pool dùng chung cho cache + /api/redis
+    with startup_timer.step("order_events.start"):
+        await order_events.start()
+
+    # Kiểm tra / tạo bảng: không chặn request đầu tiên (xem /api/ready)
+    if settings.DB_INIT_MODE == "skip":
+        schema_readiness.skip()  # schema do migration quản lý (backend/migrations, python -m app.database)
+    elif settings.DB_INIT_MODE == "blocking":
+        await schema_readiness.run(init_db)  # lỗi vẫn cho server khởi động, /api/ready trả 503
+    else:
+        schema_readiness.start(init_db)
+    startup_timer.print_report("accepting requests")
+    await order_write_buffer.start()  # ORDER_WRITE_BEHIND_MS > 0
+    await live_orders.start(schema_readiness.wait)  # STORAGE_BACKEND=memory: nạp order_list sau khi có schema
     yield
+    await live_orders.stop()  # ghi nốt journal xuống DB
+    await order_write_buffer.stop()  # flush-on-shutdown: ghi nốt các thay đổi đang chờ
+    await schema_readiness.stop()
+    await order_events.stop()
+    await close_redis()
+    await close_db()
+    if settings.STORAGE_BACKEND == "supabase":
+        await supabase_service.aclose()
 
 app = FastAPI(
     title="SMILE Restaurant Management API",
@@ -30,6 +75,8 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+# Middleware thêm trước nằm trong cùng: Idempotency bên trong CORS -> response trả lại vẫn có header CORS
+app.add_middleware(IdempotencyMiddleware)  # Idempotency-Key cho route ghi orders / reports
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -41,11 +88,18 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Content-Disposition", "Server-Timing", "ETag", "Idempotent-Replayed"],
 )
+if settings.COMPRESS_MIN_SIZE > 0:
+    app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESS_MIN_SIZE)  # gzip / br cho response lớn
+app.add_middleware(PrometheusMiddleware)  # latency / in-flight theo route, xem /metrics
+app.add_middleware(QueryStatsMiddleware)  # Server-Timing: số câu SQL + thời gian DB mỗi request
 
 # Routers
 app.include_router(orders.router, prefix="/api/orders", tags=["orders"])
+app.include_router(order_stream.router, prefix="/api/orders", tags=["orders"])
 app.include_router(reports.router, prefix="/api/reports", tags=["reports"])
+app.include_router(dishes.router, prefix="/api/dishes", tags=["dishes"])
 if HAS_REDIS:
     app.include_router(redis_routes.router, prefix="/api/redis", tags=["redis"])
 
@@ -57,6 +111,23 @@ async def root():
 async def health_check():
     return {"status": "ok"} # health check
 
+@app.get("/api/ready")
+async def readiness_check():
+    """Readiness: 200 once the DB schema check finished, 503 before that or if it failed"""
+    body = {
+        "status": "ready" if schema_readiness.ready else "not ready",
+        "schema": schema_readiness.state,
+        "startup": startup_timer.report(),
+    }
+    if schema_readiness.error:
+        body["error"] = schema_readiness.error
+    return JSONResponse(body, status_code=200 if schema_readiness.ready else 503)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint"""
+    return metrics_response()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
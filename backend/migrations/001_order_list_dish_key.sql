@@ -0,0 +1,13 @@
+-- Thêm cột dish_key (= normalize_dish_name(dish_name) trong app/models/models.py) cho order_list.
+-- Chạy 1 lần trên Supabase (SQL editor) trước khi deploy bản backend mới, rồi chạy NGAY (trước migrations/002):
+--     cd backend && python -m app.services.dish_keys
+-- lệnh này tính dish_key bằng đúng hàm Python mà backend dùng khi ghi (lower(trim(...)) của SQL cho kết quả khác với
+-- tab / xuống dòng / chữ hoa ngoài ASCII), gộp các dòng trùng (cùng bàn, cùng món: giữ dòng mới nhất), rồi đặt
+-- NOT NULL + unique index (table_id, dish_key). DB đã chạy bản cũ của file này: chỉ cần chạy lệnh trên.
+-- SQLite local: xóa file smile_restaurant.db, bảng sẽ được tạo lại khi khởi động.
+
+BEGIN;
+
+ALTER TABLE order_list ADD COLUMN IF NOT EXISTS dish_key VARCHAR(255);
+
+COMMIT;
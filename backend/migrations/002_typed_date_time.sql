@@ -0,0 +1,45 @@
+-- Chuyển order_list.date/time và report.date/hour từ VARCHAR sang DATE / TIME + index (date, product_code) cho report.
+-- Chạy 1 lần trên Supabase (SQL editor) trước khi deploy bản backend mới.
+-- SQLite local: xóa file smile_restaurant.db, bảng sẽ được tạo lại khi khởi động.
+--
+-- Dữ liệu cũ có 2 định dạng ngày: "dd/mm/yyyy" (frontend, toLocaleDateString('vi-VN'), có thể thiếu số 0 đầu)
+-- và "yyyy-mm-dd" (backend tự điền). Giá trị không đọc được -> lấy theo created_at (giờ Việt Nam).
+
+BEGIN;
+
+ALTER TABLE report
+    ALTER COLUMN date TYPE DATE USING (
+        CASE
+            WHEN date ~ '^\d{4}-\d{1,2}-\d{1,2}' THEN to_date(substr(date, 1, 10), 'YYYY-MM-DD')
+            WHEN date ~ '^\d{1,2}/\d{1,2}/\d{4}$' THEN to_date(date, 'DD/MM/YYYY')
+            ELSE (created_at AT TIME ZONE 'Asia/Ho_Chi_Minh')::date
+        END
+    ),
+    ALTER COLUMN hour TYPE TIME USING (
+        CASE
+            WHEN hour ~ '^\d{1,2}:\d{2}(:\d{2})?$' THEN hour::time
+            ELSE date_trunc('second', (created_at AT TIME ZONE 'Asia/Ho_Chi_Minh')::time)
+        END
+    );
+
+ALTER TABLE order_list
+    ALTER COLUMN date TYPE DATE USING (
+        CASE
+            WHEN date ~ '^\d{4}-\d{1,2}-\d{1,2}' THEN to_date(substr(date, 1, 10), 'YYYY-MM-DD')
+            WHEN date ~ '^\d{1,2}/\d{1,2}/\d{4}$' THEN to_date(date, 'DD/MM/YYYY')
+            ELSE (created_at AT TIME ZONE 'Asia/Ho_Chi_Minh')::date
+        END
+    ),
+    ALTER COLUMN time TYPE TIME USING (
+        CASE
+            WHEN time ~ '^\d{1,2}:\d{2}(:\d{2})?$' THEN time::time
+            ELSE date_trunc('second', (created_at AT TIME ZONE 'Asia/Ho_Chi_Minh')::time)
+        END
+    );
+
+-- "7 ngày gần nhất" / gộp theo mã hàng trong khoảng ngày -> index range scan
+CREATE INDEX IF NOT EXISTS ix_report_date_product_code ON report (date, product_code);
+
+ANALYZE report;
+
+COMMIT;
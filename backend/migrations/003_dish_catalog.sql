@@ -0,0 +1,128 @@
+-- Bảng dish (thực đơn phía server) + order_list.dish_id tham chiếu món theo id.
+-- Chạy 1 lần trên Supabase (SQL editor) trước khi deploy bản backend mới.
+-- SQLite local: xóa file smile_restaurant.db, bảng sẽ được tạo lại và seed từ frontend/src/data/dishes.ts.
+--
+-- Dữ liệu seed sinh từ frontend/src/data/dishes.ts; dish_key = normalize_dish_name(name) giống order_list.dish_key.
+-- Mã hàng có thể trùng ("TV": Tokbokki thường / Tôm Viên) nên khóa duy nhất là dish_key, không phải code.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS dish (
+    id SERIAL PRIMARY KEY,
+    code VARCHAR(20) NOT NULL,
+    name VARCHAR(255) NOT NULL,
+    dish_key VARCHAR(255) NOT NULL UNIQUE,
+    price INTEGER NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+INSERT INTO dish (code, name, dish_key, price) VALUES
+    ('TV', 'Tokbokki thường', 'tokbokki thường', 25000),
+    ('KB', 'Kimbap thường', 'kimbap thường', 18000),
+    ('TSTTM', 'Trà sữa truyền thống (M)', 'trà sữa truyền thống (m)', 20000),
+    ('TSTTL', 'Trà sữa truyền thống (L)', 'trà sữa truyền thống (l)', 28000),
+    ('TSTXM', 'Trà sữa thái xanh (M)', 'trà sữa thái xanh (m)', 20000),
+    ('TSTXL', 'Trà sữa thái xanh (L)', 'trà sữa thái xanh (l)', 28000),
+    ('TDM', 'Trà dâu (M)', 'trà dâu (m)', 20000),
+    ('TDL', 'Trà dâu (L)', 'trà dâu (l)', 25000),
+    ('TĐM', 'Trà đào (M)', 'trà đào (m)', 20000),
+    ('TĐL', 'Trà đào (L)', 'trà đào (l)', 25000),
+    ('TCM', 'Trà chanh (M)', 'trà chanh (m)', 12000),
+    ('TCL', 'Trà chanh (L)', 'trà chanh (l)', 15000),
+    ('KBC', 'Kimbap chiên', 'kimbap chiên', 22000),
+    ('CVX', 'Mì cay viên xịn', 'mì cay viên xịn', 37000),
+    ('CKCV', 'Mì Cay Kimchi viên', 'mì cay kimchi viên', 37000),
+    ('CHS', 'Mì Cay Hải Sản', 'mì cay hải sản', 45000),
+    ('CKCHS', 'Mì Cay Kimchi Hải Sản', 'mì cay kimchi hải sản', 47000),
+    ('CBM', 'Mì Cay Bò Mỹ', 'mì cay bò mỹ', 45000),
+    ('CKCBM', 'Mì Cay Kimchi Bò Mỹ', 'mì cay kimchi bò mỹ', 47000),
+    ('CĐB', 'Mì Cay Đặc Biệt', 'mì cay đặc biệt', 52000),
+    ('MTĐRC', 'Mì tương đen rau củ', 'mì tương đen rau củ', 30000),
+    ('CXXTN', 'CG có xương sả tắc N', 'cg có xương sả tắc n', 30000),
+    ('CXSTN', 'CG có xương sốt thái N', 'cg có xương sốt thái n', 30000),
+    ('CXXTL', 'CG có xương sả tắc L', 'cg có xương sả tắc l', 65000),
+    ('CXSTL', 'CG có xương sốt thái L', 'cg có xương sốt thái l', 65000),
+    ('CST', 'Cóc sốt thái', 'cóc sốt thái', 15000),
+    ('BX', 'Bắp xào', 'bắp xào', 20000),
+    ('KTCXM', 'Khoai tây lắc xí muội', 'khoai tây lắc xí muội', 18000),
+    ('BV', 'Bò viên chiên', 'bò viên chiên', 10000),
+    ('MV', 'Mực viên chiên', 'mực viên chiên', 12000),
+    ('CVTC', 'Cá viên bọc trứng cút', 'cá viên bọc trứng cút', 15000),
+    ('CVSM', 'Cá viên sốt mayo', 'cá viên sốt mayo', 15000),
+    ('KTC', 'Khoai tây chiên', 'khoai tây chiên', 15000),
+    ('XXĐ', 'Xúc xích đức', 'xúc xích đức', 10000),
+    ('PMQ', 'Phomai que', 'phomai que', 10000),
+    ('CB1', 'Combo 1', 'combo 1', 35000),
+    ('CB2', 'Combo 2', 'combo 2', 40000),
+    ('CB3', 'Combo3', 'combo3', 55000),
+    ('KTCPM', 'Khoai tây lắc phomai', 'khoai tây lắc phomai', 18000),
+    ('BTT', 'Bánh tráng trộn', 'bánh tráng trộn', 20000),
+    ('CB4', 'Combo 4', 'combo 4', 55000),
+    ('RXXTN', 'Chân gà sả tắc N rút xương', 'chân gà sả tắc n rút xương', 35000),
+    ('RXSTN', 'Chân gà sốt thái N rút xương', 'chân gà sốt thái n rút xương', 35000),
+    ('RXXTL', 'Chân gà sả tắc L rút xương', 'chân gà sả tắc l rút xương', 70000),
+    ('RXSTL', 'Chân gà sốt thái L rút xương', 'chân gà sốt thái l rút xương', 70000),
+    ('CB1S3', 'Combo 1 sốt bơ tỏi', 'combo 1 sốt bơ tỏi', 45000),
+    ('CB2S3', 'Combo 2 sốt bơ tỏi', 'combo 2 sốt bơ tỏi', 50000),
+    ('CB3S3', 'Combo3 sốt bơ tỏi', 'combo3 sốt bơ tỏi', 65000),
+    ('MTĐT', 'Mì tương đen trứng', 'mì tương đen trứng', 30000),
+    ('THQ', 'Tokbokki HQ', 'tokbokki hq', 27000),
+    ('TPM', 'Tokbokki phomai', 'tokbokki phomai', 35000),
+    ('TOM', 'Trà Ổi Hồng M', 'trà ổi hồng m', 20000),
+    ('TOL', 'Trà Ổi Hồng L', 'trà ổi hồng l', 25000),
+    ('XXĐT', 'Xx đức thêm', 'xx đức thêm', 5000),
+    ('XXVT', 'Xx thường thêm', 'xx thường thêm', 3000),
+    ('CHT', 'Chả hàn thêm', 'chả hàn thêm', 5000),
+    ('MIT', 'Mì thêm', 'mì thêm', 12000),
+    ('NKCT', 'Nấm kimcham', 'nấm kimcham', 5000),
+    ('VT', 'Viên thêm', 'viên thêm', 3000),
+    ('KCT', 'Kimchi thêm', 'kimchi thêm', 5000),
+    ('TCT', 'Trân châu trắng', 'trân châu trắng', 4000),
+    ('TDT', 'Thạch dừa', 'thạch dừa', 4000),
+    ('CS', 'Chiên sốt', 'chiên sốt', 10000),
+    ('PTK', 'Phồng tôm thêm', 'phồng tôm thêm', 5000),
+    ('MT', 'Mì tokbokki', 'mì tokbokki', 35000),
+    ('PMT', 'Phô mai SỢI thêm', 'phô mai sợi thêm', 10000),
+    ('CTT', 'Chả cá thường', 'chả cá thường', 5000),
+    ('TV', 'Tôm Viên', 'tôm viên', 10000),
+    ('CV', 'Cá viên', 'cá viên', 10000),
+    ('CB1S1', 'Combo 1 sốt mắm', 'combo 1 sốt mắm', 45000),
+    ('CB1S2', 'Combo 1 sốt mắm me', 'combo 1 sốt mắm me', 45000),
+    ('CB2S1', 'Combo 2 sốt mắm', 'combo 2 sốt mắm', 50000),
+    ('CB2S2', 'Combo 2 sốt mắm me', 'combo 2 sốt mắm me', 50000),
+    ('CB3S1', 'Combo3 sốt mắm', 'combo3 sốt mắm', 65000),
+    ('CB3S2', 'Combo3 sốt mắm me', 'combo3 sốt mắm me', 65000),
+    ('TT', 'Trứng thêm', 'trứng thêm', 5000),
+    ('NN', 'Nước ngọt', 'nước ngọt', 13000),
+    ('NTT', 'Nem tré trộn', 'nem tré trộn', 50000),
+    ('TVM', 'Trà Vải M', 'trà vải m', 20000),
+    ('TVL', 'Trà Vải L', 'trà vải l', 25000),
+    ('TCXCN', 'Trứng cút sốt mắm me', 'trứng cút sốt mắm me', 20000),
+    ('MTPM', 'Mì tokbokki phomai', 'mì tokbokki phomai', 40000),
+    ('NS', 'Nước suối', 'nước suối', 7000),
+    ('TXM', 'Trà Cam Xoài  (M)', 'trà cam xoài  (m)', 20000),
+    ('TXL', 'Trà Cam Xoài (L)', 'trà cam xoài (l)', 25000),
+    ('GSC', 'Gà sốt cay', 'gà sốt cay', 35000),
+    ('GSPM', 'Gà sốt phomai', 'gà sốt phomai', 35000),
+    ('GSCPM', 'Gà sốt cay phủ phomai', 'gà sốt cay phủ phomai', 40000),
+    ('GV', 'Gà popcorn', 'gà popcorn', 27000),
+    ('BTN', 'Bánh tráng nhỏ', 'bánh tráng nhỏ', 6000),
+    ('BTL', 'Bánh tráng lớn', 'bánh tráng lớn', 10000),
+    ('BTS', 'Bánh tráng sốt', 'bánh tráng sốt', 15000),
+    ('LDM', 'Matcha latte Đài M', 'matcha latte đài m', 22000),
+    ('LDL', 'Matcha latte Đài L', 'matcha latte đài l', 25000),
+    ('LNM', 'Matcha Latte Nhật M', 'matcha latte nhật m', 25000),
+    ('LNL', 'Matcha Latte Nhật L', 'matcha latte nhật l', 28000),
+    ('ODM', 'Matcha Oatside Đài M', 'matcha oatside đài m', 24000),
+    ('ODL', 'Matcha Oatside Đài L', 'matcha oatside đài l', 28000),
+    ('ONM', 'Matcha Oatside Nhật M', 'matcha oatside nhật m', 27000),
+    ('ONL', 'Matcha Oatside Nhật L', 'matcha oatside nhật l', 31000)
+ON CONFLICT (dish_key) DO NOTHING;
+
+ALTER TABLE order_list ADD COLUMN IF NOT EXISTS dish_id INTEGER REFERENCES dish (id) ON DELETE SET NULL;
+
+UPDATE order_list o SET dish_id = d.id
+FROM dish d
+WHERE o.dish_id IS NULL AND o.dish_key = d.dish_key;
+
+COMMIT;
@@ -0,0 +1,55 @@
+-- Chia bảng report thành partition theo tháng (RANGE trên cột date): lọc theo khoảng ngày chỉ quét các tháng liên quan,
+-- tháng đã archive sang Parquet (python -m app.services.report_archive) được xóa bằng DROP partition.
+-- Chạy 1 lần trên Supabase (SQL editor) trước khi bật cron archive. SQLite local: không partition, archive vẫn chạy được.
+--
+-- Khóa chính của bảng partition phải chứa cột partition -> PRIMARY KEY (id, date); id vẫn lấy từ report_id_seq cũ.
+-- Partition cho tháng mới được lệnh archive tạo trước 2 tháng; dòng rơi ngoài mọi partition nằm trong report_default.
+-- Nếu bảng report có bật RLS / policy trên Supabase: tạo lại policy cho bảng mới sau khi chạy.
+
+BEGIN;
+
+ALTER TABLE report RENAME TO report_legacy;
+ALTER INDEX report_pkey RENAME TO report_legacy_pkey;
+ALTER INDEX IF EXISTS ix_report_id RENAME TO ix_report_legacy_id;
+ALTER INDEX IF EXISTS ix_report_date_product_code RENAME TO ix_report_legacy_date_product_code;
+-- Giữ sequence khi DROP bảng cũ
+ALTER SEQUENCE report_id_seq OWNED BY NONE;
+
+-- Giữ nguyên kiểu cột / default (kể cả nextval('report_id_seq')) của bảng cũ
+CREATE TABLE report (LIKE report_legacy INCLUDING DEFAULTS) PARTITION BY RANGE (date);
+ALTER TABLE report ADD PRIMARY KEY (id, date);
+
+ALTER SEQUENCE report_id_seq OWNED BY report.id;
+
+-- report_YYYY_MM cho mọi tháng đã có dữ liệu tới 2 tháng sau tháng hiện tại
+DO $$
+DECLARE
+    month DATE;
+BEGIN
+    FOR month IN
+        SELECT generate_series(
+            date_trunc('month', COALESCE((SELECT min(date) FROM report_legacy), CURRENT_DATE)),
+            date_trunc('month', CURRENT_DATE) + INTERVAL '2 months',
+            INTERVAL '1 month'
+        )::date
+    LOOP
+        EXECUTE format(
+            'CREATE TABLE report_%s PARTITION OF report FOR VALUES FROM (%L) TO (%L)',
+            to_char(month, 'YYYY_MM'), month, (month + INTERVAL '1 month')::date
+        );
+    END LOOP;
+END $$;
+
+CREATE TABLE report_default PARTITION OF report DEFAULT;
+
+-- Index trên bảng cha -> tự tạo trên từng partition (kể cả partition tạo sau)
+CREATE INDEX ix_report_id ON report (id);
+CREATE INDEX ix_report_date_product_code ON report (date, product_code);
+
+INSERT INTO report SELECT * FROM report_legacy;
+
+DROP TABLE report_legacy;
+
+ANALYZE report;
+
+COMMIT;
@@ -0,0 +1,24 @@
+-- Bảng rollup daily_sales: tổng của report theo (ngày, mã hàng, bàn), backend cập nhật trong cùng transaction
+-- với mỗi lần ghi / xóa report; /api/reports/summary (trừ theo giờ) đọc bảng này thay vì gộp cả bảng report.
+-- Chạy 1 lần trên Supabase (SQL editor) trước khi deploy bản backend mới, sau đó dựng dữ liệu (gồm cả các tháng
+-- đã archive sang Parquet):
+--     cd backend && python -m app.services.daily_sales
+-- (backend khởi động với DB_INIT_MODE=background / blocking cũng tự dựng khi bảng còn trống.)
+-- SQLite local: bảng được tạo và dựng tự động khi khởi động.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS daily_sales (
+    date DATE NOT NULL,
+    product_code VARCHAR(50) NOT NULL,
+    table_id INTEGER NOT NULL,
+    product_name VARCHAR(255) NOT NULL,
+    rows INTEGER NOT NULL DEFAULT 0,
+    quantity INTEGER NOT NULL DEFAULT 0,
+    revenue DOUBLE PRECISION NOT NULL DEFAULT 0,
+    discount DOUBLE PRECISION NOT NULL DEFAULT 0,
+    ship_fee DOUBLE PRECISION NOT NULL DEFAULT 0,
+    PRIMARY KEY (date, product_code, table_id)
+);
+
+COMMIT;
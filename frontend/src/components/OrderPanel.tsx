@@ -24,19 +24,18 @@ import {
   Print,
 } from '@mui/icons-material';
 import { motion, AnimatePresence } from 'framer-motion';
-import { Table, OrderItem, Dish } from '../types';
+import { Table, OrderItem, Dish, CheckoutBill } from '../types';
 import { DISHES } from '../data/dishes';
 import DishSearch from './DishSearch';
 import OrderItemList from './OrderItemList';
 import BillPrint from './BillPrint';
-import { reportAPI } from '../services/api';
 
 interface OrderPanelProps {
   table: Table;
   onAddOrder: (tableId: number, orderItem: OrderItem) => void;
   onUpdateOrder: (tableId: number, dishId: string, quantity: number) => void;
   onRemoveOrder: (tableId: number, dishId: string) => void;
-  onCompletePayment: (tableId: number) => void;
+  onCompletePayment: (tableId: number, bill: CheckoutBill) => Promise<void>;
   onUpdateNote?: (tableId: number, dishId: string, note: string) => void;
   // Thêm props cho pending changes
   pendingChangesCount?: number;
@@ -184,41 +183,22 @@ const OrderPanel: React.FC<OrderPanelProps> = ({
     setDiscount(0);
     setShippingFee(0);
 
-    // 5. Gọi hàm xử lý logic nền (không cần await)
-    //    Hàm này sẽ tự xử lý API và cập nhật state cuối cùng
-    onCompletePayment(table.id);
+    // 5. Xử lý nền: server chuyển order của bàn sang report + dọn bàn trong 1 transaction
+    //    Gửi đúng tổng trên hóa đơn đã in (doanh thu lưu = số tiền khách trả) + mã hàng cho món ngoài thực đơn server
+    const productCodes: Record<string, string> = {};
+    billInfo.orders.forEach(order => {
+        productCodes[order.dish.name] = order.dish.id;
+    });
 
     try {
-        // --- LOGIC NỀN: Gửi dữ liệu đi trong khi UI đã cập nhật ---
-        console.log('🚀 Bắt đầu gửi báo cáo hàng loạt...');
-
-        // 1. Chuẩn bị dữ liệu báo cáo hàng loạt
-        const reportDataBatch = billInfo.orders.map(order => ({
-            tableNumber: table.id,
+        await onCompletePayment(table.id, {
             date: billInfo.date,
             time: billInfo.time,
-            code: order.dish.id,
-            nameDish: order.dish.name,
-            quantity: order.quantity,
-            totalCheck: billInfo.total,
-            shipFee: billInfo.shippingFee,
-            discountCheck: billInfo.discount,
-        }));
-
-        // 2. Gọi API batch một lần duy nhất
-        if (reportDataBatch.length > 0) {
-            // Giả sử bạn đã tạo hàm reportAPI.addReportBatch
-            await reportAPI.addReportBatch({ reports: reportDataBatch });
-        }
-
-        console.log('✅ Đã lưu báo cáo thành công (nền)');
-
-    } catch (error) {
-        // XỬ LÝ LỖI: Nếu API thất bại, thông báo cho người dùng
-        console.error('❌ Lỗi nghiêm trọng khi lưu báo cáo (nền):', error);
-        // Hiển thị một thông báo toast/alert để người dùng biết rằng
-        // có lỗi xảy ra và họ nên kiểm tra lại.
-        alert('Thanh toán thành công nhưng có lỗi khi lưu báo cáo. Vui lòng liên hệ quản trị viên.');
+            total: billInfo.total,
+            discount: billInfo.discount,
+            ship_fee: billInfo.shippingFee,
+            product_codes: productCodes,
+        });
     } finally {
         // Đảm bảo trạng thái processing được tắt
         setIsProcessingPayment(false);
@@ -1,6 +1,6 @@
 import { useState, useCallback, useRef } from 'react';
 import { OrderItem } from '../types';
-import { orderAPI } from '../services/api';
+import { orderAPI, newIdempotencyKey } from '../services/api';
 import { DISHES } from '../data/dishes';
 
 export interface PendingChange {
@@ -18,6 +18,8 @@ export type PendingMap = Record<number, PendingChange[]>;
 export const usePendingOrders = () => {
   const [pendingChanges, setPendingChanges] = useState<PendingMap>({});
   const currentTableRef = useRef<number | null>(null);
+  // Lần lưu lỗi -> lần sau gửi lại đúng payload đó thì dùng lại khóa cũ (BE không áp dụng 2 lần)
+  const syncKeysRef = useRef<Record<number, { body: string; key: string }>>({});
 
   const setCurrentTable = useCallback((tableId: number) => {
     currentTableRef.current = tableId;
@@ -50,48 +52,39 @@ export const usePendingOrders = () => {
 
     console.log(`🔄 Saving ${changes.length} pending changes for table ${tableId}`, changes);
 
-    // Gom theo dishId
-    const groups = new Map<string, PendingChange[]>();
-    for (const ch of changes) {
-      const arr = groups.get(ch.dishId) || [];
-      arr.push(ch);
-      groups.set(ch.dishId, arr);
+    // Map dishId -> dishName, giữ nguyên thứ tự để BE áp dụng trong 1 transaction
+    const dishNameOf = (dishId: string) =>
+      DISHES.find(d => String(d.id) === String(dishId))?.name || dishId;
+
+    const payload = changes
+      .slice()
+      .sort((a, b) => (a.timestamp ?? 0) - (b.timestamp ?? 0))
+      .map(c => ({
+        type: c.type,
+        dish_name: dishNameOf(c.dishId),
+        quantity: c.type === 'add' || c.type === 'update'
+          ? (c.quantity ?? c.orderItem?.quantity ?? 1)
+          : undefined,
+        note: c.type === 'note'
+          ? (c.note ?? '').trim()
+          : (typeof c.orderItem?.note === 'string' ? c.orderItem.note.trim() : undefined),
+      }));
+
+    // 1 request duy nhất thay vì mỗi món 1 request
+    const body = JSON.stringify(payload);
+    const previous = syncKeysRef.current[tableId];
+    const key = previous && previous.body === body ? previous.key : newIdempotencyKey();
+    syncKeysRef.current[tableId] = { body, key };
+
+    let failed = 0;
+    try {
+      await orderAPI.syncTable(tableId, payload, key);
+      delete syncKeysRef.current[tableId];
+    } catch (err) {
+      console.error(`❌ Sync failed for table ${tableId}`, err);
+      failed = changes.length;
     }
 
-    const tasks = Array.from(groups.entries()).map(async ([dishId, chs]) => {
-      // Nếu có remove -> xóa và bỏ qua các thay đổi khác
-      if (chs.some(c => c.type === 'remove')) {
-        const d = DISHES.find(d => String(d.id) === String(dishId));
-        const dishName = d?.name || dishId;
-        await orderAPI.deleteOrder(tableId, dishName);
-        return;
-      }
-
-      // Lấy quantity cuối cùng
-      const qtyChange = chs
-        .filter(c => c.type === 'add' || c.type === 'update')
-        .sort((a, b) => (a.timestamp ?? 0) - (b.timestamp ?? 0))
-        .pop();
-      const qty = qtyChange?.quantity ?? qtyChange?.orderItem?.quantity ?? 1;
-
-      // Lấy note cuối cùng
-      const noteChange = chs
-        .filter(c => c.type === 'note' || typeof c.orderItem?.note === 'string')
-        .sort((a, b) => (a.timestamp ?? 0) - (b.timestamp ?? 0))
-        .pop();
-      const note = (noteChange?.note ?? noteChange?.orderItem?.note ?? '').trim();
-
-      // Map dishId -> dishName cho BE route mới (body nhận dish_name)
-      const dish = DISHES.find(d => String(d.id) === String(dishId));
-      const dishName = dish?.name || dishId;
-
-      // Upsert 1 lần: tạo mới nếu chưa có, nếu đã có thì cập nhật qty + note
-      await orderAPI.createItem(tableId, dishName, qty, note);
-    });
-
-    const results = await Promise.allSettled(tasks);
-    const failed = results.filter(r => r.status === 'rejected').length;
-
     if (failed === 0) {
       setPendingChanges(prev => {
         const clone = { ...prev };
@@ -14,7 +14,7 @@ import {
 import TableGrid from '../components/TableGrid';
 import OrderPanel from '../components/OrderPanel';
 import AuthModal from '../components/AuthModal';
-import { Table, OrderItem, OrderResponse } from '../types';
+import { Table, OrderItem, OrderResponse, CheckoutBill } from '../types';
 import { orderAPI } from '../services/api';
 import { DISHES } from '../data/dishes';
 import { usePendingOrders } from '../hooks/usePendingOrders';
@@ -313,38 +313,31 @@ const Home: React.FC = () => {
   }, [addPendingChange]);
 
   // Thanh toán
-  const handleCompletePayment = async (tableId: number) => {
+  const handleCompletePayment = async (tableId: number, bill: CheckoutBill) => {
     console.log(`💳 Bắt đầu xử lý thanh toán cho bàn ${tableId}`);
 
-    // --- OPTIMISTIC UI: Cập nhật state ngay lập tức ---
-    setTables(prevTables =>
-        prevTables.map(table =>
-            table.id === tableId
-                ? { ...table, orders: [], isOrdered: false }
-                : table
-        )
-    );
-    console.log(`✅ UI Đã được cập nhật cho bàn ${tableId}`);
-
-    // --- LOGIC NỀN: Lưu pending changes và xóa đơn hàng ---
+    // Giữ order trên UI tới khi server checkout xong: lỗi -> bàn vẫn còn món, thanh toán lại được
     try {
         // 1. Lưu các thay đổi đang chờ (nếu có)
         await savePendingChanges(tableId);
-        console.log(`✅ Đã lưu pending changes cho bàn ${tableId} (nền)`);
+        console.log(`✅ Đã lưu pending changes cho bàn ${tableId}`);
 
-        // 2. Gọi API xóa tất cả đơn hàng của bàn
-        // Giả sử bạn đã tạo hàm orderAPI.deleteOrdersByTable
-        await orderAPI.deleteOrdersByTable(tableId);
-        console.log(`✅ Đã xóa đơn hàng trên server cho bàn ${tableId} (nền)`);
+        // 2. Chuyển order của bàn sang report + xóa order trong 1 transaction
+        const { data: reports } = await orderAPI.checkoutTable(tableId, bill);
+        console.log(`✅ Đã lưu ${reports.length} dòng báo cáo và dọn bàn ${tableId}`);
 
+        // 3. Server đã dọn bàn -> cập nhật UI
+        setTables(prevTables =>
+            prevTables.map(table =>
+                table.id === tableId
+                    ? { ...table, orders: [], isOrdered: false }
+                    : table
+            )
+        );
     } catch (error) {
-        // XỬ LÝ LỖI: Nếu API thất bại, thông báo cho người dùng
-        console.error('❌ Lỗi khi dọn bàn trên server:', error);
-        // Thông báo cho người dùng rằng có lỗi xảy ra.
-        // Cân nhắc việc reload lại dữ liệu từ server để đồng bộ lại
-        // trạng thái đúng, vì UI đang hiển thị bàn trống nhưng thực tế
-        // server vẫn còn đơn hàng.
-        alert(`Lỗi khi dọn bàn ${tableId}. Vui lòng tải lại trang để đảm bảo dữ liệu chính xác.`);
+        // Order vẫn còn trên server và trên UI
+        console.error('❌ Lỗi khi thanh toán bàn trên server:', error);
+        alert(`Lỗi khi thanh toán bàn ${tableId}, chưa lưu báo cáo. Các món vẫn được giữ, vui lòng thử lại.`);
     }
 };
 
@@ -1,5 +1,5 @@
 import axios from 'axios';
-import { OrderRequest, OrderResponse } from '../types';
+import { OrderRequest, OrderResponse, CheckoutBill, MenuDish } from '../types';
 
 // const API_BASE_URL = process.env.REACT_APP_API_URL || 'http://localhost:8000/api';
 
@@ -16,14 +16,42 @@ const API_BASE_URL =
 // Đừng set Content-Type global cho mọi method
 const api = axios.create({ baseURL: API_BASE_URL });
 
+// Khóa Idempotency-Key: gửi lại cùng khóa -> BE trả lại response cũ, không ghi 2 lần
+export const newIdempotencyKey = (): string =>
+  typeof crypto !== 'undefined' && typeof crypto.randomUUID === 'function'
+    ? crypto.randomUUID()
+    : `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+
+const WRITE_METHODS = ['post', 'put', 'patch', 'delete'];
+const MAX_NETWORK_RETRIES = 2;
+
 // Nếu cần, chỉ set Content-Type cho POST/PUT khi gửi body JSON:
 api.interceptors.request.use((config) => {
   if (config.method && ['post', 'put', 'patch'].includes(config.method)) {
     config.headers.set('Content-Type', 'application/json');
   }
+  // Mỗi request ghi 1 khóa (giữ nguyên khi gửi lại bên dưới)
+  if (config.method && WRITE_METHODS.includes(config.method) && !config.headers.has('Idempotency-Key')) {
+    config.headers.set('Idempotency-Key', newIdempotencyKey());
+  }
   return config;
 });
 
+// Mất mạng / timeout (không nhận được response) -> gửi lại request ghi với cùng Idempotency-Key
+api.interceptors.response.use(undefined, async (error) => {
+  const config = error.config;
+  if (
+    !config || error.response ||
+    !config.method || !WRITE_METHODS.includes(config.method) ||
+    (config.__retryCount ?? 0) >= MAX_NETWORK_RETRIES
+  ) {
+    throw error;
+  }
+  config.__retryCount = (config.__retryCount ?? 0) + 1;
+  await new Promise(resolve => setTimeout(resolve, 500 * config.__retryCount));
+  return api.request(config);
+});
+
 export const orderAPI = {
   // Get all orders
   getAllOrders: (): Promise<{ data: OrderResponse[] }> => api.get('orders/'),
@@ -32,6 +60,20 @@ export const orderAPI = {
   createItem: (tableId: number, dishName: string, quantity: number, note?: string) =>
     api.post(`orders/table/${tableId}/item`, { dish_name: dishName, quantity, note: note ?? "" }),
   
+  // Apply a table's whole pending change list in one request / one transaction
+  syncTable: (tableId: number, changes: Array<{
+    type: 'add' | 'update' | 'remove' | 'note';
+    dish_name: string;
+    quantity?: number;
+    note?: string;
+  }>, idempotencyKey?: string): Promise<{ data: OrderResponse[] }> =>
+    api.post(`orders/table/${tableId}/sync`, { changes },
+      idempotencyKey ? { headers: { 'Idempotency-Key': idempotencyKey } } : undefined),
+
+  // Checkout: move the table's orders into reports and clear the table in one transaction
+  checkoutTable: (tableId: number, bill: CheckoutBill) =>
+    api.post(`orders/table/${tableId}/checkout`, bill),
+
   // Add order to database
   addOrder: (orderData: OrderRequest): Promise<{ data: OrderResponse }> => 
     api.post('orders/', orderData),
@@ -66,6 +108,10 @@ export const orderAPI = {
 export const reportAPI = {
   // Get all reports
   getAllReports: () => api.get('reports/'),
+
+  // Aggregated totals computed in the DB (group by day / hour / table / product)
+  getSummary: (groupBy?: 'day' | 'hour' | 'table' | 'product', params?: { from?: string; to?: string }) =>
+    api.get(groupBy ? `reports/summary/${groupBy}` : 'reports/summary', { params }),
   
   // Add report
   addReport: (reportData: {
@@ -83,12 +129,21 @@ export const reportAPI = {
   // Delete all reports
   deleteAllReports: () => api.delete('reports/'),
 
+  // Download URL of the server-side export (streamed xlsx / csv, dates as yyyy-mm-dd)
+  getExportUrl: (format: 'xlsx' | 'csv' = 'xlsx', params?: { from?: string; to?: string }) =>
+    api.getUri({ url: 'reports/export', params: { format, ...params } }),
+
   // Add multiple reports in a single batch
   addReportBatch: (data: { reports: any[] }) => {
     return api.post('/reports/batch', data);
   },
 };
 
+// Dish API (thực đơn, có ETag -> trình duyệt tự gửi If-None-Match, nhận 304 khi không đổi)
+export const dishAPI = {
+  getAll: (): Promise<{ data: MenuDish[] }> => api.get('dishes/'),
+};
+
 export const redisAPI = {
   // Check Redis data
   checkRedisData: () => api.get('redis/check'),
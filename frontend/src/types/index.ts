@@ -62,3 +62,21 @@ export interface BillData {
   time: string;
   note?: string;
 }
+
+// Checkout request: server chuyển order của bàn sang report trong 1 transaction
+export interface CheckoutBill {
+  date: string;
+  time: string;
+  discount: number;
+  ship_fee: number;
+  total?: number; // bỏ trống -> server tính theo giá trong bảng dish
+  product_codes?: Record<string, string>; // chỉ cần cho món ngoài thực đơn
+}
+
+// Món trong thực đơn phía server (GET /api/dishes)
+export interface MenuDish {
+  id: number;
+  code: string;
+  name: string;
+  price: number;
+}